@@ -0,0 +1,450 @@
+"""Compile a question bank into the bundle the web quiz loads directly.
+
+Without a bundle, index.html fetches questions.csv and splits every line with
+a regex on each page load. A bundle is the same bank validated and grouped by
+chapter ahead of time, as JSON:
+
+    {"format": 2, "source": "questions.csv", "bank_hash": "...",
+     "questions": [{"id", "hash", "question", "answer", "explanation"}, ...],
+     "chapters": [{"name": "...", "questions": [0, 3, ...]}, ...],
+     "id_map": {"q-12": "h-...", ...}}
+
+"questions" keeps the bank's row order. "chapters" lists chapters in order of
+first appearance, each holding indexes into "questions"; that is the only place
+a question's chapter is stored. "hash" is a digest of the row's content and
+"bank_hash" a digest of all of them, so a changed bank gets a changed bundle.
+
+Question ids are stable: "h-" plus a hash of the question text (see
+question_id), so inserting or deleting rows doesn't shift them. "id_map"
+maps ids the page may have stored earlier -- positional "q-<row>" ids from
+before stable ids, and ids of questions whose text was edited -- to current
+ids, so the page can carry saved progress over.
+
+A bank can instead be split into one shard per chapter plus a manifest
+(split_bundle), so the page only downloads the chapters being studied:
+
+    questions.manifest.json
+        {"format": 2, "source": ..., "bank_hash": ..., "count": N,
+         "chapters": [{"name", "count", "hash", "file": "questions.shards/<hash>.json"}, ...],
+         "id_map": {...}}
+    questions.shards/<hash>.json
+        {"format": 2, "chapter": "...", "hash": "...",
+         "questions": [{"id", "hash", "index", "question", "answer", "explanation"}, ...]}
+
+"index" is the question's position in the whole bank, so the page can keep
+bank order across chapters. A shard's file name is its hash, which covers
+its questions and their positions; a changed chapter gets a new file and
+unchanged ones keep theirs (and stay cached by browsers).
+
+This module must not import tkinter.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from question_bank import ANSWER_VALUES, HEADERS
+
+try:
+    import brotli
+except ImportError:  # optional: only needed for --brotli
+    brotli = None
+
+BUNDLE_FORMAT = 2
+BUNDLE_SUFFIX = ".bundle.json"
+MANIFEST_SUFFIX = ".manifest.json"
+SHARDS_SUFFIX = ".shards"
+# Compressed copies sit next to the bundle for servers that serve
+# precompressed files (e.g. nginx gzip_static / brotli_static)
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "brotli": ".br"}
+
+# Same fallbacks the quiz page applies when parsing the CSV itself
+DEFAULT_EXPLANATION = "No explanation provided."
+DEFAULT_CHAPTER = "Uncategorized"
+
+
+def bundle_path_for(csv_path):
+    """Where the bundle for a bank CSV goes: questions.csv -> questions.bundle.json."""
+    root, _ = os.path.splitext(csv_path)
+    return root + BUNDLE_SUFFIX
+
+
+def manifest_path_for(csv_path):
+    """Where the sharded bank's manifest goes: questions.csv -> questions.manifest.json."""
+    root, _ = os.path.splitext(csv_path)
+    return root + MANIFEST_SUFFIX
+
+
+def shard_dir_for(manifest_path):
+    """Directory holding a manifest's shards: questions.manifest.json -> questions.shards."""
+    root = manifest_path[:-len(MANIFEST_SUFFIX)] if manifest_path.endswith(MANIFEST_SUFFIX) else os.path.splitext(manifest_path)[0]
+    return root + SHARDS_SUFFIX
+
+
+def content_hash(row):
+    """Short hex digest of a row's four fields; changes whenever any field does."""
+    digest = hashlib.sha256()
+    for field in HEADERS:
+        digest.update(row.get(field, "").encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()[:16]
+
+
+_ID_SPACE_RE = re.compile(r"[ \t\r\n]+")
+
+
+def _imul(a, b):
+    # JavaScript's Math.imul on unsigned 32-bit values
+    return (a * b) & 0xFFFFFFFF
+
+
+def text_hash(text):
+    """53-bit cyrb53 hash of text's UTF-16 code units; index.html has the same function."""
+    h1 = 0xDEADBEEF
+    h2 = 0x41C6CE57
+    data = text.encode("utf-16-le")
+    for i in range(0, len(data), 2):
+        ch = data[i] | (data[i + 1] << 8)
+        h1 = _imul(h1 ^ ch, 2654435761)
+        h2 = _imul(h2 ^ ch, 1597334677)
+    h1 = _imul(h1 ^ (h1 >> 16), 2246822507)
+    h1 ^= _imul(h2 ^ (h2 >> 13), 3266489909)
+    h2 = _imul(h2 ^ (h2 >> 16), 2246822507)
+    h2 ^= _imul(h1 ^ (h1 >> 13), 3266489909)
+    return 4294967296 * (2097151 & h2) + h1
+
+
+def id_text(text):
+    """Question text as ids hash it: whitespace runs collapsed, ends stripped."""
+    # Most texts have nothing for the regex to replace
+    if "  " in text or "\n" in text or "\t" in text or "\r" in text:
+        text = _ID_SPACE_RE.sub(" ", text)
+    return text.strip()
+
+
+def question_id(text):
+    """Stable id for a question's text; whitespace runs are collapsed first."""
+    return "h-%014x" % text_hash(id_text(text))
+
+
+def assign_question_ids(texts):
+    """question_id for each text, with "-2", "-3"... appended to repeats of the same text."""
+    seen = {}
+    ids = []
+    for text in texts:
+        base = question_id(text)
+        seen[base] = seen.get(base, 0) + 1
+        ids.append(base if seen[base] == 1 else f"{base}-{seen[base]}")
+    return ids
+
+
+# How old versions of the page split a line into fields, and unquoted a field
+_LEGACY_FIELD_SPLIT_RE = re.compile(r',(?=(?:(?:[^"]*"){2})*[^"]*$)')
+_LEGACY_QUOTES_RE = re.compile(r'^"(.*)"$')
+
+
+def legacy_question_ids(text):
+    """Map the positional "q-<N>" ids old versions of the page gave the questions in CSV text to their question ids.
+
+    The old page numbered the non-empty lines after the header, then dropped
+    those without a question or an answer. Each such line is matched to the
+    row starting on it, so rows spanning several lines count as the page
+    counted them. Rows get the ids the page gives them when it parses the
+    text (parseQuestionsText), "-2" suffixes of repeated questions included.
+    """
+    # Split lines at "\n" only, as the page did; csv copes with the "\r" left on them
+    reader = csv.reader(io.StringIO(text, newline="\n"))
+    kept_lines = []
+    kept_texts = []
+    header = True
+    line_number = 0
+    for row in reader:
+        start, line_number = line_number, reader.line_num
+        parts = [field.strip() for field in row]
+        if not any(parts):
+            continue
+        if header:
+            header = False
+        elif parts[0] and len(parts) > 1 and parts[1]:
+            kept_lines.append(start)
+            kept_texts.append(parts[0])
+    ids_by_line = dict(zip(kept_lines, assign_question_ids(kept_texts)))
+
+    legacy_ids = {}
+    index = -1 # The header is the first non-empty line
+    for line_number, line in enumerate(text.split("\n")):
+        line = line.strip()
+        if not line:
+            continue
+        if index >= 0 and line_number in ids_by_line:
+            parts = [_LEGACY_QUOTES_RE.sub(r"\1", part).strip() for part in _LEGACY_FIELD_SPLIT_RE.split(line)]
+            if parts[0] and len(parts) > 1 and parts[1]:
+                legacy_ids[f"q-{index}"] = ids_by_line[line_number]
+        index += 1
+    return legacy_ids
+
+
+def read_legacy_text(csv_path):
+    """A bank CSV's text as the page reads it, for legacy_question_ids."""
+    with open(csv_path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        return f.read()
+
+
+def build_id_map(ids, legacy_ids=None, previous_map=None, question_edits=()):
+    """Map ids the page may have stored to current ids.
+
+    legacy_ids maps positional "q-<row>" ids to current ids; it is only used
+    when there is no previous_map, because positions are only meaningful for
+    the bank the page last used positional ids with. question_edits are
+    (old text, new text) pairs from the editor; entries that led to an edited
+    question's old id are pointed at its new id. Entries for ids that no
+    longer exist, and for ids that are still current, are dropped.
+    """
+    current = set(ids)
+    id_map = dict(previous_map) if previous_map is not None else dict(legacy_ids or {})
+    for old_text, new_text in question_edits:
+        old_id, new_id = question_id(old_text), question_id(new_text)
+        if old_id == new_id:
+            continue
+        for key, target in id_map.items():
+            if target == old_id:
+                id_map[key] = new_id
+        id_map[old_id] = new_id
+    return {old: new for old, new in id_map.items() if new in current and old not in current}
+
+
+def is_valid_row(row):
+    """True if the quiz can use the row (it skips rows without question or answer)."""
+    return bool(row.get("question")) and row.get("answer") in ANSWER_VALUES
+
+
+def compile_bank(rows, source="questions.csv", skip_invalid=False, previous=None,
+                 question_edits=(), legacy_text=None):
+    """Build the bundle dict for an iterable of bank rows.
+
+    Invalid rows raise ValueError unless skip_invalid is set. previous is the
+    bundle being replaced, if any; its id_map is carried forward (see
+    build_id_map). Without one, positional "q-<N>" ids are mapped using the
+    lines of legacy_text, the CSV text the page numbered (see
+    legacy_question_ids), if given, else a previous bundle from before stable
+    ids.
+    """
+    rows = list(rows)
+    kept = []
+    for index, row in enumerate(rows):
+        if is_valid_row(row):
+            kept.append(row)
+        elif not skip_invalid:
+            raise ValueError(f"Row {index + 1} has no question text or an invalid answer.")
+    ids = assign_question_ids(row["question"] for row in kept)
+
+    previous_map = None
+    if previous and previous.get("format", 1) >= 2:
+        previous_map = previous.get("id_map", {})
+    if previous_map is not None:
+        legacy_ids = None
+    elif legacy_text is not None:
+        legacy_ids = legacy_question_ids(legacy_text)
+    elif previous and previous.get("questions"):
+        # Bundle from before stable ids: its ids are already positional
+        legacy_ids = {q["id"]: question_id(q["question"]) for q in previous["questions"]}
+    else:
+        legacy_ids = None
+    id_map = build_id_map(ids, legacy_ids, previous_map, question_edits)
+
+    questions = []
+    chapters = {}
+    bank_digest = hashlib.sha256()
+    for row, row_id in zip(kept, ids):
+        row_hash = content_hash(row)
+        bank_digest.update(row_hash.encode("ascii"))
+        chapter = row.get("chapter") or DEFAULT_CHAPTER
+        chapters.setdefault(chapter, []).append(len(questions))
+        questions.append({
+            "id": row_id,
+            "hash": row_hash,
+            "question": row["question"],
+            "answer": row["answer"],
+            "explanation": row.get("explanation") or DEFAULT_EXPLANATION,
+        })
+
+    return {
+        "format": BUNDLE_FORMAT,
+        "source": os.path.basename(source),
+        "bank_hash": bank_digest.hexdigest()[:16],
+        "questions": questions,
+        "chapters": [{"name": name, "questions": indexes} for name, indexes in chapters.items()],
+        "id_map": id_map,
+    }
+
+
+def encode_bundle(bundle):
+    """Compact UTF-8 JSON bytes for a bundle."""
+    return json.dumps(bundle, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress(data, method):
+    """Compress bundle bytes with "gzip" or "brotli"."""
+    if method == "gzip":
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if method == "brotli":
+        if brotli is None:
+            raise RuntimeError("Brotli output needs the 'brotli' package (pip install brotli).")
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"Unknown compression '{method}'.")
+
+
+def write_file_atomic(path, data):
+    """Write bytes to path via a temp file in the same directory and a rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".bundle-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+        # mkstemp files are owner-only; the web server needs to read these
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_bundle(bundle, path, compressions=()):
+    """Write the bundle JSON plus one compressed copy per method; returns the paths written."""
+    data = encode_bundle(bundle)
+    # Compress first so a missing optional package fails before anything is written
+    outputs = [(path, data)]
+    for method in compressions:
+        outputs.append((path + COMPRESSED_SUFFIXES[method], compress(data, method)))
+    for out_path, out_data in outputs:
+        write_file_atomic(out_path, out_data)
+    return [out_path for out_path, _ in outputs]
+
+
+def split_bundle(bundle, shard_dir_name):
+    """Split a compiled bundle into (manifest, {shard file name: shard}), one shard per chapter.
+
+    Manifest entries refer to shards as shard_dir_name/<file name>, relative
+    to the manifest.
+    """
+    questions = bundle["questions"]
+    shards = {}
+    chapters = []
+    for group in bundle["chapters"]:
+        chapter_questions = [dict(questions[i], index=i) for i in group["questions"]]
+        digest = hashlib.sha256(group["name"].encode("utf-8"))
+        for q in chapter_questions:
+            digest.update(f"\x1f{q['index']}:{q['hash']}".encode("ascii"))
+        chapter_hash = digest.hexdigest()[:16]
+        file_name = chapter_hash + ".json"
+        shards[file_name] = {
+            "format": BUNDLE_FORMAT,
+            "chapter": group["name"],
+            "hash": chapter_hash,
+            "questions": chapter_questions,
+        }
+        chapters.append({
+            "name": group["name"],
+            "count": len(chapter_questions),
+            "hash": chapter_hash,
+            "file": f"{shard_dir_name}/{file_name}",
+        })
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "source": bundle["source"],
+        "bank_hash": bundle["bank_hash"],
+        "count": len(questions),
+        "chapters": chapters,
+        "id_map": bundle["id_map"],
+    }
+    return manifest, shards
+
+
+_SHARD_FILE_RE = re.compile(r"^([0-9a-f]{16}\.json)(?:\.gz|\.br)?$")
+
+
+def write_shards(bundle, manifest_path, compressions=()):
+    """Write a bundle as per-chapter shards plus manifest; returns the paths written.
+
+    Shards already on disk are left alone (same name, same content). The
+    manifest is written last, so it never names a missing shard, and shards
+    it no longer names are deleted afterwards.
+    """
+    directory = shard_dir_for(manifest_path)
+    manifest, shards = split_bundle(bundle, os.path.basename(directory))
+    # Compress first so a missing optional package fails before anything is written
+    outputs = []
+    for file_name, shard in shards.items():
+        path = os.path.join(directory, file_name)
+        paths = [path] + [path + COMPRESSED_SUFFIXES[method] for method in compressions]
+        if all(os.path.exists(p) for p in paths):
+            continue
+        data = encode_bundle(shard)
+        outputs.append((path, data))
+        outputs.extend((path + COMPRESSED_SUFFIXES[method], compress(data, method)) for method in compressions)
+    data = encode_bundle(manifest)
+    outputs.append((manifest_path, data))
+    outputs.extend((manifest_path + COMPRESSED_SUFFIXES[method], compress(data, method)) for method in compressions)
+
+    os.makedirs(directory, exist_ok=True)
+    for out_path, out_data in outputs:
+        write_file_atomic(out_path, out_data)
+
+    for name in os.listdir(directory):
+        match = _SHARD_FILE_RE.match(name)
+        if match and match.group(1) not in shards:
+            os.unlink(os.path.join(directory, name))
+    return [out_path for out_path, _ in outputs]
+
+
+def read_bundle(path):
+    """The bundle at path, or None if there is none or it can't be read."""
+    try:
+        with open(path, "rb") as f:
+            bundle = json.loads(f.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    return bundle if isinstance(bundle, dict) else None
+
+
+def refresh_bundle(csv_path, rows, question_edits=()):
+    """Recompile the bundle and/or sharded manifest next to csv_path if they exist, keeping compressed copies.
+
+    question_edits are (saved text, new text) pairs for edited questions, so
+    progress stored under the old ids follows them. Returns the path of the
+    file rewritten (the manifest if both were), else None. Invalid rows are
+    skipped, as the page would when parsing the CSV.
+    """
+    targets = [(path, write) for path, write in ((bundle_path_for(csv_path), write_bundle),
+                                                 (manifest_path_for(csv_path), write_shards))
+               if os.path.exists(path)]
+    if not targets:
+        # Nothing to refresh; don't read every row of a mapped bank for nothing
+        return None
+    rows = list(rows)
+    written = None
+    for path, write in targets:
+        compressions = [method for method, suffix in COMPRESSED_SUFFIXES.items()
+                        if os.path.exists(path + suffix)]
+        previous = read_bundle(path)
+        # With no readable bundle to carry the id map forward, start over from the page's numbering
+        legacy_text = read_legacy_text(csv_path) if previous is None else None
+        bundle = compile_bank(rows, source=csv_path, skip_invalid=True, previous=previous,
+                              question_edits=question_edits, legacy_text=legacy_text)
+        write(bundle, path, compressions)
+        written = path
+    return written
@@ -0,0 +1,426 @@
+"""Command-line tools for question bank CSVs (no GUI required).
+
+Usage:
+    python bank_cli.py validate questions.csv
+    python bank_cli.py lint questions.csv [-o REPORT.json|REPORT.csv] [--select RULES] [--ignore RULES] [--jobs N]
+    python bank_cli.py compile questions.csv [--shards] [--gzip] [--brotli]
+    python bank_cli.py diff old_questions.csv questions.csv
+    python bank_cli.py analyze questions.csv EXPORTS... [-o STATS.json] [--top 10]
+    python bank_cli.py duplicates questions.csv [--threshold 0.7] [--conflicts-only]
+    python bank_cli.py review questions.csv --base-url URL --model NAME [--chapter NAME] [--search TEXT]
+    python bank_cli.py db-import questions.csv questions.sqlite [--replace]
+    python bank_cli.py db-export questions.sqlite questions.csv
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+import bank_delta
+import bank_lint
+import cohort_stats
+import llm_review
+import question_db
+from bank_bundle import (bundle_path_for, compile_bank, manifest_path_for, read_bundle, read_legacy_text,
+                         write_bundle, write_shards)
+from question_bank import QuestionBank
+from question_dupes import DEFAULT_THRESHOLD, DuplicateIndex
+from question_search import SearchIndex
+
+
+def cmd_validate(args):
+    """Load each bank, report load warnings and validation problems."""
+    exit_code = 0
+    for path in args.csv:
+        try:
+            bank = QuestionBank.from_csv(path)
+        except (OSError, ValueError) as e:
+            print(f"{path}: error: {e}", file=sys.stderr)
+            exit_code = 1
+            continue
+
+        problems = bank.validate()
+        for warning in bank.load_warnings:
+            print(f"{path}: warning: {warning}")
+        for index, message in problems:
+            print(f"{path}: row {index + 1}: {message}")
+        if problems or (args.strict and bank.load_warnings):
+            exit_code = 1
+        print(f"{path}: {len(bank)} questions, {len(bank.load_warnings)} warnings, {len(problems)} problems")
+    return exit_code
+
+
+def cmd_lint(args):
+    """Check a bank's raw rows against the lint rules, print the findings and write a report."""
+    try:
+        bank_lint.load_rule_modules(args.rules)
+    except (ImportError, OSError, SyntaxError) as e:
+        print(f"error: cannot load rules: {e}", file=sys.stderr)
+        return 2
+    if args.list_rules:
+        for lint_rule in bank_lint.RULES.values():
+            print(f"{lint_rule.id} ({lint_rule.severity}): {lint_rule.summary}")
+        return 0
+    if not args.csv:
+        print("error: a bank CSV is required", file=sys.stderr)
+        return 2
+
+    rule_ids = args.select.split(",") if args.select else list(bank_lint.RULES)
+    ignored = set(args.ignore.split(",")) if args.ignore else set()
+    rule_ids = [rule_id for rule_id in rule_ids if rule_id not in ignored]
+    chapters = bank_lint.DEFAULT_OPTIONS.chapters
+    if args.chapters:
+        try:
+            with open(args.chapters, encoding="utf-8-sig") as f:
+                chapters = frozenset(line.strip() for line in f if line.strip())
+        except OSError as e:
+            print(f"{args.chapters}: error: {e}", file=sys.stderr)
+            return 2
+    options = bank_lint.LintOptions(chapters, args.max_question_length)
+
+    try:
+        findings, row_count = bank_lint.lint_file(args.csv, rule_ids, options, jobs=args.jobs, rule_modules=args.rules)
+    except (OSError, ValueError) as e:
+        print(f"{args.csv}: error: {e}", file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        for finding in findings:
+            print(f"{args.csv}: row {finding.row} (line {finding.line}): {finding.severity}: "
+                  f"[{finding.rule}] {finding.message}")
+    report = args.output or bank_lint.report_path_for(args.csv)
+    try:
+        bank_lint.write_report(report, findings, args.csv, row_count, rule_ids)
+    except OSError as e:
+        print(f"{report}: error: {e}", file=sys.stderr)
+        return 1
+
+    errors = sum(1 for finding in findings if finding.severity == "error")
+    print(f"{args.csv}: {row_count} rows, {errors} errors, {len(findings) - errors} warnings; report in {report}")
+    return 1 if errors or (args.strict and findings) else 0
+
+
+def cmd_compile(args):
+    """Validate a bank and write the pre-grouped bundle the quiz page loads."""
+    try:
+        bank = QuestionBank.from_csv(args.csv)
+    except (OSError, ValueError) as e:
+        print(f"{args.csv}: error: {e}", file=sys.stderr)
+        return 1
+
+    for warning in bank.load_warnings:
+        print(f"{args.csv}: warning: {warning}")
+    problems = bank.validate()
+    for index, message in problems:
+        print(f"{args.csv}: row {index + 1}: {message}")
+    if problems and not args.skip_invalid:
+        print(f"{args.csv}: not compiled: {len(problems)} problems (use --skip-invalid to drop those rows)", file=sys.stderr)
+        return 1
+
+    # The CSV the page numbered questions in (its positional ids are mapped when there's no bundle yet)
+    legacy_path = args.positions_from or args.csv
+    try:
+        legacy_text = read_legacy_text(legacy_path)
+    except OSError as e:
+        print(f"{legacy_path}: error: {e}", file=sys.stderr)
+        return 1
+
+    compressions = [method for method, wanted in (("gzip", args.gzip), ("brotli", args.brotli)) if wanted]
+    if args.shards:
+        output = args.output or manifest_path_for(args.csv)
+        # Switching from a single bundle: its id map carries over too
+        previous = read_bundle(output) or read_bundle(bundle_path_for(args.csv))
+        write = write_shards
+    else:
+        output = args.output or bundle_path_for(args.csv)
+        previous = read_bundle(output)
+        write = write_bundle
+    # The bundle being replaced carries the id migration map forward
+    bundle = compile_bank(bank, source=args.csv, skip_invalid=args.skip_invalid,
+                          previous=previous, legacy_text=legacy_text)
+    try:
+        written = write(bundle, output, compressions)
+    except (OSError, RuntimeError) as e:
+        print(f"{output}: error: {e}", file=sys.stderr)
+        return 1
+
+    for path in written:
+        print(f"{path}: {os.path.getsize(path)} bytes")
+    print(f"{output}: {len(bundle['questions'])} questions in {len(bundle['chapters'])} chapters, "
+          f"{len(bundle['id_map'])} old ids mapped")
+    return 0
+
+
+def cmd_diff(args):
+    """Write the delta from the previously published bank to the new one, for the page's offline cache."""
+    try:
+        delta, version = bank_delta.write_delta(args.old_csv, args.csv)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    version_path = bank_delta.version_path_for(args.csv)
+    if delta is None:
+        print(f"{args.csv}: unchanged since {args.old_csv}")
+    else:
+        entry = version["deltas"][-1]
+        print(f"{entry['file']}: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+              f"{len(delta['removed'])} removed; {entry['size']} bytes (bank {version['size']} bytes)")
+    print(f"{version_path}: version {version['hash']}, {len(version['deltas'])} delta(s) kept")
+    return 0
+
+
+def cmd_analyze(args):
+    """Work out per-question difficulty from learners' progress exports and write it next to the bank."""
+    if cohort_stats.np is None:
+        print("error: analyze needs NumPy (pip install numpy)", file=sys.stderr)
+        return 2
+    try:
+        bank = QuestionBank.from_csv(args.csv)
+    except (OSError, ValueError) as e:
+        print(f"{args.csv}: error: {e}", file=sys.stderr)
+        return 1
+    paths = cohort_stats.export_paths(args.exports)
+    if not paths:
+        print("error: no progress exports found", file=sys.stderr)
+        return 1
+
+    # A published bundle maps ids of edited questions to their current ones
+    bundle = read_bundle(manifest_path_for(args.csv)) or read_bundle(bundle_path_for(args.csv)) or {}
+    skipped = []
+
+    def on_error(path, error):
+        skipped.append(path)
+        print(f"{path}: skipped: {error}", file=sys.stderr)
+
+    stats = cohort_stats.analyze(args.csv, bank.questions, paths, bundle.get("id_map"),
+                                 args.min_learner_answers, on_error)
+    output = args.output or cohort_stats.stats_path_for(args.csv)
+    try:
+        cohort_stats.write_stats(output, stats)
+    except OSError as e:
+        print(f"{output}: error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{stats['exports']} export(s) from {stats['learners']} learner(s) "
+          f"({stats['superseded']} superseded by newer exports, {len(skipped)} unreadable); "
+          f"{stats['unmatched']} answered question(s) not in {args.csv}")
+    if stats["chapters"]:
+        print("\nChapter accuracy (lowest first):")
+        for name, figures in sorted(stats["chapters"].items(), key=lambda item: item[1]["accuracy"]):
+            print(f"  {figures['accuracy']:6.1%}  {figures['total']:7d} answers  {name}")
+
+    entries = [entry for entry in cohort_stats.question_stats(stats) if entry.answers >= args.min_answers]
+    for title, key, chosen in (
+        ("Most missed", lambda entry: -entry.miss_rate, entries),
+        ("Least discriminating", lambda entry: entry.discrimination,
+         [entry for entry in entries if entry.discrimination is not None]),
+    ):
+        if not chosen:
+            continue
+        print(f"\n{title} (at least {args.min_answers} answers):")
+        for entry in sorted(chosen, key=key)[:args.top]:
+            discrimination = "  n/a" if entry.discrimination is None else f"{entry.discrimination:+.2f}"
+            text = bank.questions[entry.row - 1]["question"]
+            print(f"  row {entry.row}: {entry.miss_rate:6.1%} missed, discrimination {discrimination}, "
+                  f"{entry.answers} answers  {text[:70]}")
+    print(f"\n{len(stats['questions']['row'])} question(s) with figures; written to {output}")
+    return 0
+
+
+def cmd_duplicates(args):
+    """List clusters of near-identical questions, flagging those whose answers disagree."""
+    try:
+        bank = QuestionBank.from_csv(args.csv)
+    except (OSError, ValueError) as e:
+        print(f"{args.csv}: error: {e}", file=sys.stderr)
+        return 1
+
+    index = DuplicateIndex(threshold=args.threshold)
+    index.build(zip(bank.row_ids, bank.questions))
+    clusters = index.clusters()
+    conflicts = 0
+    for row_ids in clusters:
+        rows = [bank.index_of(row_id) for row_id in row_ids]
+        disagree = len({bank[i]["answer"] for i in rows}) > 1
+        conflicts += disagree
+        if args.conflicts_only and not disagree:
+            continue
+        note = ", answers disagree" if disagree else ""
+        print(f"{args.csv}: {len(rows)} similar questions{note}:")
+        for i in rows:
+            question = " ".join(bank[i]["question"].split())
+            print(f"  row {i + 1} [{bank[i]['answer']}] {question[:100]}{'...' if len(question) > 100 else ''}")
+    print(f"{args.csv}: {len(clusters)} groups of near-duplicates "
+          f"({sum(len(c) for c in clusters)} questions), {conflicts} with conflicting answers")
+    return 1 if conflicts else 0
+
+
+def cmd_review(args):
+    """Send the LLM review prompt for a chapter, a search, or the whole bank; store responses in the sidecar."""
+    try:
+        bank = QuestionBank.from_csv(args.csv)
+    except (OSError, ValueError) as e:
+        print(f"{args.csv}: error: {e}", file=sys.stderr)
+        return 1
+
+    items = list(zip(bank.row_ids, bank.questions))
+    if args.chapter:
+        items = [(row_id, row) for row_id, row in items if row["chapter"] == args.chapter]
+    if args.search:
+        # Same matching as the editor's search box
+        index = SearchIndex()
+        index.build(items)
+        matches = set(index.search(args.search, args.search_fields.split(",")))
+        items = [(row_id, row) for row_id, row in items if row_id in matches]
+    rows = [row for _, row in items]
+    if not rows:
+        print(f"{args.csv}: no questions to review", file=sys.stderr)
+        return 1
+
+    api_key = os.environ.get(args.api_key_env) if args.api_key_env else None
+    client = llm_review.ReviewClient(args.base_url, args.model, api_key=api_key, timeout=args.timeout)
+    sidecar = args.output or llm_review.review_path_for(args.csv)
+    done = [0]
+
+    def on_result(row, entry, error):
+        done[0] += 1
+        question = " ".join(row["question"].split())[:60]
+        status = "failed: " + str(error) if error else "reviewed"
+        print(f"[{done[0]}] {status}: {question}", flush=True)
+
+    reviewed, skipped, failures = llm_review.run_review(
+        client, rows, sidecar, concurrency=args.concurrency, retries=args.retries,
+        force=args.force, on_result=on_result,
+    )
+    print(f"{sidecar}: {reviewed} reviewed, {skipped} already reviewed, {len(failures)} failed")
+    return 1 if failures else 0
+
+
+def cmd_db_import(args):
+    """Copy a bank CSV into an SQLite bank database."""
+    try:
+        count, warnings = question_db.import_csv(args.csv, args.database, replace=args.replace)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    for warning in warnings:
+        print(f"{args.csv}: warning: {warning}")
+    print(f"{args.database}: {count} questions imported from {args.csv}")
+    return 0
+
+
+def cmd_db_export(args):
+    """Write an SQLite bank database out as a bank CSV."""
+    try:
+        count = question_db.export_csv(args.database, args.csv)
+    except (OSError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.csv}: {count} questions exported from {args.database}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Question bank command-line tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("validate", help="Check bank CSVs for header and row problems.")
+    p.add_argument("csv", nargs="+", help="Bank CSV file(s).")
+    p.add_argument("--strict", action="store_true", help="Treat load warnings (e.g. coerced answers) as failures.")
+    p.set_defaults(func=cmd_validate)
+
+    p = subparsers.add_parser("lint", help="Check every row against the lint rules and write a report the editor can open.")
+    p.add_argument("csv", nargs="?", help="Bank CSV file.")
+    p.add_argument("-o", "--output", help="Report path; .csv for a CSV report, otherwise JSON "
+                                           "(default: next to the CSV, e.g. questions.lint.json).")
+    p.add_argument("--select", metavar="RULES", help="Comma-separated rule ids to run (default: all).")
+    p.add_argument("--ignore", metavar="RULES", help="Comma-separated rule ids to skip.")
+    p.add_argument("--rules", action="append", default=[], metavar="MODULE",
+                   help="Module (dotted name or .py file) registering extra rules with bank_lint.rule; repeatable.")
+    p.add_argument("--list-rules", action="store_true", help="List the available rules and exit.")
+    p.add_argument("--chapters", metavar="FILE",
+                   help="File with the allowed chapter names, one per line (default: the MPEP chapters).")
+    p.add_argument("--max-question-length", type=int, default=bank_lint.MAX_QUESTION_LENGTH,
+                   help="Longest question, in characters, before long-question flags it (default: %(default)s).")
+    p.add_argument("--jobs", type=int, help="Worker processes (default: one per CPU).")
+    p.add_argument("--strict", action="store_true", help="Fail on warnings too.")
+    p.add_argument("-q", "--quiet", action="store_true", help="Only print the summary.")
+    p.set_defaults(func=cmd_lint)
+
+    p = subparsers.add_parser("compile", help="Build the bundle the quiz page loads instead of the CSV.")
+    p.add_argument("csv", help="Bank CSV file.")
+    p.add_argument("-o", "--output", help="Bundle path (default: next to the CSV, e.g. questions.bundle.json, "
+                                           "or questions.manifest.json with --shards).")
+    p.add_argument("--shards", action="store_true",
+                   help="Write one file per chapter plus a manifest (questions.shards/, questions.manifest.json), "
+                        "so the page only downloads the chapters being studied.")
+    p.add_argument("--skip-invalid", action="store_true", help="Drop rows that fail validation instead of refusing to compile.")
+    p.add_argument("--positions-from", metavar="CSV",
+                   help="Bank whose row order matches the positional ids stored by older versions of the quiz "
+                        "(default: the bank itself). Only used when there is no previous bundle.")
+    p.add_argument("--gzip", action="store_true", help="Also write a precompressed .gz copy.")
+    p.add_argument("--brotli", action="store_true", help="Also write a precompressed .br copy (needs the brotli package).")
+    p.set_defaults(func=cmd_compile)
+
+    p = subparsers.add_parser("diff", help="Write a delta from the previously published bank, so offline copies of the quiz update cheaply.")
+    p.add_argument("old_csv", help="The bank CSV as currently deployed.")
+    p.add_argument("csv", help="The new bank CSV; the version file and deltas are written next to it.")
+    p.set_defaults(func=cmd_diff)
+
+    p = subparsers.add_parser("analyze", help="Work out per-question miss rates and discrimination from learners' "
+                                              "progress exports, for the editor to sort and filter by.")
+    p.add_argument("csv", help="Bank CSV file the learners studied.")
+    p.add_argument("exports", nargs="+", help="Progress exports from the quiz page, or directories of them.")
+    p.add_argument("-o", "--output", help="Statistics path (default: next to the CSV, e.g. questions.stats.json).")
+    p.add_argument("--min-learner-answers", type=int, default=cohort_stats.DEFAULT_MIN_LEARNER_ANSWERS,
+                   help="Answers a learner needs to be ranked for the discrimination index (default: %(default)s).")
+    p.add_argument("--min-answers", type=int, default=10,
+                   help="Answers a question needs to be listed among the worst (default: %(default)s).")
+    p.add_argument("--top", type=int, default=10, help="Questions listed per ranking (default: %(default)s).")
+    p.set_defaults(func=cmd_analyze)
+
+    p = subparsers.add_parser("duplicates", help="Find groups of near-identical questions.")
+    p.add_argument("csv", help="Bank CSV file.")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                   help="Minimum word-shingle similarity, 0-1 (default: %(default)s).")
+    p.add_argument("--conflicts-only", action="store_true", help="Only list groups whose answers disagree.")
+    p.set_defaults(func=cmd_duplicates)
+
+    p = subparsers.add_parser("review", help="Get LLM reviews of many questions from an OpenAI-compatible API.")
+    p.add_argument("csv", help="Bank CSV file.")
+    p.add_argument("--base-url", required=True, help="API base URL, e.g. https://api.openai.com/v1 or http://localhost:8000/v1.")
+    p.add_argument("--model", required=True, help="Model name to request.")
+    p.add_argument("--api-key-env", default="OPENAI_API_KEY", metavar="VAR",
+                   help="Environment variable holding the API key (default: %(default)s; unset means no key).")
+    p.add_argument("--chapter", help="Only review questions in this chapter (exact name).")
+    p.add_argument("--search", help="Only review questions matching this text, as in the editor's search box.")
+    p.add_argument("--search-fields", default="question", help="Comma-separated fields --search looks in (default: %(default)s).")
+    p.add_argument("--concurrency", type=int, default=llm_review.DEFAULT_CONCURRENCY, help="Requests in flight at once (default: %(default)s).")
+    p.add_argument("--retries", type=int, default=llm_review.DEFAULT_RETRIES, help="Retries per question for rate limits and server errors (default: %(default)s).")
+    p.add_argument("--timeout", type=float, default=llm_review.DEFAULT_TIMEOUT, help="Seconds to wait for each response (default: %(default)s).")
+    p.add_argument("--force", action="store_true", help="Review again even if the sidecar has a review of the same content.")
+    p.add_argument("-o", "--output", help="Sidecar file (default: next to the CSV, e.g. questions.reviews.jsonl).")
+    p.set_defaults(func=cmd_review)
+
+    p = subparsers.add_parser("db-import", help="Copy a bank CSV into an SQLite database the editor can open.")
+    p.add_argument("csv", help="Bank CSV file.")
+    p.add_argument("database", help="Database file to create or fill (e.g. questions.sqlite).")
+    p.add_argument("--replace", action="store_true", help="Replace the questions already in the database.")
+    p.set_defaults(func=cmd_db_import)
+
+    p = subparsers.add_parser("db-export", help="Write an SQLite bank database out as a bank CSV.")
+    p.add_argument("database", help="Database file.")
+    p.add_argument("csv", help="CSV file to write (replaced atomically).")
+    p.set_defaults(func=cmd_db_export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Deltas between two versions of a bank CSV, so offline copies update cheaply.
+
+The page's service worker (sw.js) keeps questions.csv cached under the hash
+of its bytes. When the bank is republished, run
+
+    python bank_cli.py diff old_questions.csv questions.csv
+
+before deploying. It writes a delta holding only the rows that were added,
+changed or removed, and a version file naming the current hash:
+
+    questions.version.json
+        {"format": 1, "file": "questions.csv", "hash": "...", "size": N,
+         "deltas": [{"from": "...", "to": "...", "size": N,
+                     "file": "questions.deltas/<from>-<to>.json"}, ...]}
+    questions.deltas/<from>-<to>.json
+        {"format": 1, "from": "...", "to": "...", "header": "...", "rows": N,
+         "removed": [old index, ...],
+         "changed": [[old index, record], ...],
+         "added": [[new index, record], ...]}
+
+Hashes are the first 16 hex digits of the SHA-256 of the file's bytes. A
+record is one CSV row as it appears in the file, line ending included, so
+applying a delta rebuilds the new file byte for byte (the service worker
+checks the result against "to"). Applying: replace the changed records,
+drop the removed ones, then put the added ones at their new indexes.
+
+Deltas chain: a client several versions behind applies them in turn. The
+version file lists the last MAX_DELTAS that lead to the current hash, and
+delta files it no longer lists are deleted.
+
+This module must not import tkinter.
+"""
+import difflib
+import hashlib
+import json
+import os
+import re
+
+from bank_bundle import write_file_atomic
+
+DELTA_FORMAT = 1
+VERSION_SUFFIX = ".version.json"
+DELTAS_SUFFIX = ".deltas"
+# Deltas kept in the version file; clients further behind download the whole CSV
+MAX_DELTAS = 10
+
+_DELTA_FILE_RE = re.compile(r"^[0-9a-f]{16}-[0-9a-f]{16}\.json$")
+
+
+def version_path_for(csv_path):
+    """Where the version file for a bank CSV goes: questions.csv -> questions.version.json."""
+    root, _ = os.path.splitext(csv_path)
+    return root + VERSION_SUFFIX
+
+
+def delta_dir_for(version_path):
+    """Directory holding the delta files: questions.version.json -> questions.deltas."""
+    return version_path[:-len(VERSION_SUFFIX)] + DELTAS_SUFFIX
+
+
+def bank_file_hash(data):
+    """Hash of a bank file's bytes, as the service worker computes it."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def split_records(text):
+    """(header, [record, ...]) of CSV text, each with its line ending.
+
+    Lines are joined while a quote is open, so a field with line breaks
+    stays in one record. sw.js splits the same way.
+    """
+    records = []
+    current = []
+    open_quote = False
+    lines = text.split("\n")
+    for i, line in enumerate(lines):
+        if i < len(lines) - 1:
+            line += "\n"
+        elif not line:
+            break
+        current.append(line)
+        if line.count('"') % 2:
+            open_quote = not open_quote
+        if not open_quote:
+            records.append("".join(current))
+            current = []
+    if current:
+        records.append("".join(current))
+    if not records:
+        return "", []
+    return records[0], records[1:]
+
+
+def _decode(data, label):
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise ValueError(f"{label} isn't valid UTF-8: {e}") from e
+
+
+def diff_banks(old_data, new_data):
+    """The delta dict turning bank file bytes old_data into new_data.
+
+    Raises ValueError if either isn't UTF-8 (the page couldn't rebuild it).
+    """
+    _, old_records = split_records(_decode(old_data, "old bank"))
+    header, new_records = split_records(_decode(new_data, "new bank"))
+    removed, changed, added = [], [], []
+    matcher = difflib.SequenceMatcher(None, old_records, new_records, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        # Rows replaced one for one are edits; the rest were removed or added
+        paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+        changed.extend([i1 + k, new_records[j1 + k]] for k in range(paired))
+        removed.extend(range(i1 + paired, i2))
+        added.extend([j, new_records[j]] for j in range(j1 + paired, j2))
+    return {
+        "format": DELTA_FORMAT,
+        "from": bank_file_hash(old_data),
+        "to": bank_file_hash(new_data),
+        "header": header,
+        "rows": len(new_records),
+        "removed": removed,
+        "changed": changed,
+        "added": added,
+    }
+
+
+def apply_delta(old_data, delta):
+    """Bank file bytes rebuilt from old_data and a delta from diff_banks."""
+    _, records = split_records(_decode(old_data, "old bank"))
+    for index, record in delta["changed"]:
+        records[index] = record
+    removed = set(delta["removed"])
+    kept = iter(record for index, record in enumerate(records) if index not in removed)
+    added = dict(delta["added"])
+    out = [delta["header"]]
+    for index in range(delta["rows"]):
+        out.append(added[index] if index in added else next(kept))
+    return "".join(out).encode("utf-8")
+
+
+def read_version(path):
+    """The version file at path, or None if there is none or it can't be read."""
+    try:
+        with open(path, "rb") as f:
+            version = json.loads(f.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    return version if isinstance(version, dict) and version.get("format") == DELTA_FORMAT else None
+
+
+def write_delta(old_path, new_path):
+    """Write the delta from old_path to new_path and update new_path's version file.
+
+    Returns (delta or None if the files are identical, version dict). The
+    delta is checked by applying it before anything is written, and the
+    version file is written last, so it never names a missing delta.
+    """
+    with open(old_path, "rb") as f:
+        old_data = f.read()
+    with open(new_path, "rb") as f:
+        new_data = f.read()
+    new_hash = bank_file_hash(new_data)
+    version_path = version_path_for(new_path)
+    directory = delta_dir_for(version_path)
+    previous = read_version(version_path)
+    entries = previous["deltas"] if previous else []
+
+    delta = None
+    if bank_file_hash(old_data) != new_hash:
+        delta = diff_banks(old_data, new_data)
+        if apply_delta(old_data, delta) != new_data:
+            raise ValueError("Delta doesn't reproduce the new bank")
+        data = json.dumps(delta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        file_name = f"{delta['from']}-{delta['to']}.json"
+        os.makedirs(directory, exist_ok=True)
+        write_file_atomic(os.path.join(directory, file_name), data)
+        entries = [entry for entry in entries if entry["from"] != delta["from"]]
+        entries.append({"from": delta["from"], "to": delta["to"], "size": len(data),
+                        "file": f"{os.path.basename(directory)}/{file_name}"})
+
+    # Keep the newest deltas that still lead to the current hash
+    reachable = {new_hash}
+    kept = []
+    for entry in reversed(entries):
+        if entry["to"] in reachable and entry["from"] not in reachable and len(kept) < MAX_DELTAS:
+            kept.append(entry)
+            reachable.add(entry["from"])
+    version = {
+        "format": DELTA_FORMAT,
+        "file": os.path.basename(new_path),
+        "hash": new_hash,
+        "size": len(new_data),
+        "deltas": kept[::-1],
+    }
+    write_file_atomic(version_path, json.dumps(version, indent=1).encode("utf-8"))
+
+    if os.path.isdir(directory):
+        listed = {os.path.basename(entry["file"]) for entry in kept}
+        for name in os.listdir(directory):
+            if _DELTA_FILE_RE.match(name) and name not in listed:
+                os.unlink(os.path.join(directory, name))
+    return delta, version
@@ -0,0 +1,438 @@
+"""Bank linter: rule checks over the raw rows of a bank CSV, run in parallel.
+
+Loading a bank only rejects a bad header. Everything else is cleaned up
+quietly: answers that aren't True/False become False, whitespace is
+stripped. lint_file() reports those rows instead, along with rows that
+load fine but are probably mistakes: empty explanations, chapters that
+aren't MPEP chapters, overlong questions, rows mangled by an unmatched
+quote.
+
+Rules are functions registered with @rule. Each sees one raw row at a time,
+so the file is cut into chunks of whole records (see split_records) and the
+chunks are checked in a process pool. Extra rule modules can be loaded with
+load_rule_modules() (bank_cli.py lint --rules); worker processes import them
+too.
+
+Findings are written to a report (JSON or CSV, see write_report) with the
+1-based row numbers the editor shows. The editor opens reports to jump to
+each row.
+
+This module must not import tkinter.
+"""
+import collections
+import concurrent.futures
+import csv
+import importlib
+import importlib.util
+import io
+import json
+import mmap
+import os
+import re
+
+from question_bank import HEADERS, check_headers, file_stamp, normalize_answer
+
+REPORT_SUFFIX = ".lint.json"
+SEVERITIES = ("error", "warning")
+# Questions longer than this (characters) are flagged by long-question
+MAX_QUESTION_LENGTH = 500
+# Target size of the chunks handed to worker processes
+CHUNK_BYTES = 4 * 1024 * 1024
+REPORT_FIELDS = ["row", "line", "rule", "severity", "field", "message"]
+
+# Chapter names as the page groups them ("NNNN - Title")
+MPEP_CHAPTERS = (
+    "0100 - Secrecy, Access, National Security, and Foreign Filing Licenses",
+    "0200 - Types and Status of Application; Benefit and Priority Claims",
+    "0300 - Ownership and Assignment",
+    "0400 - Representative of Applicant or Owner",
+    "0500 - Receipt and Handling of Mail and Papers",
+    "0600 - Parts, Form, and Content of Application",
+    "0700 - Examination of Applications",
+    "0800 - Restriction in Applications Filed Under 35 U.S.C. 111; Double Patenting",
+    "0900 - Prior Art, Classification, and Search",
+    "1000 - Matters Decided by Various U.S. Patent and Trademark Office Officials",
+    "1100 - Statutory Invention Registration (SIR); Pre-Grant Publication (PGPub)",
+    "1200 - Appeal",
+    "1300 - Allowance and Issue",
+    "1400 - Correction of Patents",
+    "1500 - Design Patents",
+    "1600 - Plant Patents",
+    "1700 - Miscellaneous",
+    "1800 - Patent Cooperation Treaty",
+    "1900 - Protest",
+    "2000 - Duty of Disclosure",
+    "2100 - Patentability",
+    "2200 - Citation of Prior Art and Ex Parte Reexamination of Patents",
+    "2300 - Interference and Derivation Proceedings",
+    "2400 - Biotechnology",
+    "2500 - Maintenance Fees",
+    "2600 - Optional Inter Partes Reexamination",
+    "2700 - Patent Terms and Adjustments and Extensions",
+    "2800 - Supplemental Examination",
+    "2900 - International Design Applications",
+)
+
+# One problem in one row.
+#   row       1-based data row (the header isn't counted), as the editor numbers questions
+#   line      1-based line of the file the row starts on
+#   rule      id of the rule that found it
+#   severity  "error" or "warning"
+#   field     column the problem is in, or "" for the whole row
+Finding = collections.namedtuple("Finding", REPORT_FIELDS)
+
+# A registered rule; see rule()
+Rule = collections.namedtuple("Rule", "id severity summary check")
+
+# Settings rules read.
+#   chapters             allowed chapter names, or None to accept any
+#   max_question_length  see MAX_QUESTION_LENGTH
+LintOptions = collections.namedtuple("LintOptions", "chapters max_question_length")
+DEFAULT_OPTIONS = LintOptions(frozenset(MPEP_CHAPTERS), MAX_QUESTION_LENGTH)
+
+# Rule id -> Rule, in registration order
+RULES = {}
+
+
+def rule(rule_id, severity, summary):
+    """Decorator registering check(row, options) as a lint rule.
+
+    row maps each of HEADERS to the raw, unstripped field (None if the
+    record is too short), plus None to a list of any extra fields, as
+    csv.DictReader does. check returns None if the row passes, else a
+    message or a (field, message) pair.
+    """
+    if severity not in SEVERITIES:
+        raise ValueError(f"Unknown severity {severity!r} for rule {rule_id}")
+
+    def register(check):
+        RULES[rule_id] = Rule(rule_id, severity, summary, check)
+        return check
+    return register
+
+
+def load_rule_modules(names):
+    """Import modules (dotted names or .py paths) that register extra rules."""
+    for name in names:
+        if name.endswith(".py"):
+            module_name = "bank_lint_rules_" + os.path.splitext(os.path.basename(name))[0]
+            spec = importlib.util.spec_from_file_location(module_name, name)
+            if spec is None:
+                raise ImportError(f"Cannot load rules from {name}")
+            spec.loader.exec_module(importlib.util.module_from_spec(spec))
+        else:
+            importlib.import_module(name)
+
+
+# --- Built-in rules ---
+
+# A line inside a field that looks like a whole row of its own (",True," or
+# ",False," between fields): an unmatched quote swallowed the rows after it
+_SWALLOWED_ROW_RE = re.compile(r'\n[^\n]*,\s*"?(?:true|false)"?\s*(?:,|$)', re.IGNORECASE | re.MULTILINE)
+_CHAPTER_NUMBER_RE = re.compile(r"\s*(\d{3,4})\b")
+
+
+@rule("field-count", "error", "Row doesn't have exactly the four bank columns.")
+def check_field_count(row, options):
+    extra = row.get(None)
+    if extra:
+        return f"Expected {len(HEADERS)} fields, found {len(HEADERS) + len(extra)}."
+    missing = [field for field in HEADERS if row.get(field) is None]
+    if missing:
+        return f"Expected {len(HEADERS)} fields, found {len(HEADERS) - len(missing)}."
+    return None
+
+
+@rule("unbalanced-quote", "error", "A field seems to have swallowed the rows after it because of an unmatched quote.")
+def check_unbalanced_quote(row, options):
+    for field in HEADERS:
+        value = row.get(field)
+        if value and "\n" in value and _SWALLOWED_ROW_RE.search(value):
+            lines = value.count("\n") + 1
+            return field, f"Field spans {lines} lines that look like separate rows; check for an unmatched quote."
+    return None
+
+
+@rule("empty-question", "error", "Question text is empty.")
+def check_empty_question(row, options):
+    if not (row.get("question") or "").strip():
+        return "question", "Question text is empty."
+    return None
+
+
+@rule("invalid-answer", "error", "Answer isn't True or False (the editor loads it as False).")
+def check_answer(row, options):
+    raw = row.get("answer")
+    if not normalize_answer(raw)[1]:
+        return "answer", f"Answer {raw!r} isn't True or False; it loads as False."
+    return None
+
+
+@rule("empty-explanation", "warning", "Explanation is empty.")
+def check_empty_explanation(row, options):
+    if not (row.get("explanation") or "").strip():
+        return "explanation", "Explanation is empty."
+    return None
+
+
+@rule("empty-chapter", "warning", "Chapter is empty (the page files it under Uncategorized).")
+def check_empty_chapter(row, options):
+    if not (row.get("chapter") or "").strip():
+        return "chapter", "Chapter is empty."
+    return None
+
+
+@rule("unknown-chapter", "warning", "Chapter isn't one of the canonical chapter names.")
+def check_chapter(row, options):
+    chapter = (row.get("chapter") or "").strip()
+    if not chapter or options.chapters is None or chapter in options.chapters:
+        return None
+    message = f"Chapter {chapter!r} isn't a canonical chapter name."
+    # "700 - ..." and "0700 – ..." usually mean the chapter with that number
+    match = _CHAPTER_NUMBER_RE.match(chapter)
+    if match:
+        number = match.group(1).zfill(4)
+        suggestions = sorted(name for name in options.chapters if name.startswith(number))
+        if len(suggestions) == 1:
+            message += f" Did you mean {suggestions[0]!r}?"
+    return "chapter", message
+
+
+@rule("long-question", "warning", "Question is longer than the configured maximum.")
+def check_question_length(row, options):
+    length = len((row.get("question") or "").strip())
+    if length > options.max_question_length:
+        return "question", f"Question is {length} characters long (maximum {options.max_question_length})."
+    return None
+
+
+@rule("encoding", "error", "Text contains U+FFFD, left by bytes that weren't valid UTF-8.")
+def check_encoding(row, options):
+    for field in HEADERS:
+        if "\ufffd" in (row.get(field) or ""):
+            return field, "Contains U+FFFD: bytes that aren't UTF-8 (the editor can't open such files) or text damaged by an earlier conversion."
+    return None
+
+
+# --- Running rules ---
+
+def split_records(filepath, start, chunk_bytes=CHUNK_BYTES):
+    """Byte offsets cutting filepath[start:] into chunks of about chunk_bytes.
+
+    Cuts go just after a line break with an even number of quote characters
+    before it, which is a record boundary in any well-formed CSV. Stray
+    quotes can fool this; lint_chunk reports a chunk that ends inside a
+    quoted field, and lint_file then checks it again joined with the next.
+    Returns [start, ..., file size].
+    """
+    size = os.path.getsize(filepath)
+    cuts = [start]
+    if size - start <= chunk_bytes:
+        return cuts + [size]
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        pos = start
+        odd = False # odd number of quotes between start and pos
+        target = start + chunk_bytes
+        while target < size:
+            odd ^= data[pos:target].count(b'"') % 2 == 1
+            pos = target
+            while pos < size:
+                end = data.find(b"\n", pos)
+                end = size if end == -1 else end + 1
+                odd ^= data[pos:end].count(b'"') % 2 == 1
+                pos = end
+                if not odd:
+                    break
+            if pos >= size:
+                break
+            cuts.append(pos)
+            target = pos + chunk_bytes
+    cuts.append(size)
+    return cuts
+
+
+def lint_chunk(filepath, start, end, rule_ids, options, last):
+    """Check the records in filepath[start:end] (whole records, see split_records).
+
+    Returns (findings, row count, line count, open_quote). Findings carry
+    row and line numbers counted from 0 at the chunk's start; lint_file
+    makes them absolute. open_quote is True if the chunk ended inside a
+    quoted field; for the last chunk that is itself reported as a finding.
+    """
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8", errors="replace")
+
+    lines_read = 0
+    exhausted = False
+
+    def lines():
+        # Counts lines as csv.reader pulls them; pulling past the end means
+        # the last record was still inside quotes
+        nonlocal lines_read, exhausted
+        for line in io.StringIO(text, newline="\n"):
+            lines_read += 1
+            yield line
+        exhausted = True
+
+    checks = [RULES[rule_id] for rule_id in rule_ids]
+    findings = []
+    rows = 0
+    row_start = 0
+    open_quote = False
+    extra_key = len(HEADERS)
+    for fields in csv.reader(lines()):
+        line = row_start
+        row_start = lines_read
+        if not fields:
+            continue # csv.DictReader skips blank lines too
+        row = dict(zip(HEADERS, fields))
+        if len(fields) > extra_key:
+            row[None] = fields[extra_key:]
+        for field in HEADERS[len(fields):]:
+            row[field] = None
+        for lint_rule in checks:
+            result = lint_rule.check(row, options)
+            if result is None:
+                continue
+            field, message = result if isinstance(result, tuple) else ("", result)
+            findings.append(Finding(rows, line, lint_rule.id, lint_rule.severity, field, message))
+        if exhausted:
+            open_quote = True
+            reported = any(finding.row == rows and finding.rule == "unbalanced-quote" for finding in findings[-len(checks):])
+            if last and "unbalanced-quote" in rule_ids and not reported:
+                findings.append(Finding(rows, line, "unbalanced-quote", "error", "",
+                                        "A quote opened in this row is never closed; the rest of the file was read into it."))
+        rows += 1
+    return findings, rows, text.count("\n"), open_quote
+
+
+def _lint_chunk_task(args):
+    return lint_chunk(*args)
+
+
+def lint_file(filepath, rule_ids=None, options=DEFAULT_OPTIONS, jobs=None, rule_modules=(),
+              chunk_bytes=CHUNK_BYTES):
+    """Lint a bank CSV. Returns (findings sorted by row, number of rows).
+
+    rule_ids selects rules (default: all registered). Chunks are checked in
+    up to `jobs` processes (default: one per CPU); a file that fits in one
+    chunk, or jobs=1, is checked in this process. rule_modules are modules
+    already passed to load_rule_modules(), for the worker processes to
+    load. Raises ValueError on a header mismatch, as loading does.
+    """
+    rule_ids = list(RULES) if rule_ids is None else list(rule_ids)
+    unknown = [rule_id for rule_id in rule_ids if rule_id not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown lint rule(s): {', '.join(unknown)}")
+
+    with open(filepath, "rb") as f:
+        header_line = f.readline()
+    check_headers(next(csv.reader([header_line.decode("utf-8-sig")]), None))
+
+    cuts = split_records(filepath, len(header_line), chunk_bytes)
+    pieces = list(zip(cuts, cuts[1:]))
+    jobs = min(jobs or os.cpu_count() or 1, len(pieces))
+    pool = None
+    if jobs > 1:
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=load_rule_modules, initargs=(list(rule_modules),))
+
+    def check(batch):
+        tasks = [(filepath, start, end, rule_ids, options, end == cuts[-1]) for start, end in batch]
+        if pool is None or len(tasks) == 1:
+            return [lint_chunk(*task) for task in tasks]
+        return list(pool.map(_lint_chunk_task, tasks))
+
+    try:
+        results = check(pieces)
+        while True:
+            # A piece ending inside a quoted field was cut in the wrong place
+            # (stray quotes fool split_records): check it again joined with the
+            # next piece, whose results are meaningless anyway
+            joined, joined_results, redo = [], [], []
+            i = 0
+            while i < len(pieces):
+                if results[i][3] and i + 1 < len(pieces):
+                    redo.append(len(joined))
+                    joined.append((pieces[i][0], pieces[i + 1][1]))
+                    joined_results.append(None)
+                    i += 2
+                else:
+                    joined.append(pieces[i])
+                    joined_results.append(results[i])
+                    i += 1
+            if not redo:
+                break
+            for k, result in zip(redo, check([joined[k] for k in redo])):
+                joined_results[k] = result
+            pieces, results = joined, joined_results
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    findings = []
+    first_row = 0
+    first_line = header_line.count(b"\n") # 0-based line of the first row
+    for chunk_findings, rows, lines, _ in results:
+        findings.extend(finding._replace(row=first_row + finding.row + 1, line=first_line + finding.line + 1)
+                        for finding in chunk_findings)
+        first_row += rows
+        first_line += lines
+    return findings, first_row
+
+
+# --- Reports ---
+
+def report_path_for(csv_path):
+    """Where the lint report for a bank CSV goes: questions.csv -> questions.lint.json."""
+    root, _ = os.path.splitext(csv_path)
+    return root + REPORT_SUFFIX
+
+
+def write_report(path, findings, csv_path, row_count, rule_ids=None):
+    """Write findings as JSON, or as CSV if path ends in .csv.
+
+    A JSON report also records the bank file's size and modification time,
+    so the editor can tell whether the file changed since it was linted.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(REPORT_FIELDS)
+            writer.writerows(findings)
+        return
+    rule_ids = list(RULES) if rule_ids is None else list(rule_ids)
+    report = {
+        "version": 1,
+        "file": os.path.abspath(csv_path),
+        "stamp": list(file_stamp(csv_path)),
+        "rows": row_count,
+        "rules": {rule_id: {"severity": RULES[rule_id].severity, "summary": RULES[rule_id].summary}
+                  for rule_id in rule_ids},
+        "counts": dict(collections.Counter(finding.rule for finding in findings)),
+        "findings": [finding._asdict() for finding in findings],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+
+
+def read_report(path):
+    """(findings, stamp) from a report written by write_report; stamp is None for CSV reports.
+
+    Raises ValueError if the file isn't a lint report.
+    """
+    try:
+        if path.lower().endswith(".csv"):
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                reader = csv.DictReader(f)
+                if reader.fieldnames != REPORT_FIELDS:
+                    raise ValueError(f"Not a lint report (columns {reader.fieldnames})")
+                return [Finding(int(entry["row"]), int(entry["line"]), entry["rule"], entry["severity"],
+                                entry["field"], entry["message"]) for entry in reader], None
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+        findings = [Finding(**{field: entry[field] for field in REPORT_FIELDS}) for entry in report["findings"]]
+        return findings, tuple(report["stamp"]) if report.get("stamp") else None
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Not a lint report: {e}") from e
@@ -0,0 +1,423 @@
+"""Benchmarks for the question bank editor, plus a synthetic bank generator.
+
+Usage:
+    python bench_bank.py generate 100000 big.csv
+    python bench_bank.py run [--sizes 1000,10000,100000] [--gui] [-o bench_output.txt]
+    python bench_bank.py compare old_output.txt bench_output.txt
+
+`run` generates a bank of each size and times, on it:
+    load      reading the CSV and building the search index, as the editor does
+    search    search-as-you-type: one search per keystroke of several terms
+    edit      editing one question (bank update plus search index update)
+    save      saving after each edit (spliced, incremental save)
+    delete    deleting one question, then saving
+and records the process's peak RSS after each step. Each size runs in a fresh
+interpreter so memory from a previous size doesn't count.
+
+By default the GUI-free core (question_bank, question_search) is driven
+directly. With --gui the same steps go through QuestionBankEditor and Tk; that
+needs a display (on a headless machine run it under `xvfb-run`).
+
+Results are JSON lines: a "meta" line describing the run, then one line per
+(size, step). Compare two runs with `compare`, or diff the files.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak memory is then omitted
+    resource = None
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_OUTPUT = "bench_output.txt"
+DEFAULT_SEED = 1234
+# Edit+save and delete+save cycles per size
+DEFAULT_CYCLES = 20
+# Terms typed one character at a time in the search step
+SEARCH_TERM_COUNT = 8
+
+_WORDS = (
+    "applicant patent claim examiner application priority filing amendment office action "
+    "rejection appeal board petition fee small entity micro declaration inventor assignee "
+    "prior art reference obviousness anticipation novelty disclosure specification drawing "
+    "continuation divisional provisional nonprovisional international search report treaty "
+    "reissue reexamination interference derivation terminal disclaimer restriction election "
+    "allowance issue maintenance abandonment revival extension time period month statutory "
+    "practitioner registration power attorney correspondence address signature oath mail "
+    "deposit express certificate transmittal receipt foreign benefit domestic copending "
+    "the a of to in for on with by under within after before must may shall not only any"
+).split()
+
+_CHAPTERS = [
+    f"{code:04d} - {title}" for code, title in (
+        (100, "Secrecy and Access"), (200, "Types and Status of Application"),
+        (300, "Ownership and Assignment"), (400, "Representative of Applicant"),
+        (500, "Receipt and Handling of Mail"), (600, "Parts of Application"),
+        (700, "Examination of Applications"), (800, "Restriction in Applications"),
+        (900, "Prior Art, Classification"), (1000, "Matters Decided by Officials"),
+        (1100, "Statutory Invention Registration"), (1200, "Appeal"),
+        (1300, "Allowance and Issue"), (1400, "Correction of Patents"),
+        (1500, "Design Patents"), (1600, "Plant Patents"),
+        (1700, "Miscellaneous"), (1800, "Patent Cooperation Treaty"),
+        (1900, "Protest"), (2000, "Duty of Disclosure"),
+        (2100, "Patentability"), (2200, "Ex Parte Reexamination"),
+        (2300, "Interference and Derivation"), (2400, "Biotechnology"),
+        (2500, "Maintenance Fees"), (2600, "Optional Inter Partes Reexamination"),
+        (2700, "Patent Terms and Extensions"), (2800, "Supplemental Examination"),
+        (2900, "International Design Applications"), (9000, "Appendices"),
+    )
+]
+
+
+# --- Synthetic banks ---
+
+def _sentence(rng, low, high):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(low, high))]
+    text = " ".join(words).capitalize()
+    # Mix in the awkward CSV cases real banks have: commas, quotes, line breaks
+    roll = rng.random()
+    if roll < 0.05:
+        cut = rng.randrange(1, len(words))
+        text = " ".join(words[:cut]) + ", " + " ".join(words[cut:])
+    elif roll < 0.06:
+        text += ' "' + rng.choice(_WORDS) + '"'
+    elif roll < 0.065:
+        text += "\n" + rng.choice(_WORDS)
+    return text + "."
+
+
+def generate_rows(count, seed=DEFAULT_SEED):
+    """Yield count synthetic bank rows (question/answer/explanation/chapter dicts)."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {
+            "question": _sentence(rng, 12, 40),
+            "answer": rng.choice(("True", "False")),
+            "explanation": _sentence(rng, 15, 60),
+            "chapter": rng.choice(_CHAPTERS),
+        }
+
+
+def generate_bank(path, count, seed=DEFAULT_SEED):
+    """Write a synthetic bank CSV with count rows, formatted as the editor saves banks."""
+    from question_bank import HEADERS
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=HEADERS)
+        writer.writeheader()
+        writer.writerows(generate_rows(count, seed))
+
+
+# --- Measurements ---
+
+def peak_rss_kb():
+    """Peak resident set size of this process so far, in KiB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def summarize(step, size, mode, durations):
+    """Result record for one step: total and per-operation timings in seconds / milliseconds."""
+    ordered = sorted(durations)
+    return {
+        "step": step,
+        "size": size,
+        "mode": mode,
+        "count": len(durations),
+        "seconds": round(sum(durations), 6),
+        "mean_ms": round(statistics.fmean(durations) * 1000, 4),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def typing_sequences(rows, rng, count=SEARCH_TERM_COUNT):
+    """Search terms as typed: every prefix of a few words and short phrases from the bank."""
+    sequences = []
+    for _ in range(count):
+        words = rng.choice(rows)["question"].split()
+        start = rng.randrange(len(words))
+        term = " ".join(words[start:start + rng.randint(1, 2)]).lower().strip(".,\"")
+        sequences.append([term[:i] for i in range(1, len(term) + 1)])
+    return sequences
+
+
+class Timer:
+    """Collects the durations of `with timer:` blocks."""
+
+    def __init__(self):
+        self.durations = []
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.durations.append(time.perf_counter() - self._start)
+        return False
+
+
+def bench_core(path, size, cycles, seed):
+    """Run the steps against QuestionBank and SearchIndex directly; yields result records."""
+    from question_bank import QuestionBank
+    from question_search import SearchIndex
+
+    rng = random.Random(seed)
+    load = Timer()
+    with load:
+        bank = QuestionBank.from_csv(path)
+        index = SearchIndex()
+        index.build(zip(bank.row_ids, bank.questions))
+    yield summarize("load", size, "core", load.durations)
+
+    search = Timer()
+    for sequence in typing_sequences(bank.questions, rng):
+        for term in sequence:
+            with search:
+                [bank.index_of(row_id) for row_id in index.search(term, ("question",))]
+    yield summarize("search", size, "core", search.durations)
+
+    edit, save = Timer(), Timer()
+    for n in range(cycles):
+        i = rng.randrange(len(bank))
+        with edit:
+            bank.update(i, question=bank[i]["question"] + f" (edited {n})")
+            index.update(bank.row_id(i), bank[i])
+        with save:
+            bank.save()
+    yield summarize("edit", size, "core", edit.durations)
+    yield summarize("save", size, "core", save.durations)
+
+    delete = Timer()
+    for _ in range(cycles):
+        i = rng.randrange(len(bank))
+        with delete:
+            index.remove(bank.row_id(i))
+            bank.delete(i)
+            bank.save()
+    yield summarize("delete", size, "core", delete.durations)
+
+
+def bench_gui(path, size, cycles, seed):
+    """Run the steps through QuestionBankEditor; dialogs are answered automatically."""
+    import tkinter as tk
+    import question_bank_tool
+    from question_bank_tool import QuestionBankEditor
+
+    # Answer every confirmation with yes and skip informational popups
+    question_bank_tool.messagebox.askyesno = lambda *args, **kwargs: True
+    for name in ("showinfo", "showwarning", "showerror"):
+        setattr(question_bank_tool.messagebox, name, lambda *args, **kwargs: None)
+    question_bank_tool.filedialog.askopenfilename = lambda *args, **kwargs: path
+
+    root = tk.Tk()
+    editor = QuestionBankEditor(root)
+
+    def settle(busy=lambda: False):
+        # Let Tk process pending events (and background loads/saves) until idle
+        root.update()
+        while busy():
+            time.sleep(0.005)
+            root.update()
+
+    def select(data_index):
+        listbox_index = editor.listbox_to_data_map.index(data_index)
+        editor.question_listbox.selection_clear(0, tk.END)
+        editor.question_listbox.selection_set(listbox_index)
+        editor.on_question_select()
+
+    rng = random.Random(seed)
+    load = Timer()
+    with load:
+        editor.load_csv()
+        settle(editor.is_loading)
+    yield summarize("load", size, "gui", load.durations)
+
+    search = Timer()
+    for sequence in typing_sequences(editor.questions_data, rng):
+        for term in sequence:
+            with search:
+                editor.search_var.set(term)
+                editor.filter_questions()
+                settle()
+    editor.search_var.set("")
+    editor.filter_questions()
+    yield summarize("search", size, "gui", search.durations)
+
+    edit, save = Timer(), Timer()
+    for n in range(cycles):
+        i = rng.randrange(len(editor.questions_data))
+        select(i)
+        with edit:
+            editor.question_text.insert(tk.END, f" (edited {n})")
+            editor.update_current_question_in_memory(explicit_save=True)
+            settle()
+        with save:
+            editor.save_csv_file()
+            settle(editor.is_saving)
+    yield summarize("edit", size, "gui", edit.durations)
+    yield summarize("save", size, "gui", save.durations)
+
+    delete = Timer()
+    for _ in range(cycles):
+        select(rng.randrange(len(editor.questions_data)))
+        with delete:
+            editor.delete_question()
+            editor.save_csv_file()
+            settle(editor.is_saving)
+    yield summarize("delete", size, "gui", delete.durations)
+
+    root.destroy()
+
+
+# --- Commands ---
+
+def run_metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "step": "meta",
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": "gui" if args.gui else "core",
+        "cycles": args.cycles,
+        "seed": args.seed,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def cmd_generate(args):
+    generate_bank(args.output, args.rows, args.seed)
+    print(f"{args.output}: {args.rows} rows, {os.path.getsize(args.output)} bytes")
+    return 0
+
+
+def cmd_run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    records = [run_metadata(args)]
+    with tempfile.TemporaryDirectory(prefix="bench_bank_") as workdir:
+        for size in sizes:
+            path = os.path.join(workdir, f"bank_{size}.csv")
+            generate_bank(path, size, args.seed)
+            # A fresh interpreter per size, so peak memory is per size
+            command = [sys.executable, os.path.abspath(__file__), "run-one", path, str(size),
+                       "--cycles", str(args.cycles), "--seed", str(args.seed)]
+            if args.gui:
+                command.append("--gui")
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(result.stderr, file=sys.stderr)
+                print(f"Benchmark for {size} rows failed.", file=sys.stderr)
+                return 1
+            for line in result.stdout.splitlines():
+                record = json.loads(line)
+                records.append(record)
+                print(f"{record['size']:>9} {record['step']:<7} {record['seconds']:>10.4f}s  "
+                      f"mean {record['mean_ms']:>9.3f} ms  p95 {record['p95_ms']:>9.3f} ms  "
+                      f"peak {record['peak_rss_kb']} KiB")
+            os.remove(path)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, sort_keys=True) + "\n")
+    print(f"Wrote {args.output}")
+    return 0
+
+
+def cmd_run_one(args):
+    bench = bench_gui if args.gui else bench_core
+    for record in bench(args.csv, args.size, args.cycles, args.seed):
+        print(json.dumps(record, sort_keys=True), flush=True)
+    return 0
+
+
+def read_results(path):
+    results = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("step") != "meta":
+                results[(record["mode"], record["size"], record["step"])] = record
+    return results
+
+
+def cmd_compare(args):
+    old, new = read_results(args.old), read_results(args.new)
+    exit_code = 0
+    print(f"{'mode':<5} {'size':>9} {'step':<7} {'old mean ms':>12} {'new mean ms':>12} {'ratio':>7}")
+    for key in sorted(old.keys() & new.keys()):
+        old_ms, new_ms = old[key]["mean_ms"], new[key]["mean_ms"]
+        ratio = new_ms / old_ms if old_ms else float("inf")
+        flag = ""
+        if args.fail_above and ratio > args.fail_above:
+            flag = "  REGRESSION"
+            exit_code = 1
+        print(f"{key[0]:<5} {key[1]:>9} {key[2]:<7} {old_ms:>12.3f} {new_ms:>12.3f} {ratio:>7.2f}{flag}")
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:<5} {key[1]:>9} {key[2]:<7} only in {'old' if key in old else 'new'} results")
+    return exit_code
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Question bank editor benchmarks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("generate", help="Write a synthetic bank CSV.")
+    p.add_argument("rows", type=int, help="Number of questions.")
+    p.add_argument("output", help="CSV path to write.")
+    p.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    p.set_defaults(func=cmd_generate)
+
+    p = subparsers.add_parser("run", help="Benchmark the editor on synthetic banks of several sizes.")
+    p.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                   help="Comma-separated bank sizes (default: %(default)s).")
+    p.add_argument("--cycles", type=int, default=DEFAULT_CYCLES, help="Edit+save and delete cycles per size.")
+    p.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    p.add_argument("--gui", action="store_true", help="Drive QuestionBankEditor through Tk (needs a display).")
+    p.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="Results file (default: %(default)s).")
+    p.set_defaults(func=cmd_run)
+
+    # Used by `run` to benchmark one size in a fresh interpreter
+    p = subparsers.add_parser("run-one")
+    p.add_argument("csv")
+    p.add_argument("size", type=int)
+    p.add_argument("--cycles", type=int, default=DEFAULT_CYCLES)
+    p.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    p.add_argument("--gui", action="store_true")
+    p.set_defaults(func=cmd_run_one)
+
+    p = subparsers.add_parser("compare", help="Compare two results files.")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--fail-above", type=float, metavar="RATIO",
+                   help="Exit with status 1 if any step's mean time grew by more than this factor.")
+    p.set_defaults(func=cmd_compare)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
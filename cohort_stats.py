@@ -0,0 +1,384 @@
+"""Per-question difficulty worked out from learners' exported quiz progress.
+
+The quiz page keeps each learner's progress in their browser. The
+Statistics tab's "Export Progress" button downloads it as JSON:
+
+    {"format": "patentbar-progress", "version": 1, "learner": "<random id>",
+     "exported": "<ISO time>",
+     "questions": [{"id": "h-...", "answers": N, "misses": N, "lastSeen": "..."}, ...],
+     "chapters": {"<chapter>": {"correct": N, "total": N}, ...}}
+
+Collect those files from a class or study group and run
+
+    python bank_cli.py analyze questions.csv exports/
+
+to find the questions learners struggle with. Every export is flattened
+into four columns (learner, question, answers, misses), one entry per
+question a learner answered, and each figure is a NumPy reduction over
+those columns:
+
+    miss_rate         misses / answers, over all learners
+    discrimination    upper-lower index: the share of right answers among the
+                      27% of learners with the best overall accuracy, minus
+                      that among the 27% with the worst. Near zero or below
+                      means knowing the material doesn't help with the
+                      question (ambiguous, or the answer is wrong). None
+                      when either group never answered it.
+    chapter_accuracy  correct / total for the question's chapter, summed
+                      over the exports' chapter statistics
+
+Questions are matched by the ids the page gives them (a hash of their text,
+see bank_bundle.question_id); progress on questions no longer in the bank
+is counted as unmatched. When several exports come from one browser, only
+the newest is used.
+
+The figures go to a sidecar next to the bank (questions.csv ->
+questions.stats.json), one list per column, which the question bank tool
+loads to sort and filter its list:
+
+    {"format": 1, "file": "...", "stamp": [size, mtime_ns], "exports": N,
+     "learners": N, "unmatched": N,
+     "chapters": {"<chapter>": {"correct": N, "total": N, "accuracy": F}},
+     "questions": {"row": [...], "id": [...], "learners": [...], "answers": [...],
+                   "miss_rate": [...], "discrimination": [...], "chapter_accuracy": [...]}}
+
+"row" is the 1-based row in the bank as analyzed. "stamp" is the bank
+file's size and modification time, so the editor can tell whether rows
+moved since; if so it matches questions by id instead.
+
+Analyzing needs NumPy; reading a sidecar doesn't. This module must not
+import tkinter.
+"""
+import collections
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:  # reported by bank_cli.py analyze; only analyzing needs it
+    np = None
+
+from bank_bundle import DEFAULT_CHAPTER, assign_question_ids, id_text, is_valid_row
+from question_bank import file_stamp
+
+EXPORT_FORMAT = "patentbar-progress"
+EXPORT_VERSION = 1
+STATS_FORMAT = 1
+STATS_SUFFIX = ".stats.json"
+# Share of learners in each of the top and bottom groups of the discrimination index
+GROUP_FRACTION = 0.27
+# Learners with fewer answers than this aren't ranked for the discrimination index
+DEFAULT_MIN_LEARNER_ANSWERS = 20
+
+STATS_COLUMNS = ["row", "id", "learners", "answers", "miss_rate", "discrimination", "chapter_accuracy"]
+
+# Figures for one question, as the sidecar stores them:
+#   row               1-based row in the bank as analyzed
+#   id                the page's id for the question
+#   learners          learners who answered it
+#   answers           answers from all of them
+#   miss_rate         share of those answers that were wrong
+#   discrimination    upper-lower discrimination index, or None
+#   chapter_accuracy  accuracy over the question's chapter, or None
+QuestionStats = collections.namedtuple("QuestionStats", STATS_COLUMNS)
+
+# Every export's answered questions as parallel columns, one entry per
+# learner and question:
+#   learner, question  learner number and bank question number of the entry
+#   answers, misses    the learner's answers to and misses of the question
+# plus what was read: exports (files), learners (newest export of each),
+# superseded (older exports from a browser that exported again),
+# unmatched (entries for questions not in the bank), and chapters
+# ({chapter: [correct, total]} summed over the learners).
+ProgressColumns = collections.namedtuple(
+    "ProgressColumns",
+    "learner question answers misses exports learners superseded unmatched chapters"
+)
+
+
+def stats_path_for(csv_path):
+    """Where the figures for a bank CSV go: questions.csv -> questions.stats.json."""
+    root, _ = os.path.splitext(csv_path)
+    return root + STATS_SUFFIX
+
+
+# --- Question ids ---
+
+def _imul(a, b):
+    # JavaScript's Math.imul on arrays of unsigned 32-bit values (held in uint64)
+    return (a * np.uint64(b)) & np.uint64(0xFFFFFFFF)
+
+
+def text_hashes(texts):
+    """bank_bundle.text_hash of every text, computed for all of them at once.
+
+    The texts' UTF-16 code units are laid end to end and sorted by length,
+    so step k of the hash runs on the prefix of texts longer than k.
+    """
+    encoded = [text.encode("utf-16-le") for text in texts]
+    count = len(encoded)
+    lengths = np.fromiter((len(data) // 2 for data in encoded), dtype=np.int64, count=count)
+    units = np.frombuffer(b"".join(encoded), dtype=np.uint16).astype(np.uint64)
+    order = np.argsort(-lengths, kind="stable")
+    starts = (np.cumsum(lengths) - lengths)[order]
+    # Texts still going at step k: those longer than k, a prefix of the sorted order
+    descending = lengths[order]
+    active = np.searchsorted(-descending, -np.arange(descending[0] if count else 0), side="left")
+
+    h1 = np.full(count, 0xDEADBEEF, dtype=np.uint64)
+    h2 = np.full(count, 0x41C6CE57, dtype=np.uint64)
+    for k, n in enumerate(active):
+        ch = units[starts[:n] + k]
+        h1[:n] = _imul(h1[:n] ^ ch, 2654435761)
+        h2[:n] = _imul(h2[:n] ^ ch, 1597334677)
+    h1 = _imul(h1 ^ (h1 >> np.uint64(16)), 2246822507)
+    h1 ^= _imul(h2 ^ (h2 >> np.uint64(13)), 3266489909)
+    h2 = _imul(h2 ^ (h2 >> np.uint64(16)), 2246822507)
+    h2 ^= _imul(h1 ^ (h1 >> np.uint64(13)), 3266489909)
+    hashes = np.empty(count, dtype=np.uint64)
+    hashes[order] = (h2 & np.uint64(2097151)) * np.uint64(4294967296) + h1
+    return hashes
+
+
+def question_ids(texts):
+    """bank_bundle.assign_question_ids of texts; vectorized when NumPy is installed."""
+    if np is None:
+        return assign_question_ids(texts)
+    hashes = text_hashes([id_text(text) for text in texts])
+    seen = {}
+    ids = []
+    for value in hashes.tolist():
+        base = "h-%014x" % value
+        seen[base] = seen.get(base, 0) + 1
+        ids.append(base if seen[base] == 1 else f"{base}-{seen[base]}")
+    return ids
+
+
+def bank_question_ids(rows):
+    """{page id: bank row index} for the rows the page shows (it skips invalid ones)."""
+    kept = [index for index, row in enumerate(rows) if is_valid_row(row)]
+    ids = question_ids([rows[index]["question"] for index in kept])
+    return dict(zip(ids, kept))
+
+
+# --- Progress exports ---
+
+def export_paths(paths):
+    """The export files named by paths; directories stand for the .json files anywhere under them."""
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for directory, subdirectories, names in os.walk(path):
+            subdirectories.sort()
+            found.extend(os.path.join(directory, name) for name in sorted(names) if name.lower().endswith(".json"))
+    return found
+
+
+def read_export(path):
+    """The progress export at path. Raises ValueError if it isn't one."""
+    with open(path, "rb") as f:
+        try:
+            export = json.loads(f.read().decode("utf-8"))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise ValueError(f"Not a progress export: {e}") from e
+    if not isinstance(export, dict) or export.get("format") != EXPORT_FORMAT:
+        raise ValueError("Not a progress export")
+    if export.get("version") != EXPORT_VERSION:
+        raise ValueError(f"Unsupported progress export version {export.get('version')!r}")
+    if not isinstance(export.get("questions"), list):
+        raise ValueError("Progress export has no question list")
+    return export
+
+
+def load_progress(paths, question_index, id_map=None, on_error=None):
+    """ProgressColumns of the exports at paths.
+
+    question_index maps page ids to bank question numbers (bank_question_ids).
+    id_map maps ids the page used before questions were edited or moved to
+    current ones (a bundle's "id_map"). Files that can't be read are passed
+    to on_error(path, error) and skipped; without on_error they raise.
+    """
+    id_map = id_map or {}
+    # Newest export of each browser; exports without a learner id all count
+    newest = {}
+    superseded = 0
+    for path in paths:
+        try:
+            export = read_export(path)
+        except (OSError, ValueError) as e:
+            if on_error is None:
+                raise
+            on_error(path, e)
+            continue
+        key = export.get("learner") or path
+        previous = newest.get(key)
+        if previous is not None:
+            superseded += 1
+            if str(previous.get("exported", "")) > str(export.get("exported", "")):
+                continue
+        newest[key] = export
+
+    learner_column, question_column, answer_column, miss_column = [], [], [], []
+    unmatched = 0
+    chapters = {}
+    for learner, export in enumerate(newest.values()):
+        for entry in export["questions"]:
+            try:
+                question_id = entry["id"]
+                misses = max(int(entry.get("misses") or 0), 0)
+                answers = max(int(entry.get("answers") or 0), misses)
+            except (KeyError, TypeError, ValueError):
+                continue
+            question = question_index.get(id_map.get(question_id, question_id))
+            if question is None:
+                unmatched += 1
+                continue
+            if answers:
+                learner_column.append(learner)
+                question_column.append(question)
+                answer_column.append(answers)
+                miss_column.append(misses)
+        for name, figures in (export.get("chapters") or {}).items():
+            try:
+                correct, total = int(figures["correct"]), int(figures["total"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if total > 0:
+                totals = chapters.setdefault(name, [0, 0])
+                totals[0] += min(correct, total)
+                totals[1] += total
+
+    return ProgressColumns(
+        learner=np.array(learner_column, dtype=np.int64),
+        question=np.array(question_column, dtype=np.int64),
+        answers=np.array(answer_column, dtype=np.int64),
+        misses=np.array(miss_column, dtype=np.int64),
+        exports=len(newest) + superseded,
+        learners=len(newest),
+        superseded=superseded,
+        unmatched=unmatched,
+        chapters=chapters,
+    )
+
+
+# --- Figures ---
+
+def question_figures(progress, question_count, min_learner_answers=DEFAULT_MIN_LEARNER_ANSWERS):
+    """Per-question arrays (learners, answers, miss_rate, discrimination) over the progress columns.
+
+    Rates are NaN for questions nobody answered, and discrimination also
+    where the top or bottom group didn't answer it.
+    """
+    question, learner = progress.question, progress.learner
+    answers, misses = progress.answers, progress.misses
+    correct = answers - misses
+    learners = np.bincount(question, minlength=question_count)
+    answer_totals = np.bincount(question, weights=answers, minlength=question_count)
+    miss_totals = np.bincount(question, weights=misses, minlength=question_count)
+
+    # Rank learners with enough answers by their overall accuracy
+    learner_answers = np.bincount(learner, weights=answers, minlength=progress.learners)
+    learner_correct = np.bincount(learner, weights=correct, minlength=progress.learners)
+    ranked = np.flatnonzero(learner_answers >= max(min_learner_answers, 1))
+    ranked = ranked[np.argsort(learner_correct[ranked] / learner_answers[ranked], kind="stable")]
+    group_size = int(len(ranked) * GROUP_FRACTION)
+    group = np.zeros(progress.learners, dtype=np.int8)
+    if group_size:
+        group[ranked[:group_size]] = -1
+        group[ranked[-group_size:]] = 1
+    entry_group = group[learner]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        miss_rate = miss_totals / answer_totals
+        shares = []
+        for member in (1, -1):
+            chosen = entry_group == member
+            group_answers = np.bincount(question[chosen], weights=answers[chosen], minlength=question_count)
+            group_correct = np.bincount(question[chosen], weights=correct[chosen], minlength=question_count)
+            shares.append(group_correct / group_answers)
+    discrimination = shares[0] - shares[1]
+    return learners, answer_totals.astype(np.int64), miss_rate, discrimination
+
+
+def chapter_accuracy(chapters):
+    """{chapter: accuracy} from summed [correct, total] pairs."""
+    return {name: correct / total for name, (correct, total) in chapters.items() if total}
+
+
+def analyze(csv_path, rows, paths, id_map=None, min_learner_answers=DEFAULT_MIN_LEARNER_ANSWERS, on_error=None):
+    """The sidecar dict (see the module docstring) for bank rows read from csv_path and exports at paths."""
+    question_index = bank_question_ids(rows)
+    progress = load_progress(paths, question_index, id_map, on_error)
+    learners, answers, miss_rate, discrimination = question_figures(progress, len(rows), min_learner_answers)
+    accuracy = chapter_accuracy(progress.chapters)
+
+    ids = [None] * len(rows)
+    for question_id, index in question_index.items():
+        ids[index] = question_id
+    answered = np.flatnonzero(answers).tolist()
+
+    def rounded(values):
+        # NaN (no figure) is stored as null
+        return [None if value != value else round(value, 4) for value in values[answered].tolist()]
+
+    chapter_column = []
+    for index in answered:
+        value = accuracy.get(rows[index].get("chapter") or DEFAULT_CHAPTER)
+        chapter_column.append(None if value is None else round(value, 4))
+    return {
+        "format": STATS_FORMAT,
+        "file": os.path.abspath(csv_path),
+        "stamp": list(file_stamp(csv_path)),
+        "exports": progress.exports,
+        "learners": progress.learners,
+        "superseded": progress.superseded,
+        "unmatched": progress.unmatched,
+        "chapters": {name: {"correct": correct, "total": total, "accuracy": round(accuracy[name], 4)}
+                     for name, (correct, total) in sorted(progress.chapters.items())},
+        "questions": {
+            "row": [index + 1 for index in answered],
+            "id": [ids[index] for index in answered],
+            "learners": learners[answered].tolist(),
+            "answers": answers[answered].tolist(),
+            "miss_rate": rounded(miss_rate),
+            "discrimination": rounded(discrimination),
+            "chapter_accuracy": chapter_column,
+        },
+    }
+
+
+# --- Sidecar ---
+
+def write_stats(path, stats):
+    """Write a sidecar dict from analyze()."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def question_stats(stats):
+    """The QuestionStats of a sidecar dict. Raises ValueError if it isn't one."""
+    try:
+        if stats.get("format") != STATS_FORMAT:
+            raise ValueError(f"Unsupported question statistics format {stats.get('format')!r}")
+        columns = [stats["questions"][name] for name in STATS_COLUMNS]
+    except (AttributeError, KeyError, TypeError) as e:
+        raise ValueError(f"Not a question statistics file: {e}") from e
+    if len({len(column) for column in columns}) > 1:
+        raise ValueError("Question statistics columns differ in length")
+    return [QuestionStats(*values) for values in zip(*columns)]
+
+
+def read_stats(path):
+    """(list of QuestionStats, stamp) from a sidecar written by write_stats.
+
+    Raises ValueError if the file isn't one.
+    """
+    with open(path, encoding="utf-8") as f:
+        try:
+            stats = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"Not a question statistics file: {e}") from e
+    entries = question_stats(stats)
+    return entries, tuple(stats.get("stamp") or ()) or None
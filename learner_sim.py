@@ -0,0 +1,468 @@
+"""Headless learner simulator for the quiz page's question scheduling.
+
+Usage:
+    python learner_sim.py run questions.csv [--learners 1000] [--days 60] [--schedulers page,no-spaced] [--mastery 2,3]
+    python learner_sim.py compare old_sim_output.txt sim_output.txt [--fail-above 1.5]
+
+The page picks questions with getNextQuestionIndex (in order until every
+question has been answered once, then weighted draws in endless mode),
+reorders them with prioritizeWrongAnswers when a quiz starts, and counts a
+missed question as mastered after 3 correct answers. This module replays
+those rules against a bank loaded with the editor's CSV code, for a whole
+cohort of synthetic learners at once: every learner's state is a row of
+NumPy arrays, and each simulated answer updates all rows together.
+
+Learners are modelled as:
+    ability      per learner, and difficulty per question, both N(0, 1)
+    recall       chance of knowing the answer: starts at
+                 sigmoid(ability - difficulty - PRIOR_OFFSET), moves LEARN_RATE
+                 of the way to 1 with every answer (the explanation is shown
+                 either way), then decays back towards the start with a
+                 half-life that doubles with each correct answer and resets
+                 on a wrong one
+    answering    correct with chance recall + (1 - recall) / 2, since a
+                 True/False question can be guessed
+
+Each learner does one session a day of --answers answers, SECONDS_PER_ANSWER
+apart, and picks up where they left off (as the page does with "Save
+progress"); --restart starts a new quiz every session instead.
+
+`run` prints, for each scheduler variant and mastery threshold:
+    to mastery   median and 90th percentile of the answers a learner gave
+                 between first missing a question and mastering it, and the
+                 share of missed questions mastered by the end
+    recall       mean recall over the bank after the last day
+    cost         scheduling time per simulated answer, in microseconds
+and writes them as JSON lines (default sim_output.txt) that `compare`
+checks against an earlier run.
+
+Needs NumPy. This module must not import tkinter.
+"""
+import argparse
+import collections
+import json
+import os
+import platform
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # reported by main(); nothing here works without it
+    np = None
+
+from question_bank import QuestionBank
+
+DEFAULT_OUTPUT = "sim_output.txt"
+DEFAULT_SEED = 1234
+DEFAULT_LEARNERS = 1000
+DEFAULT_DAYS = 60
+DEFAULT_ANSWERS = 40
+# Correct answers the page requires before a missed question counts as mastered
+DEFAULT_MASTERY = 3
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+# Simulated clock start (Unix seconds); the page treats a time of 0 as missing
+START_TIME = 1_700_000_000
+SECONDS_PER_ANSWER = 20
+
+# Learner model (see the module docstring)
+PRIOR_OFFSET = 1.0
+LEARN_RATE = 0.3
+HALF_LIFE_DAYS = 2.0
+HALF_LIFE_GAIN = 2.0
+GUESS = 0.5
+
+
+class Cohort:
+    """Every learner's scheduling state (as the page keeps it) and recall, one row per learner."""
+
+    def __init__(self, learners, questions, mastery, rng):
+        shape = (learners, questions)
+        self.mastery = mastery
+        # The page's wrong-answer entries and per-question fields; times in seconds, NaN if never
+        self.wrong = np.zeros(shape, bool)
+        self.miss = np.zeros(shape, np.int32)
+        self.correct = np.zeros(shape, np.int32)
+        self.corrected = np.zeros(shape, bool)
+        self.last_missed = np.full(shape, np.nan)
+        self.last_seen = np.full(shape, np.nan)
+
+        ability = rng.standard_normal(learners)[:, None]
+        difficulty = rng.standard_normal(questions)[None, :]
+        self.prior = 1 / (1 + np.exp(difficulty - ability + PRIOR_OFFSET))
+        # Recall right after the last answer, and how fast it fades since
+        self.strength = self.prior.copy()
+        self.half_life = np.full(shape, HALF_LIFE_DAYS * DAY)
+
+        # Answers given so far (the same for every learner), and for each
+        # question the answer count at its first miss and its answers to mastery
+        self.answers = 0
+        self.first_miss = np.full(shape, -1, np.int32)
+        self.to_mastery = np.full(shape, -1, np.int32)
+        self.correct_answers = 0
+
+    @property
+    def learners(self):
+        return self.wrong.shape[0]
+
+    def recall(self, now, rows=slice(None), cols=slice(None)):
+        """Recall of each learner's question at time now (all questions by default)."""
+        prior = self.prior[rows, cols]
+        elapsed = now - self.last_seen[rows, cols]
+        faded = prior + (self.strength[rows, cols] - prior) * np.exp2(-elapsed / self.half_life[rows, cols])
+        return np.where(np.isnan(elapsed), prior, faded)
+
+    def answer(self, cols, now, rng):
+        """Each learner answers question cols[learner] at time now; updates the page's state and recall."""
+        rows = np.arange(self.learners)
+        recall = self.recall(now, rows, cols)
+        right = rng.random(self.learners) < recall + (1 - recall) * GUESS
+        self.correct_answers += int(right.sum())
+
+        # checkAnswer: a correct answer counts towards mastering a missed question...
+        hit = right & self.wrong[rows, cols]
+        correct = self.correct[rows, cols] + hit
+        self.correct[rows, cols] = correct
+        mastered = hit & ~self.corrected[rows, cols] & (correct >= self.mastery)
+        self.corrected[rows[mastered], cols[mastered]] = True
+        first = mastered & (self.to_mastery[rows, cols] < 0)
+        self.to_mastery[rows[first], cols[first]] = self.answers - self.first_miss[rows[first], cols[first]]
+
+        # ...and a wrong one starts over
+        missed = ~right
+        r, c = rows[missed], cols[missed]
+        self.miss[r, c] += 1
+        self.wrong[r, c] = True
+        self.corrected[r, c] = False
+        self.correct[r, c] = 0
+        self.last_missed[r, c] = now
+        new = self.first_miss[r, c] < 0
+        self.first_miss[r[new], c[new]] = self.answers
+
+        self.strength[rows, cols] = recall + LEARN_RATE * (1 - recall)
+        self.half_life[rows, cols] = np.where(right, self.half_life[rows, cols] * HALF_LIFE_GAIN, HALF_LIFE_DAYS * DAY)
+        # displayCurrentQuestion stamps lastSeen as the question is shown
+        self.last_seen[rows, cols] = now
+        self.answers += 1
+
+
+# --- Scheduler variants ---
+
+def bank_order(cohort, rng):
+    """Bank order, as the page starts a quiz without shuffle or spaced repetition."""
+    return np.broadcast_to(np.arange(cohort.wrong.shape[1]), cohort.wrong.shape)
+
+
+def shuffled_order(cohort, rng):
+    """A fresh random order per learner (shuffle mode)."""
+    return rng.permuted(bank_order(cohort, rng), axis=1)
+
+
+def priority_order(cohort, rng):
+    """prioritizeWrongAnswers (priorityOrder in the page) for every learner at once.
+
+    Missed questions not yet mastered come first: most correct answers still
+    needed, then most misses, then most recently missed. The rest follow by
+    miss count. Ties keep bank order, as the page's stable sort does.
+    """
+    pending = cohort.wrong & ~cohort.corrected
+    remaining = np.where(pending, cohort.mastery - cohort.correct, 0)
+    pending_miss = np.where(pending, cohort.miss, 0)
+    last_missed = np.where(pending, np.nan_to_num(cohort.last_missed), 0)
+    position = bank_order(cohort, rng)
+    # np.lexsort sorts by the last key first
+    return np.lexsort((position, -cohort.miss, -last_missed, -pending_miss, -remaining, -pending.astype(np.int8)), axis=1)
+
+
+def uniform_weights(cohort, now, rows=slice(None), cols=slice(None)):
+    """Endless mode with spaced repetition off: every question equally likely, for good."""
+    shape = np.shape(cohort.wrong[rows, cols])
+    return np.ones(shape), np.full(shape, np.inf)
+
+
+def spaced_weights(cohort, now, rows=slice(None), cols=slice(None)):
+    """endlessQuestionWeight with spaced repetition on, for the given learners' questions (default all).
+
+    Returns (weight, expires): expires is when the weight changes just
+    because time passed (inf if it won't).
+    """
+    wrong = cohort.wrong[rows, cols]
+    correct = cohort.correct[rows, cols]
+    last_missed = cohort.last_missed[rows, cols]
+    last_seen = cohort.last_seen[rows, cols]
+    weight = 1 + np.where(wrong, np.maximum(cohort.miss[rows, cols], 1) * 8, 0)
+    expires = np.full(weight.shape, np.inf)
+    # Missed in the last day or week (NaN compares false, so never-missed get nothing)
+    with np.errstate(invalid="ignore"):
+        days_since_miss = (now - last_missed) / DAY
+        day = wrong & (days_since_miss < 1)
+        week = wrong & ~day & (days_since_miss < 7)
+        recent = ~wrong & ((now - last_seen) / HOUR < 0.5)
+    weight = weight + np.where(day, 5, np.where(week, 3, 0))
+    expires = np.where(day, last_missed + DAY, np.where(week, last_missed + 7 * DAY, expires))
+    remaining = cohort.mastery - correct
+    pending = wrong & ~cohort.corrected[rows, cols] & (remaining > 0)
+    weight = weight + np.where(pending, remaining * 4, 0)
+    weight = weight * np.where(pending & (correct > 0), 1.5, 1) * np.where(recent, 0.5, 1)
+    expires = np.where(recent, np.minimum(expires, last_seen + HOUR / 2), expires)
+    return np.maximum(weight, 0.5), expires
+
+
+class EndlessSchedule:
+    """Every learner's endless-mode draw weights, kept up to date cell by cell.
+
+    Like the page's sampler, only the question just answered and weights
+    whose time ran out are reweighed. Draws pick a block of BLOCK questions
+    by its weight sum, then a question within it, so they cost O(learners *
+    (questions / BLOCK + BLOCK)) rather than a pass over every weight.
+    """
+    BLOCK = 32
+
+    def __init__(self, cohort, weigh, now):
+        self.weigh = weigh
+        learners, questions = cohort.wrong.shape
+        blocks = -(-questions // self.BLOCK)
+        # Padding columns past the last question weigh 0 and never expire
+        self.weights = np.zeros((learners, blocks * self.BLOCK))
+        self.expires = np.full(self.weights.shape, np.inf)
+        self.weights[:, :questions], self.expires[:, :questions] = weigh(cohort, now)
+        self.block_sums = self.weights.reshape(learners, blocks, self.BLOCK).sum(axis=2)
+
+    def update(self, cohort, rows, cols, now):
+        """Reweigh question cols[k] of learner rows[k], for every k."""
+        self.weights[rows, cols], self.expires[rows, cols] = self.weigh(cohort, now, rows, cols)
+        # Summed afresh rather than adjusted, so rounding errors can't build up
+        blocks = cols // self.BLOCK
+        block_weights = self.weights.reshape(self.block_sums.shape + (self.BLOCK,))
+        self.block_sums[rows, blocks] = block_weights[rows, blocks].sum(axis=1)
+
+    def refresh(self, cohort, now):
+        """Reweigh the questions whose recency boost or penalty has run out."""
+        rows, cols = np.nonzero(self.expires <= now)
+        if len(rows):
+            self.update(cohort, rows, cols, now)
+
+    def draw(self, current, rng):
+        """One weighted draw per learner, never the learner's current question."""
+        rows = np.arange(self.weights.shape[0])
+        sums = self.block_sums.copy()
+        current_block = current // self.BLOCK
+        sums[rows, current_block] -= self.weights[rows, current]
+        cumulative = np.cumsum(sums, axis=1)
+        target = rng.random(len(rows)) * cumulative[:, -1]
+        block = np.minimum((cumulative <= target[:, None]).sum(axis=1), sums.shape[1] - 1)
+        target -= cumulative[rows, block] - sums[rows, block]
+
+        columns = block[:, None] * self.BLOCK + np.arange(self.BLOCK)
+        weights = self.weights[rows[:, None], columns]
+        weights[columns == current[:, None]] = 0
+        cumulative = np.cumsum(weights, axis=1)
+        picked = (cumulative <= target[:, None]).sum(axis=1)
+        # Rounding can leave target at the block's total; take its last question that can be drawn
+        last = self.BLOCK - 1 - np.argmax(weights[:, ::-1] > 0, axis=1)
+        return block * self.BLOCK + np.minimum(picked, last)
+
+
+# A scheduler variant: order(cohort, rng) gives each learner's question order
+# when a quiz starts, as a (learners, questions) array of question indexes;
+# weights(cohort, now, rows, cols) gives endless-mode draw weights and when
+# they expire (see spaced_weights), for all questions or the given cells.
+Scheduler = collections.namedtuple("Scheduler", "name summary order weights")
+
+SCHEDULERS = {
+    "page": Scheduler("page", "The page with repeat and spaced repetition on.", priority_order, spaced_weights),
+    "no-spaced": Scheduler("no-spaced", "Repeat on, spaced repetition off: bank order, then uniform draws.",
+                           bank_order, uniform_weights),
+    "shuffle": Scheduler("shuffle", "Repeat and shuffle on, spaced repetition off.", shuffled_order, uniform_weights),
+}
+
+
+# --- Simulation ---
+
+def simulate(questions, scheduler, learners=DEFAULT_LEARNERS, days=DEFAULT_DAYS, answers=DEFAULT_ANSWERS,
+             mastery=DEFAULT_MASTERY, seed=DEFAULT_SEED, restart=False):
+    """Run one cohort through days of sessions; returns the result record."""
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    cohort = Cohort(learners, questions, mastery, rng)
+    scheduling = 0.0
+    rows = np.arange(learners)
+    order = None
+    schedule = None
+    position = 0 # answeredCount: the first pass goes through order, then endless mode draws
+    current = None
+    now = START_TIME
+    for day in range(days):
+        now = START_TIME + day * DAY
+        if order is None or restart:
+            tick = time.perf_counter()
+            order = scheduler.order(cohort, rng)
+            scheduling += time.perf_counter() - tick
+            position = 0
+            schedule = None
+            current = None
+        for _ in range(answers):
+            tick = time.perf_counter()
+            if position < questions:
+                current = order[:, position]
+            elif schedule is None:
+                schedule = EndlessSchedule(cohort, scheduler.weights, now)
+                current = schedule.draw(current, rng)
+            else:
+                # getNextQuestionIndex: reweigh the question just answered and expired weights, then draw
+                schedule.update(cohort, rows, current, now)
+                schedule.refresh(cohort, now)
+                current = schedule.draw(current, rng)
+            scheduling += time.perf_counter() - tick
+            cohort.answer(current, now, rng)
+            position += 1
+            now += SECONDS_PER_ANSWER
+
+    missed = cohort.first_miss >= 0
+    to_mastery = cohort.to_mastery[cohort.to_mastery >= 0]
+    total_answers = learners * days * answers
+    return {
+        "scheduler": scheduler.name,
+        "mastery": mastery,
+        "questions": questions,
+        "learners": learners,
+        "days": days,
+        "answers": answers,
+        "restart": restart,
+        "accuracy": round(cohort.correct_answers / total_answers, 4),
+        "missed": int(missed.sum()),
+        "mastered_share": round(len(to_mastery) / max(int(missed.sum()), 1), 4),
+        "to_mastery_p50": float(np.median(to_mastery)) if len(to_mastery) else None,
+        "to_mastery_p90": float(np.percentile(to_mastery, 90)) if len(to_mastery) else None,
+        "recall": round(float(cohort.recall(now).mean()), 4),
+        "schedule_us": round(scheduling / total_answers * 1e6, 4),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def load_question_count(csv_path, chapter=None):
+    """Number of questions the page would quiz from a bank (optionally one chapter)."""
+    bank = QuestionBank.from_csv(csv_path)
+    return sum(1 for row in bank if row["question"].strip() and (chapter is None or row["chapter"] == chapter))
+
+
+# --- Commands ---
+
+def cmd_run(args):
+    try:
+        questions = load_question_count(args.csv, args.chapter)
+    except (OSError, ValueError) as e:
+        print(f"{args.csv}: error: {e}", file=sys.stderr)
+        return 1
+    if questions < 2:
+        print(f"{args.csv}: error: need at least 2 questions to schedule, found {questions}", file=sys.stderr)
+        return 1
+    names = args.schedulers.split(",")
+    unknown = [name for name in names if name not in SCHEDULERS]
+    if unknown:
+        print(f"error: unknown scheduler(s) {', '.join(unknown)} (available: {', '.join(SCHEDULERS)})", file=sys.stderr)
+        return 2
+
+    records = [{
+        "step": "meta",
+        "bank": os.path.basename(args.csv),
+        "chapter": args.chapter,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }]
+    print(f"{args.learners} learners, {questions} questions, {args.days} days of {args.answers} answers")
+    print(f"{'scheduler':<10} {'mastery':>7} {'accuracy':>8} {'to mastery p50':>14} {'p90':>6} "
+          f"{'mastered':>8} {'recall':>6} {'cost us':>8}")
+    for name in names:
+        for mastery in (int(m) for m in args.mastery.split(",")):
+            record = simulate(questions, SCHEDULERS[name], args.learners, args.days, args.answers,
+                              mastery, args.seed, args.restart)
+            record["step"] = "sim"
+            records.append(record)
+            print(f"{name:<10} {mastery:>7} {record['accuracy']:>8.1%} {record['to_mastery_p50'] or 0:>14.0f} "
+                  f"{record['to_mastery_p90'] or 0:>6.0f} {record['mastered_share']:>8.1%} "
+                  f"{record['recall']:>6.1%} {record['schedule_us']:>8.2f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, sort_keys=True) + "\n")
+    print(f"Wrote {args.output}")
+    return 0
+
+
+def read_results(path):
+    results = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("step") != "meta":
+                key = (record["scheduler"], record["mastery"], record["questions"], record["learners"])
+                results[key] = record
+    return results
+
+
+def cmd_compare(args):
+    old, new = read_results(args.old), read_results(args.new)
+    exit_code = 0
+    print(f"{'scheduler':<10} {'mastery':>7} {'p50 old':>7} {'new':>5} {'recall old':>10} {'new':>6} "
+          f"{'cost old us':>11} {'new':>8} {'ratio':>6}")
+    for key in sorted(old.keys() & new.keys()):
+        o, n = old[key], new[key]
+        ratio = n["schedule_us"] / o["schedule_us"] if o["schedule_us"] else float("inf")
+        flag = ""
+        if args.fail_above and ratio > args.fail_above:
+            flag = "  REGRESSION"
+            exit_code = 1
+        print(f"{key[0]:<10} {key[1]:>7} {o['to_mastery_p50'] or 0:>7.0f} {n['to_mastery_p50'] or 0:>5.0f} "
+              f"{o['recall']:>10.1%} {n['recall']:>6.1%} {o['schedule_us']:>11.2f} {n['schedule_us']:>8.2f} "
+              f"{ratio:>6.2f}{flag}")
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:<10} {key[1]:>7} only in {'old' if key in old else 'new'} results "
+              f"({key[2]} questions, {key[3]} learners)")
+    return exit_code
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Simulate learners using the quiz page's scheduling.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("run", help="Simulate a cohort of learners under each scheduler variant.")
+    p.add_argument("csv", help="Bank CSV file.")
+    p.add_argument("--chapter", help="Only quiz this chapter's questions (as when one chapter is selected).")
+    p.add_argument("--schedulers", default=",".join(SCHEDULERS),
+                   help="Comma-separated scheduler variants (default: %(default)s).")
+    p.add_argument("--mastery", default=str(DEFAULT_MASTERY),
+                   help="Comma-separated correct answers needed to master a missed question (default: %(default)s).")
+    p.add_argument("--learners", type=int, default=DEFAULT_LEARNERS, help="Learners in the cohort (default: %(default)s).")
+    p.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Days of study (default: %(default)s).")
+    p.add_argument("--answers", type=int, default=DEFAULT_ANSWERS, help="Answers per daily session (default: %(default)s).")
+    p.add_argument("--restart", action="store_true", help="Start a new quiz every session instead of resuming.")
+    p.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    p.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="Results file (default: %(default)s).")
+    p.set_defaults(func=cmd_run)
+
+    p = subparsers.add_parser("compare", help="Compare two results files.")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--fail-above", type=float, metavar="RATIO",
+                   help="Exit with status 1 if any variant's scheduling cost per answer grew by more than this factor.")
+    p.set_defaults(func=cmd_compare)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if np is None and args.command == "run":
+        print("error: the simulator needs NumPy (pip install numpy)", file=sys.stderr)
+        return 1
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
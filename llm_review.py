@@ -0,0 +1,256 @@
+"""Batch LLM review of question bank rows against an OpenAI-compatible API.
+
+Renders the same review prompt the editor's "Copy Prompt for LLM" button
+copies, sends it for many questions concurrently, and appends each response
+to a sidecar file next to the bank (questions.csv -> questions.reviews.jsonl),
+one JSON object per line:
+
+    {"hash": "...", "model": "...", "question": "...", "review": "...", "reviewed_at": "..."}
+
+"hash" is bank_bundle.content_hash of the row as reviewed. The sidecar
+doubles as the cache: a row whose content hash already has a review from the
+same model is skipped, so rerunning a batch only reviews new and edited
+questions. Entries are appended as they arrive, so an interrupted batch keeps
+what it finished.
+
+Requests go to <base_url>/chat/completions, which OpenAI, most hosted
+providers and local servers (llama.cpp, vLLM, Ollama) accept. Only the
+standard library is used; blocking HTTP calls run in worker threads and an
+asyncio semaphore caps how many are in flight.
+
+This module must not import tkinter.
+"""
+import asyncio
+import concurrent.futures
+import json
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+
+from bank_bundle import content_hash
+
+REVIEW_SUFFIX = ".reviews.jsonl"
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 4
+DEFAULT_TIMEOUT = 120
+# First retry waits about this long; each further retry doubles it
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 60.0
+# HTTP statuses worth retrying: rate limits and server-side trouble
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class ReviewError(Exception):
+    """A review request failed for good (after retries, or with a non-retryable error)."""
+
+
+def review_prompt(row):
+    """The review prompt for a row, as the editor copies it to the clipboard."""
+    question = row.get("question", "").strip()
+    answer = row.get("answer", "False")
+    explanation = row.get("explanation", "").strip()
+    chapter = row.get("chapter", "").strip()
+    return f"""Please review the following question bank item for accuracy, clarity, and correctness.
+
+Context: This is a True/False question related to chapter/topic "{chapter if chapter else 'Not Specified'}".
+
+--- Question ---
+{question}
+
+--- Provided Answer ---
+{answer}
+
+--- Provided Explanation ---
+{explanation}
+
+---
+Please provide feedback on:
+1.  The clarity and accuracy of the **Question**. Is it well-phrased and unambiguous?
+2.  The correctness of the **Provided Answer**. Is it definitively True or False based on the question?
+3.  The accuracy, clarity, and helpfulness of the **Provided Explanation**. Does it correctly justify the answer? Is it easy to understand?
+
+Suggest corrections or improvements if necessary.
+"""
+
+
+# --- Sidecar file ---
+
+def review_path_for(csv_path):
+    """Where reviews of a bank CSV go: questions.csv -> questions.reviews.jsonl."""
+    root, _ = os.path.splitext(csv_path)
+    return root + REVIEW_SUFFIX
+
+
+def read_reviews(path):
+    """Reviews in a sidecar file as {content hash: [entries, oldest first]}; {} if there is none.
+
+    Lines that aren't valid JSON (e.g. cut short by a crash) are skipped.
+    """
+    reviews = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and "hash" in entry:
+                    reviews.setdefault(entry["hash"], []).append(entry)
+    except FileNotFoundError:
+        pass
+    return reviews
+
+
+def latest_review(reviews, row):
+    """The newest review of row's current content, or None."""
+    entries = reviews.get(content_hash(row))
+    return entries[-1] if entries else None
+
+
+def append_review(path, entry):
+    """Append one review entry to a sidecar file."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+
+
+# --- HTTP client ---
+
+class ReviewClient:
+    """Minimal client for an OpenAI-compatible chat completions endpoint."""
+
+    def __init__(self, base_url, model, api_key=None, timeout=DEFAULT_TIMEOUT):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def complete(self, prompt):
+        """Send one prompt and return the response text. Blocking.
+
+        Raises urllib.error.HTTPError / URLError for transport problems and
+        ReviewError for a response without a message.
+        """
+        body = json.dumps({
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.loads(response.read().decode("utf-8"))
+        try:
+            return data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise ReviewError(f"Unexpected response: {str(data)[:200]}")
+
+
+def retry_delay(attempt, error=None):
+    """Seconds to wait before retry number attempt (1-based): Retry-After if given, else jittered backoff."""
+    retry_after = getattr(error, "headers", None) and error.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX_S)
+        except ValueError:
+            pass
+    delay = min(BACKOFF_BASE_S * 2 ** (attempt - 1), BACKOFF_MAX_S)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def is_retryable(error):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRY_STATUSES
+    # Connection refused/reset, DNS hiccups, timeouts
+    return isinstance(error, (urllib.error.URLError, TimeoutError, ConnectionError))
+
+
+async def review_one(client, row, semaphore, executor, retries=DEFAULT_RETRIES):
+    """Review one row, retrying transient failures; returns the sidecar entry."""
+    prompt = review_prompt(row)
+    loop = asyncio.get_running_loop()
+    attempt = 0
+    while True:
+        async with semaphore:
+            try:
+                review = await loop.run_in_executor(executor, client.complete, prompt)
+                break
+            except Exception as e:
+                attempt += 1
+                if attempt > retries or not is_retryable(e):
+                    raise ReviewError(f"{type(e).__name__}: {e}") from e
+                error = e
+        # Back off outside the semaphore so waiting requests don't hold slots
+        await asyncio.sleep(retry_delay(attempt, error))
+    return {
+        "hash": content_hash(row),
+        "model": client.model,
+        "question": row.get("question", ""),
+        "review": review,
+        "reviewed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def pending_rows(rows, reviews, model):
+    """Rows without a review of their current content by model, each content once."""
+    pending = []
+    seen = set()
+    for row in rows:
+        row_hash = content_hash(row)
+        if row_hash in seen:
+            continue
+        seen.add(row_hash)
+        if not any(entry.get("model") == model for entry in reviews.get(row_hash, ())):
+            pending.append(row)
+    return pending
+
+
+async def review_rows(client, rows, sidecar_path, concurrency=DEFAULT_CONCURRENCY,
+                      retries=DEFAULT_RETRIES, on_result=None):
+    """Review rows concurrently, appending each result to sidecar_path as it arrives.
+
+    on_result(row, entry, error) is called after each row (entry or error is
+    None). Returns (reviewed count, [(row, error), ...]).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # One thread per in-flight request (the default executor may have fewer)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+
+    async def review(row):
+        try:
+            return row, await review_one(client, row, semaphore, executor, retries), None
+        except ReviewError as e:
+            return row, None, e
+
+    reviewed = 0
+    failures = []
+    try:
+        for finished in asyncio.as_completed([review(row) for row in rows]):
+            row, entry, error = await finished
+            if error is None:
+                append_review(sidecar_path, entry)
+                reviewed += 1
+            else:
+                failures.append((row, error))
+            if on_result:
+                on_result(row, entry, error)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return reviewed, failures
+
+
+def run_review(client, rows, sidecar_path, concurrency=DEFAULT_CONCURRENCY,
+               retries=DEFAULT_RETRIES, force=False, on_result=None):
+    """Review the rows that have no cached review in sidecar_path. Blocking.
+
+    Returns (reviewed count, skipped count, [(row, error), ...]).
+    """
+    rows = list(rows)
+    todo = rows if force else pending_rows(rows, read_reviews(sidecar_path), client.model)
+    reviewed, failures = asyncio.run(
+        review_rows(client, todo, sidecar_path, concurrency, retries, on_result)
+    )
+    return reviewed, len(rows) - len(todo), failures
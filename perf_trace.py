@@ -0,0 +1,215 @@
+"""Opt-in timing of question bank editor operations.
+
+A Profiler records one span per timed call: rolling percentiles per
+operation name for a live view, plus the raw spans for a Chrome trace file
+(open it in chrome://tracing or https://ui.perfetto.dev) to attach to bug
+reports. Spans may nest and may come from worker threads.
+
+Profiling is off unless asked for (QBANK_PROFILE, or the editor's
+--profile flag). When off, the editor holds NULL_PROFILER, whose spans do
+nothing, so instrumented code costs one attribute check per call.
+
+This module must not import tkinter.
+"""
+import collections
+import contextlib
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+# "1" turns profiling on; any other non-empty value except "0" is also a path
+# the Chrome trace is written to when the editor exits
+PROFILE_ENV = "QBANK_PROFILE"
+# Durations kept per operation for the rolling percentiles
+WINDOW = 500
+# Spans kept for the trace; older ones are dropped first
+MAX_EVENTS = 100000
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list (fraction in 0..1)."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+class _Span:
+    """Context manager timing one span; records it on exit, even if the block raises."""
+
+    __slots__ = ("profiler", "name", "args", "start")
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class Profiler:
+    """Collects spans: rolling durations per name and a bounded event list for trace export."""
+
+    enabled = True
+
+    def __init__(self, window=WINDOW, max_events=MAX_EVENTS):
+        self.window = window
+        self.max_events = max_events
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all recorded spans."""
+        with self._lock:
+            self._durations = {} # name -> deque of the last `window` durations (s)
+            self._counts = {}
+            self._totals = {}
+            self._events = []
+            self._dropped = 0
+            self._threads = {}
+            self.last = None # (name, duration) of the most recent span
+
+    def span(self, name, **args):
+        """Context manager timing the block as a span called name; args go into the trace."""
+        return _Span(self, name, args)
+
+    def record(self, name, start, end, args=None):
+        """Record a span given perf_counter() start and end times."""
+        duration = end - start
+        thread = threading.current_thread()
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = collections.deque(maxlen=self.window)
+            durations.append(duration)
+            self._counts[name] = self._counts.get(name, 0) + 1
+            self._totals[name] = self._totals.get(name, 0.0) + duration
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append((name, start, duration, thread.ident, args or None))
+            if len(self._events) > self.max_events:
+                # Drop the oldest tenth at once so trimming stays cheap
+                drop = self.max_events // 10 or 1
+                del self._events[:drop]
+                self._dropped += drop
+            self.last = (name, duration)
+
+    def stats(self):
+        """Per-name summaries sorted by name: dicts with count, total, last, p50, p95 and max (seconds).
+
+        count and total cover every span recorded; the percentiles and max
+        cover the last `window` of them.
+        """
+        with self._lock:
+            snapshot = [(name, list(durations)) for name, durations in self._durations.items()]
+            counts = dict(self._counts)
+            totals = dict(self._totals)
+        summaries = []
+        for name, durations in sorted(snapshot):
+            ordered = sorted(durations)
+            summaries.append({
+                "name": name,
+                "count": counts[name],
+                "total": totals[name],
+                "last": durations[-1],
+                "p50": percentile(ordered, 0.50),
+                "p95": percentile(ordered, 0.95),
+                "max": ordered[-1],
+            })
+        return summaries
+
+    def chrome_trace(self):
+        """The recorded spans in Chrome's trace event format, as a JSON-ready dict."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            dropped = self._dropped
+        trace_events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+            for tid, thread_name in threads.items()
+        ]
+        for name, start, duration, tid, args in events:
+            event = {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+        return {
+            "traceEvents": trace_events,
+            "displayTimeUnit": "ms",
+            "otherData": {"tool": "question_bank_tool", "dropped_events": dropped},
+        }
+
+    def write_trace(self, path):
+        """Write the Chrome trace to path."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off: spans do nothing and nothing is kept."""
+
+    enabled = False
+    last = None
+
+    def span(self, name, **args):
+        return _NULL_SPAN
+
+    def record(self, name, start, end, args=None):
+        pass
+
+    def reset(self):
+        pass
+
+    def stats(self):
+        return []
+
+
+_NULL_SPAN = contextlib.nullcontext()
+NULL_PROFILER = NullProfiler()
+
+
+def timed(name):
+    """Method decorator: time each call as a span called name on self.profiler."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            with profiler.span(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def profiler_from_env(environ=None):
+    """(profiler, trace path or None) as configured by the QBANK_PROFILE environment variable."""
+    value = (os.environ if environ is None else environ).get(PROFILE_ENV, "").strip()
+    if value in ("", "0"):
+        return NULL_PROFILER, None
+    return Profiler(), (None if value == "1" else value)
+
+
+def format_ms(seconds):
+    """Duration for display: '12.3 ms', or '1.25 s' from a second up."""
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    return f"{seconds * 1000:.1f} ms"
@@ -0,0 +1,816 @@
+"""GUI-free question bank core.
+
+Holds the CSV loading, validation, editing and saving logic used by the
+Tkinter QuestionBankEditor, so batch jobs can process banks without a display.
+This module must not import tkinter.
+"""
+import bisect
+import collections
+import csv
+import io
+import operator
+import os
+import shutil
+import tempfile
+import threading
+from array import array
+
+HEADERS = ["question", "answer", "explanation", "chapter"]
+ANSWER_VALUES = ("True", "False")
+# Rows per chunk handed out by read_chunks()
+LOAD_CHUNK_SIZE = 2000
+
+
+def normalize_answer(value):
+    """Return (answer_str, valid) for a raw answer value.
+
+    Accepts booleans or boolean-like strings. Anything that isn't True/False
+    falls back to "False", matching the editor's historic behaviour.
+    """
+    if isinstance(value, bool):
+        return ("True" if value else "False"), True
+    answer_str = str(value or "").strip().capitalize()
+    if answer_str not in ANSWER_VALUES:
+        return "False", False
+    return answer_str, True
+
+
+class ChapterTable:
+    """Chapter names interned as small integer codes, shared by all Question records.
+
+    Banks repeat a handful of chapter names across thousands of rows; each
+    row stores only its chapter's code. Code 0 is the empty chapter. Safe to
+    use from a loader thread and the UI thread at once.
+    """
+
+    def __init__(self):
+        self.names = [""]
+        self._codes = {"": 0}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def code(self, name):
+        """The code for chapter name, adding it if it is new."""
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(name)
+                if code is None:
+                    code = len(self.names)
+                    self.names.append(name)
+                    self._codes[name] = code
+        return code
+
+
+CHAPTERS = ChapterTable()
+_CHAPTER_CODES = CHAPTERS._codes
+
+
+class Question:
+    """One bank row, stored compactly.
+
+    The answer is a bool and the chapter an interned CHAPTERS code, so a
+    record costs a fraction of a per-row dict. Records still read like the
+    dicts they replaced: row["answer"] and row.get("answer") give "True" or
+    "False", row["chapter"] the chapter name, and dict(row) the four HEADERS
+    fields. Whether a row has unsaved edits is tracked by its bank
+    (QuestionBank.row_modified), not by the record.
+    """
+
+    __slots__ = ("question", "answer", "explanation", "_chapter")
+
+    def __init__(self, question="", answer=False, explanation="", chapter=""):
+        self.question = question
+        self.answer = answer is True or answer == "True"
+        self.explanation = explanation
+        # Known chapters (nearly every row) skip the method call
+        code = _CHAPTER_CODES.get(chapter)
+        self._chapter = CHAPTERS.code(chapter) if code is None else code
+
+    @property
+    def chapter(self):
+        return CHAPTERS.names[self._chapter]
+
+    @chapter.setter
+    def chapter(self, name):
+        self._chapter = CHAPTERS.code(name)
+
+    def __getitem__(self, key):
+        getter = _FIELD_GETTERS.get(key)
+        if getter is None:
+            raise KeyError(key)
+        return getter(self)
+
+    def __setitem__(self, key, value):
+        """Set a field from its CSV form ("True"/"False" for answers)."""
+        if key == "answer":
+            self.answer = value is True or value == "True"
+        elif key == "chapter":
+            self._chapter = CHAPTERS.code(value)
+        elif key in ("question", "explanation"):
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        getter = _FIELD_GETTERS.get(key)
+        return default if getter is None else getter(self)
+
+    def keys(self):
+        return HEADERS
+
+    def __iter__(self):
+        return iter(HEADERS)
+
+    def __len__(self):
+        return len(HEADERS)
+
+    def __contains__(self, key):
+        return key in HEADERS
+
+    def values(self):
+        """The fields in HEADERS order, as written to the CSV."""
+        return [self.question, "True" if self.answer else "False", self.explanation, CHAPTERS.names[self._chapter]]
+
+    def copy(self):
+        row = Question.__new__(Question)
+        row.question = self.question
+        row.answer = self.answer
+        row.explanation = self.explanation
+        row._chapter = self._chapter
+        return row
+
+    def __eq__(self, other):
+        if isinstance(other, Question):
+            return (self.question == other.question and self.answer == other.answer
+                    and self.explanation == other.explanation and self._chapter == other._chapter)
+        if isinstance(other, dict):
+            return dict(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Question({self.question!r}, {self.answer!r}, {self.explanation!r}, {self.chapter!r})"
+
+
+# Field name -> function reading it from a Question in its CSV form
+_FIELD_GETTERS = {
+    "question": operator.attrgetter("question"),
+    "answer": lambda row: "True" if row.answer else "False",
+    "explanation": operator.attrgetter("explanation"),
+    "chapter": lambda row: CHAPTERS.names[row._chapter],
+}
+
+
+class RowBitset:
+    """Set of row ids (non-negative ints) kept one bit per id."""
+
+    __slots__ = ("_bits",)
+
+    def __init__(self):
+        self._bits = bytearray()
+
+    def __contains__(self, row_id):
+        byte = row_id >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (row_id & 7)))
+
+    def add(self, row_id):
+        byte = row_id >> 3
+        if byte >= len(self._bits):
+            # Grow geometrically; ids mostly arrive in increasing order
+            self._bits.extend(bytes(max(byte + 1 - len(self._bits), len(self._bits))))
+        self._bits[byte] |= 1 << (row_id & 7)
+
+    def discard(self, row_id):
+        byte = row_id >> 3
+        if byte < len(self._bits):
+            self._bits[byte] &= ~(1 << (row_id & 7)) & 0xFF
+
+    def set(self, row_id, value):
+        if value:
+            self.add(row_id)
+        else:
+            self.discard(row_id)
+
+    def clear(self):
+        self._bits = bytearray()
+
+
+def check_headers(fieldnames):
+    """Raise ValueError unless fieldnames match the bank schema (case/space-insensitive)."""
+    if not fieldnames or [h.lower().strip() for h in fieldnames] != HEADERS:
+        raise ValueError(f"CSV headers mismatch. Expected: {HEADERS}. Found: {fieldnames}")
+
+
+def clean_row(row):
+    """Build a normalized Question from a csv.DictReader row.
+
+    Returns (cleaned_row, answer_valid).
+    """
+    answer_str, valid = normalize_answer(row.get("answer", ""))
+    cleaned_row = Question(
+        (row.get("question") or "").strip(),
+        answer_str == "True",
+        (row.get("explanation") or "").strip(),
+        (row.get("chapter") or "").strip(),
+    )
+    return cleaned_row, valid
+
+
+def check_file_headers(filepath):
+    """Raise ValueError (or OSError) if filepath isn't a readable bank CSV; reads only the header."""
+    with open(filepath, mode='r', newline='', encoding='utf-8-sig') as csvfile:
+        check_headers(next(csv.reader(csvfile), None))
+
+
+# One batch of parsed rows from read_chunks().
+#   rows      cleaned Question records
+#   warnings  messages for rows whose answer had to be coerced
+#   progress  fraction (0..1) of the file parsed so far
+#   start     byte offset where the chunk's first row starts
+#   row_ends  byte offset just past each row (array of ints)
+#   rewrite   positions (within the chunk) of rows that can't be copied
+#             verbatim on save because cleaning changed them
+#   layout    FileLayout of the file the rows came from
+LoadedChunk = collections.namedtuple("LoadedChunk", "rows warnings progress start row_ends rewrite layout")
+
+# How an existing bank file is written: QUOTE_ALL or QUOTE_MINIMAL, and its
+# line terminator. Used so spliced rows blend in with the untouched ones.
+FileLayout = collections.namedtuple("FileLayout", "quoting lineterminator")
+# What csv.DictWriter produces by default; used for full rewrites
+DEFAULT_LAYOUT = FileLayout(csv.QUOTE_MINIMAL, "\r\n")
+# Block size for copying untouched byte ranges during a spliced save
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def detect_layout(header_line):
+    """FileLayout of a bank file, judged from its header line (bytes, including the line ending)."""
+    return FileLayout(
+        csv.QUOTE_ALL if header_line.lstrip(b"\xef\xbb\xbf").startswith(b'"') else csv.QUOTE_MINIMAL,
+        "\r\n" if header_line.endswith(b"\r\n") else "\n",
+    )
+
+
+def read_chunks(filepath, chunk_size=LOAD_CHUNK_SIZE):
+    """Yield LoadedChunk batches for a bank CSV. Safe to run in a worker thread.
+
+    The file is read as bytes line by line so every row's byte range is
+    known exactly; QuestionBank uses those ranges to splice saves.
+    """
+    total_size = os.path.getsize(filepath) or 1
+    consumed = 0
+
+    with open(filepath, mode='rb') as binfile:
+        header_line = binfile.readline()
+        consumed = len(header_line)
+        layout = detect_layout(header_line)
+
+        def decoded_lines():
+            # Multi-byte UTF-8 sequences never contain b"\n", so decoding
+            # line by line is safe. csv.reader pulls exactly the lines of one
+            # record before yielding it, so `consumed` marks the row's end.
+            nonlocal consumed
+            yield header_line.decode('utf-8-sig')
+            for line in binfile:
+                consumed += len(line)
+                yield line.decode('utf-8')
+
+        reader = csv.DictReader(decoded_lines())
+        check_headers(reader.fieldnames)
+        # Map the file's own header spelling onto the canonical names
+        rename = dict(zip(reader.fieldnames, HEADERS))
+
+        chunk_start = len(header_line)
+        rows, warnings, row_ends, rewrite = [], [], [], []
+        for i, raw in enumerate(reader):
+            row = {rename.get(k, k): v for k, v in raw.items()}
+            cleaned_row, valid = clean_row(row)
+            if not valid:
+                warnings.append(f"Row {i + 1}: Invalid answer '{row.get('answer')}', defaulting to False.")
+            if None in row or cleaned_row.values() != [row.get(k) for k in HEADERS]:
+                rewrite.append(len(rows))
+            rows.append(cleaned_row)
+            row_ends.append(consumed)
+            if len(rows) >= chunk_size:
+                yield LoadedChunk(rows, warnings, min(consumed / total_size, 1.0), chunk_start, row_ends, rewrite, layout)
+                chunk_start = consumed
+                rows, warnings, row_ends, rewrite = [], [], [], []
+
+        if rows or warnings:
+            yield LoadedChunk(rows, warnings, 1.0, chunk_start, row_ends, rewrite, layout)
+
+
+def file_stamp(filepath):
+    """(size, mtime_ns) of filepath, used to tell whether it changed behind our back."""
+    st = os.stat(filepath)
+    return st.st_size, st.st_mtime_ns
+
+
+class SavePlan:
+    """Everything QuestionBank needs to write one save, captured up front.
+
+    segments is a list of ("copy", k0, k1) entries, meaning rows k0..k1-1 of
+    the existing file are copied byte for byte, and ("rows", [row, ...])
+    entries that are CSV-encoded afresh. write() only touches files, so it can
+    run in a worker thread as long as the bank isn't edited until
+    QuestionBank.finish_save(plan) is called.
+    """
+
+    def __init__(self, path, segments, row_ids, layout, source_offsets=None):
+        self.path = path
+        self.segments = segments
+        self.row_ids = row_ids
+        self.layout = layout
+        # Byte offsets of the rows in the current file (incremental saves only)
+        self.source_offsets = source_offsets
+        self.incremental = source_offsets is not None
+        # Filled in by write()
+        self.new_offsets = None
+        self.stamp = None
+
+    def write(self):
+        """Write to a temporary file next to path, fsync it, then atomically rename it over path."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if self.incremental:
+                    with open(self.path, 'rb') as src:
+                        self._write_segments(out, src)
+                else:
+                    self._write_segments(out, None)
+                out.flush()
+                os.fsync(out.fileno())
+            # mkstemp files are owner-only; a new bank gets the usual mode instead
+            if os.path.exists(self.path):
+                shutil.copymode(self.path, tmp_path)
+            else:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.stamp = file_stamp(self.path)
+
+    def _write_segments(self, out, src):
+        buf = io.StringIO()
+        writer = csv.writer(buf, quoting=self.layout.quoting, lineterminator=self.layout.lineterminator)
+        terminator = self.layout.lineterminator.encode()
+
+        def encode(values):
+            buf.seek(0)
+            buf.truncate()
+            writer.writerow(values)
+            return buf.getvalue().encode('utf-8')
+
+        old = self.source_offsets
+        if src is not None:
+            header = src.read(old[0])
+        else:
+            header = encode(HEADERS)
+        out.write(header)
+        pos = len(header)
+        offsets = array('Q')
+        # Set when a copied run ended without a newline (the file's last row)
+        needs_terminator = False
+
+        for segment in self.segments:
+            if needs_terminator:
+                out.write(terminator)
+                pos += len(terminator)
+                needs_terminator = False
+            if segment[0] == "copy":
+                _, k0, k1 = segment
+                start, end = old[k0], old[k1]
+                shift = pos - start
+                offsets.extend(old[k] + shift for k in range(k0, k1))
+                src.seek(start)
+                remaining = end - start
+                block = b""
+                while remaining > 0:
+                    block = src.read(min(COPY_BLOCK_SIZE, remaining))
+                    if not block:
+                        raise IOError("Bank file is shorter than expected; it may have changed on disk.")
+                    out.write(block)
+                    remaining -= len(block)
+                pos += end - start
+                needs_terminator = not block.endswith(b"\n")
+            else:
+                for row in segment[1]:
+                    offsets.append(pos)
+                    data = encode(row.values() if type(row) is Question else [row.get(k, "") for k in HEADERS])
+                    out.write(data)
+                    pos += len(data)
+        offsets.append(pos)
+        # new_offsets[k] is where row k starts; the last entry is the end of the data
+        if len(offsets) == 1:
+            offsets[0] = len(header)
+        self.new_offsets = offsets
+
+
+class QuestionBank:
+    """An in-memory True/False question bank backed by a CSV file.
+
+    Questions are Question records (dict-like, keyed by HEADERS).
+    Indices passed to update()/delete() are positions in self.questions.
+
+    Every row also gets a row id that stays the same when other rows are
+    added or deleted. Ids only ever increase, so self.row_ids is sorted and
+    row order can be recovered from ids alone.
+
+    Unsaved edits are tracked per row id: self.changes maps a row id to the
+    saved values of just the fields that differ from the file, and
+    self.added_ids holds rows created since the last save; row_modified()
+    answers from a bitset of both. Edits, additions and deletions are
+    undoable.
+
+    Saves go to a temporary file that is renamed over the target. When the
+    bank knows the byte range of every row in the file it was loaded from
+    (and the file hasn't changed since), save() copies untouched rows byte
+    for byte and only re-encodes the edited ones.
+    """
+
+    # Maximum number of operations kept for undo
+    UNDO_LIMIT = 1000
+    # All rows are in memory and edits wait for save(); see question_mmap.MappedQuestionBank
+    # for a bank that reads rows on demand, and question_db.SQLiteBank for one that also saves as it goes
+    lazy = False
+    autosave = False
+
+    def __init__(self):
+        self.questions = []
+        self.row_ids = array('q')
+        self._next_row_id = 0
+        self.path = None
+        self.load_warnings = []
+        self.last_save_incremental = False
+        self._reset_history()
+        self._reset_file_index()
+
+    def _reset_file_index(self):
+        # Byte layout of self.path: _saved_ids[k] is the row stored at
+        # _saved_offsets[k].._saved_offsets[k + 1]; None when unknown
+        self._saved_ids = None
+        self._saved_offsets = None
+        self._rewrite_ids = set()
+        self._layout = DEFAULT_LAYOUT
+        self._stamp = None
+
+    def _reset_history(self):
+        self.changes = {}
+        self.added_ids = set()
+        self._modified = RowBitset()
+        # Adds/deletes applied since the last save (undone ones count back down)
+        self._structural_delta = 0
+        self._undo_stack = collections.deque(maxlen=self.UNDO_LIMIT)
+        self._redo_stack = []
+
+    @classmethod
+    def from_csv(cls, filepath):
+        """Create a bank and load filepath into it."""
+        bank = cls()
+        bank.load(filepath)
+        return bank
+
+    def close(self):
+        """Release the bank's resources (a CSV bank holds none open)."""
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    def __getitem__(self, index):
+        return self.questions[index]
+
+    # --- Loading / saving ---
+
+    def load(self, filepath):
+        """Replace the bank's contents with the questions in filepath.
+
+        Raises ValueError on a header mismatch; invalid answers are coerced to
+        "False" and recorded in self.load_warnings.
+        """
+        # Parse everything first so a bad file leaves the bank untouched
+        chunks = list(read_chunks(filepath))
+        self.begin_load(filepath)
+        for chunk in chunks:
+            self.append_loaded(chunk)
+
+    def begin_load(self, filepath):
+        """Empty the bank ahead of a chunked load from filepath (see append_loaded)."""
+        self.questions = []
+        self.row_ids = array('q')
+        self._next_row_id = 0
+        self.load_warnings = []
+        self.path = filepath
+        self._reset_history()
+        self._reset_file_index()
+        # Stamp before reading so a change during the load disables splicing
+        self._stamp = file_stamp(filepath)
+        self._saved_ids = array('q')
+        self._saved_offsets = array('Q')
+
+    def append_loaded(self, chunk):
+        """Append a LoadedChunk of freshly loaded (unmodified) rows; returns their row ids."""
+        rows = chunk.rows
+        new_ids = range(self._next_row_id, self._next_row_id + len(rows))
+        self.questions.extend(rows)
+        self.row_ids.extend(new_ids)
+        self._next_row_id += len(rows)
+        self.load_warnings.extend(chunk.warnings)
+
+        if self._saved_offsets is not None:
+            if not self._saved_offsets:
+                self._saved_offsets.append(chunk.start)
+            self._saved_ids.extend(new_ids)
+            self._saved_offsets.extend(chunk.row_ends)
+            self._rewrite_ids.update(new_ids[i] for i in chunk.rewrite)
+            self._layout = chunk.layout
+        return new_ids
+
+    def save(self, filepath=None):
+        """Write the bank to filepath (default: the loaded path) and clear modified flags."""
+        plan = self.prepare_save(filepath)
+        plan.write()
+        self.finish_save(plan)
+
+    def prepare_save(self, filepath=None):
+        """Capture a SavePlan for filepath (default: the loaded path).
+
+        The plan splices the existing file when possible, otherwise it
+        rewrites every row. Don't edit the bank until finish_save().
+        """
+        save_path = filepath or self.path
+        if not save_path:
+            raise ValueError("No CSV file loaded or specified to save to.")
+
+        row_ids = array('q', self.row_ids)
+        if self._can_splice(save_path):
+            return SavePlan(save_path, self._splice_segments(), row_ids, self._layout, self._saved_offsets)
+        return SavePlan(save_path, [("rows", list(self.questions))], row_ids, DEFAULT_LAYOUT)
+
+    def finish_save(self, plan):
+        """Adopt a written SavePlan: clear modified markers and remember the new file layout."""
+        self.mark_saved()
+        self.path = plan.path
+        self.last_save_incremental = plan.incremental
+        self._saved_ids = plan.row_ids
+        self._saved_offsets = plan.new_offsets
+        self._rewrite_ids = set()
+        self._layout = plan.layout
+        self._stamp = plan.stamp
+
+    def _can_splice(self, save_path):
+        if not self._saved_offsets or self._stamp is None or not self.path:
+            return False
+        if os.path.abspath(save_path) != os.path.abspath(self.path):
+            return False
+        try:
+            return file_stamp(save_path) == self._stamp
+        except OSError:
+            return False
+
+    def _splice_segments(self):
+        """Copy runs for untouched rows, re-encoded runs for the rest, in row order."""
+        saved_ids = self._saved_ids
+        n_saved = len(saved_ids)
+        dirty = self.changes.keys() | self.added_ids | self._rewrite_ids
+        segments = []
+        j = 0
+        for index, row_id in enumerate(self.row_ids):
+            while j < n_saved and saved_ids[j] < row_id:
+                j += 1 # Skips rows deleted since the file was written
+            if j < n_saved and saved_ids[j] == row_id and row_id not in dirty:
+                if segments and segments[-1][0] == "copy" and segments[-1][2] == j:
+                    segments[-1][2] = j + 1
+                else:
+                    segments.append(["copy", j, j + 1])
+            # Rows are only fetched when re-encoded (see question_mmap, where that means decoding)
+            elif segments and segments[-1][0] == "rows":
+                segments[-1][1].append(self.questions[index])
+            else:
+                segments.append(["rows", [self.questions[index]]])
+        return segments
+
+    def mark_saved(self):
+        """Make the current contents the new baseline after a successful save.
+
+        Undo history is kept; undoing past this point marks rows modified again.
+        """
+        self._modified.clear()
+        self.changes = {}
+        self.added_ids = set()
+        self._structural_delta = 0
+
+    # --- Editing ---
+
+    def add(self, question="", answer="False", explanation="", chapter=""):
+        """Append a new question (marked modified) and return its index."""
+        answer_str, _ = normalize_answer(answer)
+        row = Question(question.strip(), answer_str == "True", explanation.strip(), chapter.strip())
+        row_id = self._next_row_id
+        self._next_row_id += 1
+        self._insert(row_id, row, None, True)
+        self._structural_delta += 1
+        self._push(("add", row_id, row, None, True))
+        return len(self.questions) - 1
+
+    def update(self, index, **fields):
+        """Update schema fields of the question at index.
+
+        Values are stripped and answers normalized like load() does. Returns
+        True if anything changed (and marks the row modified), else False.
+        """
+        unknown = set(fields) - set(HEADERS)
+        if unknown:
+            raise KeyError(f"Unknown question field(s): {sorted(unknown)}")
+
+        current_data = self.questions[index]
+        edits = {}
+        for key, value in fields.items():
+            if key == "answer":
+                value, _ = normalize_answer(value)
+            else:
+                value = (value or "").strip()
+            old_value = current_data.get(key, "")
+            if value != old_value:
+                edits[key] = (old_value, value)
+
+        if not edits:
+            return False
+        row_id = self.row_ids[index]
+        self._apply_edits(row_id, current_data, edits)
+        self._push(("update", row_id, edits))
+        return True
+
+    def delete(self, index):
+        """Remove and return the question at index."""
+        row_id = self.row_ids[index]
+        row, record, was_added = self._remove(row_id)
+        self._structural_delta += 1
+        self._push(("delete", row_id, row, record, was_added))
+        return row
+
+    def revert(self, index):
+        """Restore the saved values of the question at index (undoable).
+
+        Returns True if anything was reverted. Questions added since the last
+        save have no saved version and are left alone.
+        """
+        record = self.changes.get(self.row_ids[index])
+        if not record:
+            return False
+        return self.update(index, **record)
+
+    # --- Undo / redo ---
+
+    def can_undo(self):
+        return bool(self._undo_stack)
+
+    def can_redo(self):
+        return bool(self._redo_stack)
+
+    def undo(self):
+        """Undo the most recent edit, addition or deletion.
+
+        Returns (kind, row_id) describing what happened to the bank — "update",
+        "add" (a row reappeared) or "delete" (a row went away) — or None if
+        there is nothing to undo.
+        """
+        if not self._undo_stack:
+            return None
+        op = self._undo_stack.pop()
+        self._redo_stack.append(op)
+        return self._replay(op, reverse=True)
+
+    def redo(self):
+        """Redo the last undone operation; returns (kind, row_id) like undo()."""
+        if not self._redo_stack:
+            return None
+        op = self._redo_stack.pop()
+        self._undo_stack.append(op)
+        return self._replay(op, reverse=False)
+
+    def _push(self, op):
+        self._undo_stack.append(op)
+        self._redo_stack.clear()
+
+    def _replay(self, op, reverse):
+        kind, row_id = op[0], op[1]
+        if kind == "update":
+            edits = op[2]
+            if reverse:
+                edits = {field: (new, old) for field, (old, new) in edits.items()}
+            self._apply_edits(row_id, self.questions[self.index_of(row_id)], edits)
+            return ("update", row_id)
+
+        # Adding and deleting are each other's inverse
+        inserting = (kind == "add") != reverse
+        if inserting:
+            _, _, row, record, was_added = op
+            self._insert(row_id, row, record, was_added)
+        else:
+            self._remove(row_id)
+        self._structural_delta += -1 if reverse else 1
+        return ("add" if inserting else "delete", row_id)
+
+    # --- Change tracking internals ---
+
+    def _apply_edits(self, row_id, row, edits):
+        """Apply {field: (old, new)} to row and keep its change record minimal."""
+        record = self.changes.get(row_id, {})
+        for field, (old_value, new_value) in edits.items():
+            row[field] = new_value
+            if row_id in self.added_ids:
+                continue  # New rows have no saved values to remember
+            if field not in record:
+                record[field] = old_value
+            elif record[field] == new_value:
+                del record[field]  # Edited back to the saved value
+        if record:
+            self.changes[row_id] = record
+        else:
+            self.changes.pop(row_id, None)
+        self._modified.set(row_id, row_id in self.added_ids or row_id in self.changes)
+
+    def _insert(self, row_id, row, record, was_added):
+        index = bisect.bisect_left(self.row_ids, row_id)
+        self.row_ids.insert(index, row_id)
+        self.questions.insert(index, row)
+        if record:
+            self.changes[row_id] = record
+        if was_added:
+            self.added_ids.add(row_id)
+        self._modified.set(row_id, was_added or record)
+
+    def _remove(self, row_id):
+        index = self.index_of(row_id)
+        row = self.questions.pop(index)
+        del self.row_ids[index]
+        record = self.changes.pop(row_id, None)
+        was_added = row_id in self.added_ids
+        self.added_ids.discard(row_id)
+        self._modified.discard(row_id)
+        return row, record, was_added
+
+    # --- Queries ---
+
+    def row_id(self, index):
+        """Stable id of the question currently at index."""
+        return self.row_ids[index]
+
+    def index_of(self, row_id):
+        """Current index of the question with row_id, or None if it was deleted."""
+        pos = bisect.bisect_left(self.row_ids, row_id)
+        if pos < len(self.row_ids) and self.row_ids[pos] == row_id:
+            return pos
+        return None
+
+    def saved_row_id(self, file_row):
+        """Id of the question in row file_row (0-based) of the file as last loaded or saved, or None."""
+        if self._saved_ids is None or not 0 <= file_row < len(self._saved_ids):
+            return None
+        return self._saved_ids[file_row]
+
+    def row_modified(self, row_id):
+        """True if the question with row_id has unsaved edits or was added since the last save."""
+        return row_id in self._modified
+
+    def saved_values(self, index):
+        """{field: saved value} for fields of the question at index edited since the last save."""
+        return dict(self.changes.get(self.row_ids[index], {}))
+
+    def edited_values(self, field):
+        """(saved value, current value) pairs for saved rows whose field was edited since the last save."""
+        pairs = []
+        for row_id, saved in self.changes.items():
+            index = self.index_of(row_id)
+            if index is not None and field in saved:
+                current = self.questions[index].get(field, "")
+                if current != saved[field]:
+                    pairs.append((saved[field], current))
+        return pairs
+
+    def modified_count(self):
+        """Number of questions with unsaved edits."""
+        return len(self.changes) + len(self.added_ids)
+
+    def is_modified(self):
+        """True if anything (edits, additions or deletions) is unsaved."""
+        return bool(self.changes or self.added_ids or self._structural_delta)
+
+    def validate(self):
+        """Return a list of (index, message) problems in the current data."""
+        problems = []
+        for i, q in enumerate(self.questions):
+            if not q.get("question"):
+                problems.append((i, "Question text is empty."))
+        return problems
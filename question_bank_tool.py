@@ -1,22 +1,91 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import csv
+import argparse
 import os
+import queue
+import threading
 import time # Import time for potential future use or just note the date
 
+from bank_bundle import is_valid_row, refresh_bundle
+from bank_lint import read_report, report_path_for
+from cohort_stats import question_ids, read_stats, stats_path_for
+from llm_review import latest_review, read_reviews, review_path_for, review_prompt
+from perf_trace import NULL_PROFILER, Profiler, format_ms, profiler_from_env, timed
+from question_bank import QuestionBank, check_file_headers, file_stamp, read_chunks
+from question_db import SQLiteBank, is_database_path
+from question_dupes import DuplicateIndex
+from question_mmap import MappedQuestionBank
+from question_search import SearchIndex
+
 class QuestionBankEditor:
-    def __init__(self, master):
+    # Search box scope label -> bank fields searched
+    SEARCH_SCOPES = {
+        "Question": ("question",),
+        "Explanation": ("explanation",),
+        "Chapter": ("chapter",),
+        "All Fields": ("question", "explanation", "chapter"),
+    }
+    # With learner statistics loaded (bank_cli.py analyze): list order label -> sort key
+    # of a row's QuestionStats, and list filter label -> test of it. Rows without
+    # statistics sort last and only pass "All questions".
+    STATS_SORTS = {
+        "Bank order": None,
+        "Most missed": lambda stats: -stats.miss_rate,
+        "Least discriminating": lambda stats: float("inf") if stats.discrimination is None else stats.discrimination,
+        "Most answered": lambda stats: -stats.answers,
+    }
+    STATS_FILTERS = {
+        "All questions": None,
+        "Answered by learners": lambda stats: True,
+        "Missed 50%+": lambda stats: stats.miss_rate >= 0.5,
+        "Discrimination < 0.2": lambda stats: stats.discrimination is not None and stats.discrimination < 0.2,
+    }
+
+    # Quiet period after the last keystroke before the search box refreshes the list
+    SEARCH_DEBOUNCE_MS = 150
+    # Files at least this big are parsed in a worker thread while the list fills in
+    STREAMING_LOAD_MIN_BYTES = 1024 * 1024
+    # Files at least this big are memory-mapped and rows decoded only as they are shown
+    MAPPED_LOAD_MIN_BYTES = 32 * 1024 * 1024
+    # How often the UI drains parsed chunks, and how long one drain may run
+    LOAD_POLL_MS = 50
+    LOAD_POLL_BUDGET_S = 0.05
+    # Banks with at least this many questions are written by a worker thread
+    BACKGROUND_SAVE_MIN_ROWS = 20000
+    SAVE_POLL_MS = 100
+    # Lazy banks (databases, mapped CSVs): list label shown until a row scrolls into view,
+    # and how many rows beyond the visible ones get real labels
+    LAZY_PLACEHOLDER = "\u2026"
+    LAZY_MARGIN_ROWS = 50
+    # How often an open Performance window refreshes its table
+    PROFILE_REFRESH_MS = 1000
+
+    def __init__(self, master, profiler=None):
         self.master = master
+        # Times editor operations when profiling is on (see perf_trace.py); a no-op otherwise
+        self.profiler = profiler or NULL_PROFILER
+        self.profile_window = None
         self.master.title("Question Bank Editor")
         # Increased height slightly again for the new button row
         self.master.geometry("900x680")
 
-        # Data storage
-        self.questions_data = []
-        self.current_csv_path = None
+        # Data storage (all CSV/validation logic lives in the GUI-free QuestionBank)
+        self.bank = QuestionBank()
+        self.search_index = SearchIndex()
+        self.duplicate_index = None # Built on first "Show Duplicates", then kept in sync
+        self.question_stats = {} # row_id -> QuestionStats from the bank's .stats.json, if any
         self.selected_data_index = None
         self.listbox_to_data_map = []
-        self.original_questions = {}
+        self.listbox_rows = [] # (row_id, display_text) currently shown, for diff-based refresh
+        self.pending_filter_id = None # after() id of a debounced search refresh
+        self.pending_fill_id = None # after_idle() id of a lazy list label fill
+        # Streaming load state: queue fed by the parser thread, and its cancel flag
+        self.load_queue = None
+        self.load_cancel = None
+        # Background save state: queue the writer thread reports to, and its plan
+        self.save_queue = None
+        self.save_plan = None
+        self.load_after_save = False # Open the file dialog once the save finishes
 
         # --- GUI Setup ---
         self.main_frame = ttk.Frame(master, padding="10")
@@ -37,6 +106,15 @@ class QuestionBankEditor:
         self.add_button.pack(side=tk.LEFT, padx=5)
         self.delete_button = ttk.Button(self.control_frame, text="Delete Question", command=self.delete_question, state=tk.DISABLED)
         self.delete_button.pack(side=tk.LEFT, padx=5)
+        self.undo_button = ttk.Button(self.control_frame, text="Undo", command=self.undo_change, state=tk.DISABLED)
+        self.undo_button.pack(side=tk.LEFT, padx=5)
+        self.redo_button = ttk.Button(self.control_frame, text="Redo", command=self.redo_change, state=tk.DISABLED)
+        self.redo_button.pack(side=tk.LEFT, padx=5)
+        self.lint_button = ttk.Button(self.control_frame, text="Lint Report...", command=self.show_lint_report, state=tk.DISABLED)
+        self.lint_button.pack(side=tk.LEFT, padx=5)
+        if self.profiler.enabled:
+            self.profile_button = ttk.Button(self.control_frame, text="Performance", command=self.show_profile)
+            self.profile_button.pack(side=tk.LEFT, padx=5)
         self.status_label = ttk.Label(self.control_frame, text="Load a CSV file to begin.")
         self.status_label.pack(side=tk.RIGHT, padx=5)
 
@@ -48,6 +126,14 @@ class QuestionBankEditor:
         self.search_entry = ttk.Entry(self.search_frame, textvariable=self.search_var)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.search_var.trace_add("write", self.filter_questions_event)
+        # Which fields the search box looks in
+        self.search_scope_var = tk.StringVar(value="Question")
+        self.search_scope_combo = ttk.Combobox(
+            self.search_frame, textvariable=self.search_scope_var,
+            values=list(self.SEARCH_SCOPES), state="readonly", width=11
+        )
+        self.search_scope_combo.pack(side=tk.LEFT, padx=(5, 0))
+        self.search_scope_var.trace_add("write", self.filter_questions_event)
 
         # --- Left Pane: Question List (Row 2, Column 0) ---
         self.listbox_frame = ttk.Frame(self.main_frame)
@@ -56,12 +142,35 @@ class QuestionBankEditor:
         self.listbox_frame.columnconfigure(0, weight=1)
         self.listbox_scrollbar = ttk.Scrollbar(self.listbox_frame, orient=tk.VERTICAL)
         self.question_listbox = tk.Listbox(
-            self.listbox_frame, yscrollcommand=self.listbox_scrollbar.set, exportselection=False
+            self.listbox_frame, yscrollcommand=self.on_listbox_scroll, exportselection=False
         )
         self.listbox_scrollbar.config(command=self.question_listbox.yview)
         self.question_listbox.grid(row=0, column=0, sticky="nsew")
         self.listbox_scrollbar.grid(row=0, column=1, sticky="ns")
         self.question_listbox.bind('<<ListboxSelect>>', self.on_question_select)
+        # Bound on the list only, so Ctrl+Z inside the text fields keeps its usual meaning
+        self.question_listbox.bind('<Control-z>', lambda event: self.undo_change())
+        self.question_listbox.bind('<Control-y>', lambda event: self.redo_change())
+
+        # Order and filter the list by learner statistics; enabled when the bank has them
+        self.stats_frame = ttk.Frame(self.listbox_frame)
+        self.stats_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        ttk.Label(self.stats_frame, text="Sort:").pack(side=tk.LEFT, padx=(0, 5))
+        self.stats_sort_var = tk.StringVar(value="Bank order")
+        self.stats_sort_combo = ttk.Combobox(
+            self.stats_frame, textvariable=self.stats_sort_var,
+            values=list(self.STATS_SORTS), state=tk.DISABLED, width=18
+        )
+        self.stats_sort_combo.pack(side=tk.LEFT)
+        self.stats_sort_var.trace_add("write", self.filter_questions_event)
+        ttk.Label(self.stats_frame, text="Show:").pack(side=tk.LEFT, padx=(10, 5))
+        self.stats_filter_var = tk.StringVar(value="All questions")
+        self.stats_filter_combo = ttk.Combobox(
+            self.stats_frame, textvariable=self.stats_filter_var,
+            values=list(self.STATS_FILTERS), state=tk.DISABLED, width=18
+        )
+        self.stats_filter_combo.pack(side=tk.LEFT)
+        self.stats_filter_var.trace_add("write", self.filter_questions_event)
 
         # --- Right Pane: Details View (Row 2, Column 1) ---
         self.details_frame = ttk.Frame(self.main_frame)
@@ -96,6 +205,10 @@ class QuestionBankEditor:
         self.chapter_entry = ttk.Entry(self.details_frame, width=60)
         self.chapter_entry.grid(row=3, column=1, sticky="ew", pady=2, padx=5)
 
+        # Learner statistics of the selected question, if the bank has them
+        self.stats_label = ttk.Label(self.details_frame, text="")
+        self.stats_label.grid(row=5, column=1, sticky="w", pady=2, padx=5)
+
         # --- *** NEW: Button Row in Details Frame *** ---
         self.detail_button_frame = ttk.Frame(self.details_frame)
         self.detail_button_frame.grid(row=4, column=1, sticky="w", pady=(10, 2), padx=5)
@@ -117,6 +230,33 @@ class QuestionBankEditor:
             state=tk.DISABLED
         )
         self.copy_prompt_button.pack(side=tk.LEFT)
+
+        # Shows the response stored by `bank_cli.py review` for this question
+        self.show_review_button = ttk.Button(
+            self.detail_button_frame,
+            text="Show LLM Review",
+            command=self.show_llm_review,
+            state=tk.DISABLED
+        )
+        self.show_review_button.pack(side=tk.LEFT, padx=(10, 0))
+
+        # Discards this question's unsaved edits (pane and session) back to the file version
+        self.revert_button = ttk.Button(
+            self.detail_button_frame,
+            text="Revert Question",
+            command=self.revert_this_question,
+            state=tk.DISABLED
+        )
+        self.revert_button.pack(side=tk.LEFT, padx=(10, 0))
+
+        # Lists questions worded almost the same as this one
+        self.duplicates_button = ttk.Button(
+            self.detail_button_frame,
+            text="Show Duplicates",
+            command=self.show_duplicates,
+            state=tk.DISABLED
+        )
+        self.duplicates_button.pack(side=tk.LEFT, padx=(10, 0))
         # --- *** END NEW *** ---
 
         # Disable detail fields initially
@@ -124,13 +264,26 @@ class QuestionBankEditor:
 
     # --- Core Logic Methods ---
 
+    @property
+    def questions_data(self):
+        """The bank's question list (kept for the listbox/detail code)."""
+        return self.bank.questions
+
+    @property
+    def current_csv_path(self):
+        """Path of the loaded bank, or None."""
+        return self.bank.path
+
     def set_details_state(self, state):
         """Enable or disable all detail view widgets."""
         widgets = [
             self.question_text, self.explanation_text, self.chapter_entry,
             self.true_radio, self.false_radio,
             self.copy_prompt_button,
-            self.save_this_q_button # Include the new button
+            self.show_review_button,
+            self.save_this_q_button, # Include the new button
+            self.revert_button,
+            self.duplicates_button
         ]
         button_state = state if state == tk.NORMAL else tk.DISABLED
         for widget in widgets:
@@ -149,32 +302,129 @@ class QuestionBankEditor:
         self.status_label.config(text=message)
         self.master.update_idletasks()
 
+    def matching_data_indices(self):
+        """Data indices matching the search box and statistics filter, in the chosen order (bank order by default)."""
+        search_term = self.search_var.get().strip()
+        index_of = self.bank.index_of
+        if not search_term:
+            indices = range(len(self.questions_data))
+        else:
+            fields = self.SEARCH_SCOPES.get(self.search_scope_var.get(), ("question",))
+            indices = [index_of(row_id) for row_id in self.search_index.search(search_term, fields)]
+        if not self.question_stats:
+            return indices
+
+        stats_filter = self.STATS_FILTERS.get(self.stats_filter_var.get())
+        if stats_filter is not None:
+            # Only rows with statistics can pass, so start from those rather than the whole bank
+            passed = [index_of(row_id) for row_id, stats in self.question_stats.items() if stats_filter(stats)]
+            passed = sorted(index for index in passed if index is not None) # None: deleted since
+            if search_term:
+                matched = set(indices)
+                passed = [index for index in passed if index in matched]
+            indices = passed
+        sort_key = self.STATS_SORTS.get(self.stats_sort_var.get())
+        if sort_key is not None:
+            row_ids = self.bank.row_ids
+            stats_of = self.question_stats.get
+            with_stats = [index for index in indices if row_ids[index] in self.question_stats]
+            with_stats.sort(key=lambda index: sort_key(stats_of(row_ids[index])))
+            indices = with_stats + [index for index in indices if row_ids[index] not in self.question_stats]
+        return indices
+
+    def stats_view_active(self):
+        """True if the list is sorted or filtered by learner statistics."""
+        return bool(self.question_stats) and (
+            self.STATS_SORTS.get(self.stats_sort_var.get()) is not None
+            or self.STATS_FILTERS.get(self.stats_filter_var.get()) is not None
+        )
+
+    @staticmethod
+    def format_discrimination(stats):
+        return "n/a" if stats.discrimination is None else f"{stats.discrimination:+.2f}"
+
+    def listbox_text(self, q_data, row_id):
+        """Listbox label for a question: '* ' marker if modified, figures when sorting or filtering by them, text cut at 80 chars."""
+        prefix = "* " if self.bank.row_modified(row_id) else ""
+        stats = self.question_stats.get(row_id)
+        if stats is not None and self.stats_view_active():
+            prefix += f"[{stats.miss_rate:.0%} missed, D {self.format_discrimination(stats)}] "
+        display_q_text = q_data.get('question', '<New Question>')
+        display_text = f"{prefix}{display_q_text[:80]}"
+        if len(display_q_text) > 80: display_text += "..."
+        return display_text
+
+    def apply_listbox_rows(self, rows):
+        """
+        Bring the listbox in line with rows, a list of (row_id, display_text).
+        Only the span between the unchanged prefix and suffix is touched, with
+        one delete and one bulk insert, so editing one question costs two Tk calls.
+        """
+        old_rows = self.listbox_rows
+        start = 0
+        limit = min(len(old_rows), len(rows))
+        while start < limit and old_rows[start] == rows[start]:
+            start += 1
+        end_old, end_new = len(old_rows), len(rows)
+        while end_old > start and end_new > start and old_rows[end_old - 1] == rows[end_new - 1]:
+            end_old -= 1
+            end_new -= 1
+
+        if end_old > start:
+            self.question_listbox.delete(start, end_old - 1)
+        if end_new > start:
+            self.question_listbox.insert(start, *[text for _, text in rows[start:end_new]])
+        self.listbox_rows = rows
+
+    def append_listbox_rows(self, first_index):
+        """Add the questions from data index first_index on to the end of an unfiltered listbox."""
+        row_ids = self.bank.row_ids
+        rows = [(row_ids[index], self.listbox_text(self.questions_data[index], row_ids[index]))
+                for index in range(first_index, len(self.questions_data))]
+        with self.profiler.span("filter_questions.listbox", rows=len(rows)):
+            self.question_listbox.insert(tk.END, *[text for _, text in rows])
+        self.listbox_rows.extend(rows)
+        self.listbox_to_data_map.extend(range(first_index, len(self.questions_data)))
+
+    @timed("filter_questions")
     def filter_questions(self):
         """Filters the listbox based on the search entry."""
-        search_term = self.search_var.get().lower().strip()
-        # Store current selection before clearing listbox
+        # A direct refresh supersedes any debounced one still waiting
+        if self.pending_filter_id is not None:
+            self.master.after_cancel(self.pending_filter_id)
+            self.pending_filter_id = None
+
+        # Store current selection before refreshing listbox
         selected_data_index_before_filter = self.selected_data_index
 
-        self.question_listbox.delete(0, tk.END)
+        rows = []
         self.listbox_to_data_map = []
 
         new_listbox_index_for_selected = None # Track if selected item reappears
 
-        for original_index, q_data in enumerate(self.questions_data):
-            question_text = q_data.get("question", "").lower()
-            if not search_term or search_term in question_text:
-                prefix = "* " if q_data.get("modified", False) else ""
-                display_q_text = q_data.get('question', '<New Question>')
-                display_text = f"{prefix}{display_q_text[:80]}"
-                if len(display_q_text) > 80: display_text += "..."
-
-                current_listbox_pos = self.question_listbox.size() # Index where it will be inserted
-                self.question_listbox.insert(tk.END, display_text)
-                self.listbox_to_data_map.append(original_index)
-
+        row_ids = self.bank.row_ids
+        lazy = self.bank.lazy
+        with self.profiler.span("filter_questions.match"):
+            for original_index in self.matching_data_indices():
                 # Check if this is the item that was selected before filtering
                 if original_index == selected_data_index_before_filter:
-                    new_listbox_index_for_selected = current_listbox_pos
+                    new_listbox_index_for_selected = len(rows)
+
+                if lazy:
+                    # Only rows already read get a label now; the rest are filled in as they scroll into view
+                    q_data = self.questions_data.peek(original_index)
+                    label = self.listbox_text(q_data, row_ids[original_index]) if q_data is not None else self.LAZY_PLACEHOLDER
+                else:
+                    label = self.listbox_text(self.questions_data[original_index], row_ids[original_index])
+                rows.append((row_ids[original_index], label))
+                self.listbox_to_data_map.append(original_index)
+
+        with self.profiler.span("filter_questions.listbox", rows=len(rows)):
+            self.apply_listbox_rows(rows)
+        if lazy:
+            self.schedule_fill_visible_rows()
+        self.question_listbox.selection_clear(0, tk.END)
+        self.update_history_buttons()
 
         # After filtering, clear details IF the previously selected item is NOT visible anymore
         if selected_data_index_before_filter is not None and new_listbox_index_for_selected is None:
@@ -186,69 +436,321 @@ class QuestionBankEditor:
              self.question_listbox.activate(new_listbox_index_for_selected)
 
 
+    def on_listbox_scroll(self, first, last):
+        """Listbox yscrollcommand: move the scrollbar and, for lazy banks, label the rows now in view."""
+        self.listbox_scrollbar.set(first, last)
+        if self.bank.lazy:
+            self.schedule_fill_visible_rows()
+
+    def schedule_fill_visible_rows(self):
+        if self.pending_fill_id is None:
+            self.pending_fill_id = self.master.after_idle(self.fill_visible_rows)
+
+    def fill_visible_rows(self):
+        """Replace placeholder labels of the rows in view (plus a margin) with question text."""
+        self.pending_fill_id = None
+        rows = self.listbox_rows
+        if not self.bank.lazy or not rows:
+            return
+        top = self.question_listbox.nearest(0)
+        bottom = self.question_listbox.nearest(self.question_listbox.winfo_height())
+        start = max(0, top - self.LAZY_MARGIN_ROWS)
+        end = min(len(rows), bottom + 1 + self.LAZY_MARGIN_ROWS)
+        filled = [i for i in range(start, end) if rows[i][1] == self.LAZY_PLACEHOLDER]
+        if not filled:
+            return
+        for i in filled:
+            rows[i] = (rows[i][0], self.listbox_text(self.questions_data[self.listbox_to_data_map[i]], rows[i][0]))
+
+        # One delete and one insert for the whole span, keeping the selection
+        first, last = filled[0], filled[-1]
+        selection = self.question_listbox.curselection()
+        self.question_listbox.delete(first, last)
+        self.question_listbox.insert(first, *[text for _, text in rows[first:last + 1]])
+        for listbox_index in selection:
+            if first <= listbox_index <= last:
+                self.question_listbox.selection_set(listbox_index)
+
     def filter_questions_event(self, *args):
-        """Callback wrapper for search_var trace."""
+        """Callback wrapper for search_var trace; debounced so a burst of keystrokes refreshes once."""
+        if self.pending_filter_id is not None:
+            self.master.after_cancel(self.pending_filter_id)
+        self.pending_filter_id = self.master.after(self.SEARCH_DEBOUNCE_MS, self.run_pending_filter)
+
+    def run_pending_filter(self):
+        """Run the debounced filter scheduled by filter_questions_event."""
+        self.pending_filter_id = None
         self.filter_questions()
 
     def load_csv(self):
         """Open a file dialog to select and load a CSV file."""
         # Ask to save unsaved changes before loading new file
-        if any(q.get("modified", False) for q in self.questions_data):
+        if self.bank.is_modified():
             if messagebox.askyesno("Unsaved Changes", "There are unsaved changes. Save them to the current file before loading a new one?"):
                 self.save_csv_file() # Attempt to save current file first
+                if self.is_saving():
+                    # A big bank saves in the background; load once it's written
+                    self.load_after_save = True
+                    return
+                if self.is_loading():
+                    return # Can't be saved until loaded (save_csv_file said so); keep the edits
             # If user chooses No, proceed to load without saving
 
+        # A streaming load still running is cancelled once the new file opens
+        if self.is_saving():
+            messagebox.showwarning("Warning", "The question bank is still being saved.")
+            return
+
         # --- Proceed with loading ---
         filepath = filedialog.askopenfilename(
-            title="Open Question Bank CSV", filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")]
+            title="Open Question Bank",
+            filetypes=[("CSV Files", "*.csv"), ("Question Bank Databases", "*.sqlite *.sqlite3 *.db"), ("All Files", "*.*")]
         )
         if not filepath: return
 
+        # Timed from here on, so the file dialog doesn't count
+        with self.profiler.span("load_csv", file=os.path.basename(filepath)):
+            try:
+                if is_database_path(filepath):
+                    # Rows are read from the database as they are shown; nothing to parse up front
+                    new_bank = SQLiteBank.open(filepath)
+                elif os.path.getsize(filepath) >= self.MAPPED_LOAD_MIN_BYTES:
+                    # Huge bank: map it and only find where rows start (or reuse the saved row offsets)
+                    new_bank = MappedQuestionBank.from_csv(filepath)
+                elif os.path.getsize(filepath) >= self.STREAMING_LOAD_MIN_BYTES:
+                    # Big bank: check the header up front, then parse in the background
+                    check_file_headers(filepath)
+                    self.start_streaming_load(filepath)
+                    return
+                else:
+                    # Load into a fresh bank so a failed load leaves the current one intact
+                    new_bank = QuestionBank.from_csv(filepath)
+            except Exception as e:
+                messagebox.showerror("Error Loading CSV", f"An error occurred: {e}")
+                self.update_status("Error loading file.")
+                return
+
+            self.cancel_streaming_load()
+            self.install_bank(new_bank)
+            self.finish_load()
+
+    def install_bank(self, bank):
+        """Make bank the one being edited and reset the list, search and details."""
+        if bank is not self.bank:
+            self.bank.close()
+        self.bank = bank
+        if bank.lazy:
+            # The bank searches its own storage (full-text index, or a scan of the mapped file)
+            self.search_index = bank.search_index()
+        else:
+            self.search_index = SearchIndex()
+            self.search_index.build(zip(bank.row_ids, bank.questions))
+        self.duplicate_index = None
+        self.selected_data_index = None
+        self.listbox_to_data_map = []
+        # Statistics are loaded once the bank is complete (finish_load)
+        self.question_stats = {}
+        self.stats_sort_var.set("Bank order")
+        self.stats_filter_var.set("All questions")
+        self.stats_sort_combo.config(state=tk.DISABLED)
+        self.stats_filter_combo.config(state=tk.DISABLED)
+
+        if bank.path:
+            self.master.title(f"Question Bank Editor - {os.path.basename(bank.path)}")
+        else:
+            self.master.title("Question Bank Editor")
+        self.search_var.set("") # Clear search field
+        self.filter_questions() # Populate listbox using filter
+        self.clear_details()
+        self.set_details_state(tk.DISABLED)
+
+    def finish_load(self):
+        """Enable editing once a bank is fully loaded and report any load warnings."""
+        self.save_all_button.config(state=tk.NORMAL) # Enable "Save All" button
+        self.add_button.config(state=tk.NORMAL)
+        self.lint_button.config(state=tk.NORMAL)
+        self.delete_button.config(state=tk.NORMAL if self.selected_data_index is not None else tk.DISABLED)
+        filename = os.path.basename(self.current_csv_path)
+        message = f"Loaded {len(self.questions_data)} questions from {filename}"
+        if self.bank.load_warnings:
+            message += f" ({len(self.bank.load_warnings)} warnings)"
+            self.show_load_report(filename, self.bank.load_warnings)
+        stats_note = self.load_question_stats()
+        if stats_note:
+            message += f"; {stats_note}"
+        self.update_status(message)
+
+    def load_question_stats(self):
+        """Attach the figures in the bank's .stats.json (bank_cli.py analyze), if it has one, to its rows.
+
+        Returns a note for the status bar, or None if there is no statistics file.
+        """
+        csv_path = self.current_csv_path
+        stats_path = stats_path_for(csv_path)
+        if not os.path.exists(stats_path):
+            return None
         try:
-            # Reset state
-            self.questions_data = []
-            self.original_questions = {}
-            self.selected_data_index = None
-            self.listbox_to_data_map = []
-
-            expected_headers = ["question", "answer", "explanation", "chapter"]
-            with open(filepath, mode='r', newline='', encoding='utf-8') as csvfile:
-                first_line = csvfile.readline()
-                if first_line.startswith('\ufeff'): first_line = first_line[1:]
-                csvfile.seek(0)
-                reader = csv.DictReader(csvfile)
-                if not reader.fieldnames or [h.lower().strip() for h in reader.fieldnames] != [h.lower().strip() for h in expected_headers]:
-                    raise ValueError(f"CSV headers mismatch. Expected: {expected_headers}. Found: {reader.fieldnames}")
-                for i, row in enumerate(reader):
-                    # Convert boolean-like strings explicitly
-                    answer_str = row.get("answer", "").strip().capitalize()
-                    if answer_str not in ["True", "False"]:
-                        print(f"Warning: Row {i+1}: Invalid answer '{row.get('answer')}', defaulting to False.")
-                        answer_str = "False"
-
-                    cleaned_row = {
-                        "question": row.get("question", "").strip(),
-                        "answer": answer_str,
-                        "explanation": row.get("explanation", "").strip(),
-                        "chapter": row.get("chapter", "").strip(),
-                        "modified": False # Reset modified flag on load
-                    }
-                    self.questions_data.append(cleaned_row)
-                    self.original_questions[i] = cleaned_row.copy()
-
-            self.current_csv_path = filepath
-            self.master.title(f"Question Bank Editor - {os.path.basename(filepath)}")
-            self.search_var.set("") # Clear search field
-            self.filter_questions() # Populate listbox using filter
-            self.clear_details()
-            self.set_details_state(tk.DISABLED)
-            self.save_all_button.config(state=tk.NORMAL) # Enable "Save All" button
-            self.add_button.config(state=tk.NORMAL)
-            self.delete_button.config(state=tk.DISABLED)
-            self.update_status(f"Loaded {len(self.questions_data)} questions from {os.path.basename(filepath)}")
+            entries, stamp = read_stats(stats_path)
+            current_stamp = None if is_database_path(csv_path) else file_stamp(csv_path)
+        except (OSError, ValueError) as e:
+            return f"could not read {os.path.basename(stats_path)}: {e}"
+
+        note = ""
+        stats = {}
+        if stamp == current_stamp or self.bank.lazy:
+            # Rows are where they were when analyzed (a database's are those of its db-export)
+            for entry in entries:
+                row_id = self.bank.saved_row_id(entry.row - 1)
+                if row_id is not None:
+                    stats[row_id] = entry
+            if stamp != current_stamp:
+                # Matching by id would read every row of a bank this big
+                note = " (the bank changed since it was analyzed, so rows may not match; analyze it again)"
+        else:
+            # The file changed since it was analyzed: find its questions by the quiz's ids instead
+            by_id = {entry.id: entry for entry in entries}
+            shown = [(row_id, q_data) for row_id, q_data in zip(self.bank.row_ids, self.questions_data)
+                     if is_valid_row(q_data)]
+            for (row_id, _), question_id in zip(shown, question_ids([q_data["question"] for _, q_data in shown])):
+                entry = by_id.get(question_id)
+                if entry is not None:
+                    stats[row_id] = entry
+        self.question_stats = stats
+        self.stats_sort_combo.config(state="readonly")
+        self.stats_filter_combo.config(state="readonly")
+        return f"learner statistics for {len(stats)} questions{note}"
+
+    def show_load_report(self, filename, warnings):
+        """Show all load warnings (e.g. coerced answers) together in one window."""
+        report = tk.Toplevel(self.master)
+        report.title(f"Load Report - {filename}")
+        report_text = tk.Text(report, height=20, width=90, wrap=tk.NONE)
+        report_scrollbar = ttk.Scrollbar(report, orient=tk.VERTICAL, command=report_text.yview)
+        report_text['yscrollcommand'] = report_scrollbar.set
+        report_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        report_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        report_text.insert("1.0", f"{len(warnings)} warning(s) while loading {filename}:\n\n" + "\n".join(warnings))
+        report_text.config(state=tk.DISABLED)
+
+    # --- Streaming load ---
+
+    def is_loading(self):
+        """True while a streaming load is still filling the bank."""
+        return self.load_queue is not None
+
+    def is_saving(self):
+        """True while a background save is writing the file."""
+        return self.save_queue is not None
+
+    def busy_reason(self):
+        """Why the bank can't be changed right now, or None if it can."""
+        if self.is_loading():
+            return "The question bank is still loading."
+        if self.is_saving():
+            return "The question bank is still being saved."
+        return None
+
+    def start_streaming_load(self, filepath):
+        """Parse filepath in a worker thread; rows appear in the list as chunks arrive."""
+        self.cancel_streaming_load()
+        bank = QuestionBank()
+        bank.begin_load(filepath)
+        self.install_bank(bank)
+        # Rows can be browsed, searched and edited meanwhile, but not added,
+        # deleted or saved until the bank is complete
+        self.save_all_button.config(state=tk.DISABLED)
+        self.add_button.config(state=tk.DISABLED)
+        self.lint_button.config(state=tk.DISABLED)
+        self.delete_button.config(state=tk.DISABLED)
+
+        self.load_queue = queue.Queue()
+        self.load_cancel = threading.Event()
+        worker = threading.Thread(
+            target=self.streaming_load_worker, args=(filepath, self.load_queue, self.load_cancel, self.profiler),
+            daemon=True
+        )
+        worker.start()
+        self.update_status(f"Loading {os.path.basename(filepath)}...")
+        self.master.after(self.LOAD_POLL_MS, self.poll_streaming_load)
 
+    @staticmethod
+    def streaming_load_worker(filepath, load_queue, cancel, profiler=NULL_PROFILER):
+        """Worker thread: parse chunks and hand them to the UI thread. Never touches Tk."""
+        try:
+            with profiler.span("load_csv.parse", file=os.path.basename(filepath)):
+                for chunk in read_chunks(filepath):
+                    if cancel.is_set():
+                        return
+                    load_queue.put(("rows", chunk))
+            load_queue.put(("done", None))
         except Exception as e:
-            messagebox.showerror("Error Loading CSV", f"An error occurred: {e}")
+            load_queue.put(("error", e))
+
+    def cancel_streaming_load(self):
+        """Stop a streaming load in progress (its remaining chunks are discarded)."""
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+        self.load_queue = None
+        self.load_cancel = None
+
+    def poll_streaming_load(self):
+        """Drain parsed chunks into the bank, refresh the list and progress, and reschedule."""
+        load_queue = self.load_queue
+        if load_queue is None:
+            return # Cancelled
+
+        first_new = len(self.questions_data)
+        added = 0
+        progress = None
+        outcome = None
+        start = time.perf_counter()
+        deadline = start + self.LOAD_POLL_BUDGET_S
+        while time.perf_counter() < deadline:
+            try:
+                kind, payload = load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "rows":
+                new_ids = self.bank.append_loaded(payload)
+                self.search_index.extend(zip(new_ids, payload.rows))
+                added += len(payload.rows)
+                progress = payload.progress
+            else:
+                outcome = (kind, payload)
+                break
+        if added:
+            self.profiler.record("load_csv.drain", start, time.perf_counter(), {"rows": added})
+
+        if added:
+            if self.search_var.get().strip() or self.question_stats or self.pending_filter_id is not None:
+                self.filter_questions()
+            else:
+                # The list shows the whole bank in order, so the new rows just go on the end
+                self.append_listbox_rows(first_new)
+            if progress is not None:
+                self.update_status(
+                    f"Loading {os.path.basename(self.current_csv_path)}... "
+                    f"{progress:.0%} ({len(self.questions_data)} questions)"
+                )
+
+        if outcome is None:
+            self.master.after(self.LOAD_POLL_MS, self.poll_streaming_load)
+            return
+
+        self.load_queue = None
+        self.load_cancel = None
+        kind, payload = outcome
+        if kind == "done":
+            self.finish_load()
+            # The drains only appended rows; bring the whole list in line (statistics, edits made meanwhile)
+            self.filter_questions()
+        else:
+            # Don't leave a truncated bank around where it could be saved over the file
+            self.install_bank(QuestionBank())
+            self.save_all_button.config(state=tk.DISABLED)
+            self.add_button.config(state=tk.DISABLED)
+            self.lint_button.config(state=tk.DISABLED)
+            messagebox.showerror("Error Loading CSV", f"An error occurred: {payload}")
             self.update_status("Error loading file.")
 
 
@@ -259,11 +761,13 @@ class QuestionBankEditor:
         self.explanation_text.delete("1.0", tk.END)
         self.chapter_entry.delete(0, tk.END)
         self.answer_var.set(False)
+        self.stats_label.config(text="")
         self.set_details_state(tk.DISABLED) # Disable fields AND buttons in details pane
         self.selected_data_index = None
         self.delete_button.config(state=tk.DISABLED)
 
 
+    @timed("on_question_select")
     def on_question_select(self, event=None):
         """Handle selection change in the listbox."""
         selection = self.question_listbox.curselection()
@@ -278,7 +782,8 @@ class QuestionBankEditor:
 
         # --- Keep the auto-save-on-navigate for now ---
         # User can rely on explicit button OR this fallback
-        if self.selected_data_index is not None and self.selected_data_index != new_data_index:
+        # (Skipped during a background save: the details pane is read-only then)
+        if self.selected_data_index is not None and self.selected_data_index != new_data_index and not self.is_saving():
             if not self.update_current_question_in_memory(explicit_save=False): # Pass flag
                 # Reselect previous item visually if update failed/cancelled
                 try:
@@ -303,6 +808,9 @@ class QuestionBankEditor:
             self.chapter_entry.delete(0, tk.END)
             self.chapter_entry.insert(0, q_data.get("chapter", ""))
             self.answer_var.set(q_data.get("answer", "False") == "True")
+            self.stats_label.config(text=self.stats_text(self.bank.row_ids[self.selected_data_index]))
+            if self.is_saving():
+                self.set_details_state(tk.DISABLED)
 
             self.delete_button.config(state=tk.NORMAL)
             self.update_status(f"Displaying question {listbox_index + 1} (of filtered list). Original index: {self.selected_data_index + 1}")
@@ -311,6 +819,17 @@ class QuestionBankEditor:
             self.update_status("Error: Invalid data index.")
 
 
+    def stats_text(self, row_id):
+        """One-line summary of a row's learner statistics for the details pane, or "" if it has none."""
+        stats = self.question_stats.get(row_id)
+        if stats is None:
+            return ""
+        text = (f"Learners: {stats.miss_rate:.0%} missed over {stats.answers} answers from {stats.learners} learners, "
+                f"discrimination {self.format_discrimination(stats)}")
+        if stats.chapter_accuracy is not None:
+            text += f", chapter accuracy {stats.chapter_accuracy:.0%}"
+        return text
+
     # --- *** NEW: Method for the explicit save button *** ---
     def save_this_question(self):
         """Explicitly saves the current question's edits to memory."""
@@ -331,7 +850,8 @@ class QuestionBankEditor:
                   self.update_status(f"Question (original index {index_being_saved + 1}) updated, but no longer matches filter.")
              else:
                   # Use the original index in the success message
-                  self.update_status(f"Question (original index {index_being_saved + 1}) updated in session.")
+                  where = "saved to the database" if self.bank.autosave else "updated in session"
+                  self.update_status(f"Question (original index {index_being_saved + 1}) {where}.")
         else:
              # Update function already shows error message, provide generic status
              self.update_status(f"Failed to update question (original index {index_being_saved + 1}).")
@@ -339,6 +859,7 @@ class QuestionBankEditor:
 
 
     # Modified update function to accept a flag
+    @timed("update_current_question_in_memory")
     def update_current_question_in_memory(self, explicit_save=False):
         """
         Read data from detail widgets and update the in-memory list.
@@ -358,28 +879,17 @@ class QuestionBankEditor:
              return False
 
         try:
-            current_data = self.questions_data[self.selected_data_index]
-
-            # Get data from widgets
-            new_question = self.question_text.get("1.0", tk.END).strip()
-            new_answer_str = "True" if self.answer_var.get() else "False"
-            new_explanation = self.explanation_text.get("1.0", tk.END).strip()
-            new_chapter = self.chapter_entry.get().strip()
-
-            # Check if anything actually changed
-            changed = (
-                new_question != current_data.get("question", "") or
-                new_answer_str != current_data.get("answer", "") or
-                new_explanation != current_data.get("explanation", "") or
-                new_chapter != current_data.get("chapter", "")
+            # Get data from widgets; the bank marks the row modified only if something changed
+            changed = self.bank.update(
+                self.selected_data_index,
+                question=self.question_text.get("1.0", tk.END),
+                answer=self.answer_var.get(),
+                explanation=self.explanation_text.get("1.0", tk.END),
+                chapter=self.chapter_entry.get(),
             )
 
             if changed:
-                current_data["question"] = new_question
-                current_data["answer"] = new_answer_str
-                current_data["explanation"] = new_explanation
-                current_data["chapter"] = new_chapter
-                current_data["modified"] = True # Mark as modified
+                self.search_index.update(self.bank.row_id(self.selected_data_index), self.questions_data[self.selected_data_index])
 
                 # --- Refresh filter to update asterisk and text immediately ---
                 current_data_index_to_reselect = self.selected_data_index
@@ -420,6 +930,16 @@ class QuestionBankEditor:
         if not self.current_csv_path:
             messagebox.showwarning("Warning", "No CSV file loaded or specified to save to.")
             return
+        reason = self.busy_reason()
+        if reason:
+            messagebox.showwarning("Warning", reason)
+            return
+
+        if self.bank.autosave:
+            # Databases commit every edit as it is made; just capture the details pane
+            if self.selected_data_index is None or self.update_current_question_in_memory(explicit_save=False):
+                self.update_status(f"All changes are saved in {os.path.basename(self.current_csv_path)}.")
+            return
 
         # Ensure the currently displayed question's edits are captured before final save
         if self.selected_data_index is not None:
@@ -428,48 +948,128 @@ class QuestionBankEditor:
                 return
 
         # Confirm saving to the *original* path
-        confirm_msg = f"Save all changes ({sum(1 for q in self.questions_data if q.get('modified'))} modified, {len(self.questions_data)} total) to:\n{self.current_csv_path}?"
+        confirm_msg = f"Save all changes ({self.bank.modified_count()} modified, {len(self.questions_data)} total) to:\n{self.current_csv_path}?"
         if not messagebox.askyesno("Confirm Save All", confirm_msg):
             self.update_status("Save cancelled by user.")
             return
 
         save_path = self.current_csv_path # Use the loaded path
 
-        try:
-            # Write data (excluding 'modified' key)
-            headers = ["question", "answer", "explanation", "chapter"]
-            with open(save_path, mode='w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=headers)
-                writer.writeheader()
-                for row_data in self.questions_data:
-                    row_to_write = {k: v for k, v in row_data.items() if k in headers}
-                    writer.writerow(row_to_write)
-
-            # Reset modification markers
-            for item in self.questions_data: item['modified'] = False
-            self.original_questions = {i: data.copy() for i, data in enumerate(self.questions_data)}
-
-            self.master.title(f"Question Bank Editor - {os.path.basename(save_path)}") # Ensure title is correct
-
-            # Refresh filter and reselect
-            current_data_index_to_reselect = self.selected_data_index
-            self.filter_questions() # Refresh listbox to remove '*'
-            if current_data_index_to_reselect is not None:
-                try:
-                    new_listbox_index = self.listbox_to_data_map.index(current_data_index_to_reselect)
-                    self.question_listbox.selection_set(new_listbox_index)
-                    self.question_listbox.activate(new_listbox_index)
-                    self.selected_data_index = current_data_index_to_reselect
-                    self.set_details_state(tk.NORMAL)
-                    self.delete_button.config(state=tk.NORMAL)
-                except ValueError:
-                    self.selected_data_index = None
-                    self.clear_details()
+        # Timed from here on, so the confirmation dialog doesn't count
+        with self.profiler.span("save_csv_file", rows=len(self.questions_data)):
+            try:
+                # Decide what to write: only changed rows if the file is as we loaded it
+                with self.profiler.span("save_csv_file.plan"):
+                    plan = self.bank.prepare_save(save_path)
+                # Edited question texts change question ids; the quiz bundle maps the old ones over
+                question_edits = self.bank.edited_values("question")
+                if len(self.questions_data) >= self.BACKGROUND_SAVE_MIN_ROWS:
+                    self.start_background_save(plan, question_edits)
+                    return
+                # Written to a temp file and renamed over the bank, so a crash can't corrupt it
+                bundle_result = self.write_save(plan, self.questions_data, question_edits, self.profiler)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save CSV file:\n{e}")
+                self.update_status("Error saving file.")
+                return
 
-            self.update_status(f"Question bank saved successfully to {os.path.basename(save_path)}")
+            self.finish_save(plan, bundle_result)
 
+    @staticmethod
+    def write_save(plan, rows, question_edits=(), profiler=NULL_PROFILER):
+        """Write a save plan, then recompile the quiz bundle next to the CSV if there is one.
+
+        Returns (bundle path or None, bundle error or None); a failed bundle
+        doesn't undo the saved CSV. Safe to run in the background save thread.
+        """
+        with profiler.span("save_csv_file.write", incremental=plan.incremental):
+            plan.write()
+        try:
+            with profiler.span("save_csv_file.bundle"):
+                return refresh_bundle(plan.path, rows, question_edits), None
+        except Exception as e:
+            return None, e
+
+    def finish_save(self, plan, bundle_result=(None, None)):
+        """Adopt a written save plan: reset modification markers and refresh the list."""
+        self.bank.finish_save(plan)
+        save_path = plan.path
+
+        self.master.title(f"Question Bank Editor - {os.path.basename(save_path)}") # Ensure title is correct
+
+        # Refresh filter and reselect
+        current_data_index_to_reselect = self.selected_data_index
+        self.filter_questions() # Refresh listbox to remove '*'
+        if current_data_index_to_reselect is not None:
+            try:
+                new_listbox_index = self.listbox_to_data_map.index(current_data_index_to_reselect)
+                self.question_listbox.selection_set(new_listbox_index)
+                self.question_listbox.activate(new_listbox_index)
+                self.selected_data_index = current_data_index_to_reselect
+                self.set_details_state(tk.NORMAL)
+                self.delete_button.config(state=tk.NORMAL)
+            except ValueError:
+                self.selected_data_index = None
+                self.clear_details()
+
+        how = "changed rows only" if plan.incremental else "full rewrite"
+        bundle_path, bundle_error = bundle_result
+        if bundle_path:
+            how += f"; {os.path.basename(bundle_path)} updated"
+        self.update_status(f"Question bank saved successfully to {os.path.basename(save_path)} ({how})")
+        if bundle_error:
+            messagebox.showwarning("Warning", f"The CSV was saved, but the quiz bundle could not be updated:\n{bundle_error}")
+
+    # --- Background save ---
+
+    def start_background_save(self, plan, question_edits=()):
+        """Write plan in a worker thread; the list stays browsable but edits wait until it finishes."""
+        self.save_plan = plan
+        self.save_queue = queue.Queue()
+        self.set_details_state(tk.DISABLED)
+        for button in (self.save_all_button, self.add_button, self.delete_button, self.load_button):
+            button.config(state=tk.DISABLED)
+        # Not a daemon: closing the window shouldn't cut a save short
+        worker = threading.Thread(
+            target=self.background_save_worker,
+            args=(plan, self.questions_data, question_edits, self.save_queue, self.profiler)
+        )
+        worker.start()
+        self.update_status(f"Saving {os.path.basename(plan.path)} in the background...")
+        self.master.after(self.SAVE_POLL_MS, self.poll_background_save)
+
+    @staticmethod
+    def background_save_worker(plan, rows, question_edits, save_queue, profiler=NULL_PROFILER):
+        """Worker thread: write the save plan and report back. Never touches Tk."""
+        try:
+            save_queue.put(("done", QuestionBankEditor.write_save(plan, rows, question_edits, profiler)))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to save CSV file:\n{e}")
+            save_queue.put(("error", e))
+
+    def poll_background_save(self):
+        """Check whether the background save finished; reschedule if not."""
+        try:
+            kind, payload = self.save_queue.get_nowait()
+        except queue.Empty:
+            self.master.after(self.SAVE_POLL_MS, self.poll_background_save)
+            return
+
+        plan = self.save_plan
+        self.save_queue = None
+        self.save_plan = None
+        for button in (self.save_all_button, self.add_button, self.load_button):
+            button.config(state=tk.NORMAL)
+        if self.selected_data_index is not None:
+            self.set_details_state(tk.NORMAL)
+            self.delete_button.config(state=tk.NORMAL)
+
+        load_after_save, self.load_after_save = self.load_after_save, False
+        if kind == "done":
+            self.finish_save(plan, payload)
+            if load_after_save:
+                self.load_csv()
+        else:
+            messagebox.showerror("Error", f"Failed to save CSV file:\n{payload}")
             self.update_status("Error saving file.")
 
     # Add/Delete/Copy methods remain largely the same, using selected_data_index
@@ -477,14 +1077,17 @@ class QuestionBankEditor:
 
     def add_question(self):
         """Add a new, blank question entry."""
+        reason = self.busy_reason()
+        if reason:
+            messagebox.showwarning("Warning", reason)
+            return
         if self.selected_data_index is not None:
             if not self.update_current_question_in_memory(explicit_save=False):
                 self.update_status("Add cancelled: error updating current question.")
                 return
 
-        new_question_data = { "question": "", "answer": "False", "explanation": "", "chapter": "", "modified": True }
-        self.questions_data.append(new_question_data)
-        new_data_index = len(self.questions_data) - 1
+        new_data_index = self.bank.add()
+        self.search_index.add(self.bank.row_id(new_data_index), self.questions_data[new_data_index])
 
         self.filter_questions() # Refresh list based on current search
         try:
@@ -502,6 +1105,10 @@ class QuestionBankEditor:
 
     def delete_question(self):
         """Delete the currently selected question."""
+        reason = self.busy_reason()
+        if reason:
+            messagebox.showwarning("Warning", reason)
+            return
         if self.selected_data_index is None:
             messagebox.showwarning("Warning", "No question selected to delete.")
             return
@@ -518,7 +1125,8 @@ class QuestionBankEditor:
             return
 
         data_index_to_delete = self.selected_data_index
-        del self.questions_data[data_index_to_delete]
+        self.search_index.remove(self.bank.row_id(data_index_to_delete))
+        self.bank.delete(data_index_to_delete)
 
         # Mark the overall dataset as modified if deleting something previously saved
         # This isn't strictly necessary with the current model but good practice
@@ -541,6 +1149,261 @@ class QuestionBankEditor:
 
         self.update_status(f"Question deleted. {len(self.questions_data)} questions remaining.")
 
+    # --- Undo / redo / revert ---
+
+    def update_history_buttons(self):
+        """Enable Undo/Redo only when the bank has something to undo/redo."""
+        self.undo_button.config(state=tk.NORMAL if self.bank.can_undo() else tk.DISABLED)
+        self.redo_button.config(state=tk.NORMAL if self.bank.can_redo() else tk.DISABLED)
+
+    def undo_change(self):
+        """Undo the last edit, addition or deletion."""
+        self.step_history(self.bank.undo, "Undid")
+
+    def redo_change(self):
+        """Redo the last undone change."""
+        self.step_history(self.bank.redo, "Redid")
+
+    def step_history(self, step, verb):
+        """Run bank.undo/bank.redo, keep the search index in sync and show the affected question."""
+        reason = self.busy_reason()
+        if reason:
+            messagebox.showwarning("Warning", reason)
+            return
+        # Capture pending edits in the details pane first, so they are what gets undone
+        if self.selected_data_index is not None:
+            if not self.update_current_question_in_memory(explicit_save=False):
+                self.update_status(f"{verb} cancelled: error updating current question.")
+                return
+        previous_row_id = None
+        if self.selected_data_index is not None:
+            previous_row_id = self.bank.row_id(self.selected_data_index)
+
+        result = step()
+        if result is None:
+            self.update_status("Nothing to undo." if verb == "Undid" else "Nothing to redo.")
+            return
+
+        kind, row_id = result
+        if kind == "update":
+            self.search_index.update(row_id, self.questions_data[self.bank.index_of(row_id)])
+            description = "question edit"
+        elif kind == "add":
+            self.search_index.add(row_id, self.questions_data[self.bank.index_of(row_id)])
+            description = "question restored"
+        else:
+            self.search_index.remove(row_id)
+            description = "question removed"
+            row_id = previous_row_id
+
+        self.show_row(row_id)
+        self.update_status(f"{verb} change ({description}). {len(self.questions_data)} questions.")
+
+    def show_row(self, row_id):
+        """Reload the list and select the question with row_id, loading its details fresh from the bank."""
+        # Drop the current selection first so on_question_select doesn't write
+        # the (now stale) details pane back over the bank
+        self.clear_details()
+        self.filter_questions()
+        data_index = self.bank.index_of(row_id) if row_id is not None else None
+        if data_index is None:
+            return
+        try:
+            listbox_index = self.listbox_to_data_map.index(data_index)
+        except ValueError:
+            return # Not visible with the current filter
+        self.question_listbox.selection_clear(0, tk.END)
+        self.question_listbox.selection_set(listbox_index)
+        self.question_listbox.activate(listbox_index)
+        self.question_listbox.see(listbox_index)
+        self.on_question_select()
+
+    def revert_this_question(self):
+        """Discard unsaved edits to the selected question, restoring the version in the file."""
+        index = self.selected_data_index
+        if index is None:
+            messagebox.showwarning("Warning", "No question selected.")
+            return
+        row_id = self.bank.row_id(index)
+        if row_id in self.bank.added_ids:
+            messagebox.showinfo("Revert", "This question was added in this session and has no saved version.\nUse Delete Question to remove it.")
+            return
+
+        reverted = self.bank.revert(index)
+        if reverted:
+            self.search_index.update(row_id, self.questions_data[index])
+        self.show_row(row_id) # Also throws away edits still in the details pane
+        self.update_status(f"Question (original index {index + 1}) reverted to saved version.")
+
+    def show_duplicates(self):
+        """List questions that are near-duplicates of the selected one, flagging different answers."""
+        if self.selected_data_index is None:
+            messagebox.showwarning("Warning", "No question selected.")
+            return
+        # Compare the text as shown, including edits not yet saved in the session
+        if not self.is_saving() and not self.update_current_question_in_memory(explicit_save=False):
+            return
+        if self.selected_data_index is None:
+            return # The edit moved it out of the current filter
+
+        if self.duplicate_index is None:
+            self.update_status("Indexing questions for duplicate search...")
+            self.duplicate_index = DuplicateIndex()
+        # Picks up adds, deletes and edits since the last lookup
+        self.duplicate_index.sync(zip(self.bank.row_ids, self.questions_data))
+
+        data_index = self.selected_data_index
+        row_id = self.bank.row_id(data_index)
+        matches = self.duplicate_index.similar(row_id)
+        threshold = self.duplicate_index.threshold
+        if not matches:
+            messagebox.showinfo("Duplicates", f"No other question is at least {threshold:.0%} similar to this one.")
+            self.update_status("No duplicates found.")
+            return
+
+        answer = self.questions_data[data_index].get("answer")
+        window = tk.Toplevel(self.master)
+        window.title(f"Duplicates of question {data_index + 1}")
+        ttk.Label(
+            window, text=f"{len(matches)} question(s) at least {threshold:.0%} similar. Double-click one to show it.",
+            padding=5
+        ).pack(side=tk.TOP, anchor="w")
+        match_listbox = tk.Listbox(window, height=min(len(matches), 15), width=110, exportselection=False)
+        match_scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=match_listbox.yview)
+        match_listbox['yscrollcommand'] = match_scrollbar.set
+        match_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        match_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        match_row_ids = []
+        conflicts = 0
+        for similarity, match_row_id in matches:
+            q_data = self.questions_data[self.bank.index_of(match_row_id)]
+            differs = ""
+            if q_data.get("answer") != answer:
+                differs = "  ANSWER DIFFERS"
+                conflicts += 1
+            match_listbox.insert(tk.END, f"{similarity:.0%}  [{q_data.get('answer')}]{differs}  {self.listbox_text(q_data, match_row_id)}")
+            match_row_ids.append(match_row_id)
+
+        def on_open(event=None):
+            selection = match_listbox.curselection()
+            if selection:
+                self.reveal_row(match_row_ids[selection[0]], "Duplicates")
+
+        match_listbox.bind('<Double-Button-1>', on_open)
+        match_listbox.bind('<Return>', on_open)
+        self.update_status(f"{len(matches)} near-duplicate(s) found, {conflicts} with a different answer.")
+
+    def reveal_row(self, row_id, title):
+        """Select a question picked in another window (titled title), clearing the search if it hides it."""
+        data_index = self.bank.index_of(row_id)
+        if data_index is None:
+            messagebox.showinfo(title, "That question has since been deleted.")
+            return
+        if self.selected_data_index is not None and not self.is_saving():
+            if not self.update_current_question_in_memory(explicit_save=False):
+                return
+        if data_index not in self.matching_data_indices():
+            self.search_var.set("")
+            self.stats_filter_var.set("All questions")
+        self.show_row(row_id)
+
+    def show_lint_report(self):
+        """List the findings of a lint report (bank_cli.py lint) on the loaded bank; double-click one to show its row."""
+        csv_path = self.current_csv_path
+        if not csv_path:
+            messagebox.showwarning("Warning", "No question bank loaded.")
+            return
+        report_path = report_path_for(csv_path)
+        if not os.path.exists(report_path):
+            report_path = filedialog.askopenfilename(
+                title="Open Lint Report",
+                initialdir=os.path.dirname(os.path.abspath(csv_path)),
+                filetypes=[("Lint Reports", "*.json *.csv"), ("All Files", "*.*")]
+            )
+            if not report_path: return
+        try:
+            findings, stamp = read_report(report_path)
+            current_stamp = None if is_database_path(csv_path) else file_stamp(csv_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error Opening Lint Report", f"An error occurred: {e}")
+            return
+
+        filename = os.path.basename(csv_path)
+        if is_database_path(csv_path):
+            # The report is of a db-export; rows match as long as the database wasn't edited since
+            note = " Rows refer to a CSV exported from this database."
+        elif stamp is not None and stamp != current_stamp:
+            note = f" {filename} has changed since it was linted, so rows may not match; lint it again."
+        else:
+            note = ""
+        window = tk.Toplevel(self.master)
+        window.title(f"Lint Report - {os.path.basename(report_path)}")
+        ttk.Label(
+            window, text=f"{len(findings)} finding(s) in {filename}. Double-click one to show its row.{note}",
+            padding=5, wraplength=800
+        ).pack(side=tk.TOP, anchor="w")
+        finding_listbox = tk.Listbox(window, height=min(max(len(findings), 1), 20), width=120, exportselection=False)
+        finding_scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=finding_listbox.yview)
+        finding_listbox['yscrollcommand'] = finding_scrollbar.set
+        finding_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        finding_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        if findings:
+            finding_listbox.insert(tk.END, *(
+                f"row {finding.row}  {finding.severity}  [{finding.rule}] {finding.message}" for finding in findings
+            ))
+
+        def on_open(event=None):
+            selection = finding_listbox.curselection()
+            if selection:
+                self.show_lint_finding(findings[selection[0]])
+
+        finding_listbox.bind('<Double-Button-1>', on_open)
+        finding_listbox.bind('<Return>', on_open)
+        errors = sum(finding.severity == "error" for finding in findings)
+        self.update_status(f"Lint report: {errors} error(s), {len(findings) - errors} warning(s).")
+
+    def show_lint_finding(self, finding):
+        """Select the question a lint finding points at, if it is still in the bank."""
+        # Report rows are 1-based rows of the file as it was last loaded or saved
+        row_id = self.bank.saved_row_id(finding.row - 1)
+        if row_id is None:
+            messagebox.showinfo("Lint Report", f"Row {finding.row} is not in the bank as loaded.")
+            return
+        self.reveal_row(row_id, "Lint Report")
+
+    def show_llm_review(self):
+        """Show the stored LLM review of the selected question (from the bank's .reviews.jsonl sidecar)."""
+        if self.selected_data_index is None or not self.current_csv_path:
+            messagebox.showwarning("Warning", "No question selected.")
+            return
+        sidecar = review_path_for(self.current_csv_path)
+        reviews = read_reviews(sidecar)
+        q_data = self.questions_data[self.selected_data_index]
+        entry = latest_review(reviews, q_data)
+        note = ""
+        if entry is None:
+            # Reviewed before the last edit? Fall back to the newest review of the same question text
+            older = [e for entries in reviews.values() for e in entries if e.get("question") == q_data.get("question")]
+            if older:
+                entry = max(older, key=lambda e: e.get("reviewed_at", ""))
+                note = "This question has changed since it was reviewed.\n\n"
+        if entry is None:
+            messagebox.showinfo("LLM Review", f"No review of this question in {os.path.basename(sidecar)}.\n"
+                                              "Run `python bank_cli.py review` to create reviews in batches.")
+            return
+
+        window = tk.Toplevel(self.master)
+        window.title(f"LLM Review - question {self.selected_data_index + 1}")
+        review_text = tk.Text(window, height=25, width=90, wrap=tk.WORD)
+        review_scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=review_text.yview)
+        review_text['yscrollcommand'] = review_scrollbar.set
+        review_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        review_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        header = f"Model: {entry.get('model', '?')}, reviewed {entry.get('reviewed_at', '?')}\n\n"
+        review_text.insert("1.0", note + header + entry.get("review", ""))
+        review_text.config(state=tk.DISABLED)
+
     def copy_llm_prompt(self):
         """Formats the current question details into an LLM prompt and copies to clipboard."""
         if self.selected_data_index is None:
@@ -564,27 +1427,8 @@ class QuestionBankEditor:
             if not messagebox.askyesno("Empty Fields", "The question and explanation fields are empty. Still generate prompt?"):
                 return
 
-        prompt = f"""Please review the following question bank item for accuracy, clarity, and correctness.
-
-Context: This is a True/False question related to chapter/topic "{chapter if chapter else 'Not Specified'}".
-
---- Question ---
-{question}
-
---- Provided Answer ---
-{answer}
-
---- Provided Explanation ---
-{explanation}
-
----
-Please provide feedback on:
-1.  The clarity and accuracy of the **Question**. Is it well-phrased and unambiguous?
-2.  The correctness of the **Provided Answer**. Is it definitively True or False based on the question?
-3.  The accuracy, clarity, and helpfulness of the **Provided Explanation**. Does it correctly justify the answer? Is it easy to understand?
-
-Suggest corrections or improvements if necessary.
-"""
+        # Same prompt `bank_cli.py review` sends in batches
+        prompt = review_prompt({"question": question, "answer": answer, "explanation": explanation, "chapter": chapter})
         try:
             self.master.clipboard_clear()
             self.master.clipboard_append(prompt)
@@ -596,9 +1440,87 @@ Suggest corrections or improvements if necessary.
              messagebox.showerror("Error", f"An unexpected error occurred copying to clipboard:\n{e}")
              self.update_status("Failed to copy prompt.")
 
+    # --- Profiling (only with --profile or QBANK_PROFILE) ---
+
+    def show_profile(self):
+        """Open (or raise) the Performance window: rolling timings of editor operations."""
+        if self.profile_window is not None:
+            self.profile_window.lift()
+            return
+        window = self.profile_window = tk.Toplevel(self.master)
+        window.title("Performance")
+        button_frame = ttk.Frame(window, padding=5)
+        button_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        ttk.Button(button_frame, text="Export Trace...", command=self.export_trace).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Reset", command=self.reset_profile).pack(side=tk.LEFT, padx=(10, 0))
+        self.profile_text = tk.Text(window, height=16, width=100, wrap=tk.NONE)
+        self.profile_text.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        def on_close():
+            self.profile_window = None
+            window.destroy()
+
+        window.protocol("WM_DELETE_WINDOW", on_close)
+        self.refresh_profile()
+
+    def refresh_profile(self):
+        """Redraw the Performance window's table, and reschedule while it is open."""
+        if self.profile_window is None:
+            return
+        lines = [f"{'Operation':<36}{'Count':>8}{'Last':>12}{'p50':>12}{'p95':>12}{'Max':>12}{'Total':>12}"]
+        for entry in self.profiler.stats():
+            lines.append(
+                f"{entry['name']:<36}{entry['count']:>8}"
+                + "".join(f"{format_ms(entry[key]):>12}" for key in ("last", "p50", "p95", "max", "total"))
+            )
+        if len(lines) == 1:
+            lines.append("Nothing timed yet. Load, search, select or save to record timings.")
+        lines.append("")
+        lines.append(f"Percentiles and Max cover the last {self.profiler.window} calls of each operation.")
+        self.profile_text.config(state=tk.NORMAL)
+        self.profile_text.delete("1.0", tk.END)
+        self.profile_text.insert("1.0", "\n".join(lines))
+        self.profile_text.config(state=tk.DISABLED)
+        self.master.after(self.PROFILE_REFRESH_MS, self.refresh_profile)
+
+    def reset_profile(self):
+        self.profiler.reset()
+        self.update_status("Performance timings cleared.")
+
+    def export_trace(self):
+        """Save the recorded timings as a Chrome trace (chrome://tracing, ui.perfetto.dev)."""
+        path = filedialog.asksaveasfilename(
+            title="Export Trace",
+            defaultextension=".json",
+            initialfile="question_bank_trace.json",
+            filetypes=[("Chrome Trace", "*.json"), ("All Files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            self.profiler.write_trace(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to write the trace:\n{e}")
+            return
+        self.update_status(f"Trace written to {os.path.basename(path)}.")
+
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Edit a question bank.")
+    parser.add_argument(
+        "--profile", nargs="?", const="", default=None, metavar="TRACE.json",
+        help="time editor operations (Performance button); with a path, also write a Chrome trace there on exit"
+    )
+    args = parser.parse_args()
+    # QBANK_PROFILE does the same as --profile; the flag wins
+    profiler, trace_path = profiler_from_env()
+    if args.profile is not None:
+        profiler, trace_path = Profiler(), (args.profile or None)
+
     root = tk.Tk()
-    app = QuestionBankEditor(root)
+    app = QuestionBankEditor(root, profiler)
     root.mainloop()
+    if trace_path:
+        profiler.write_trace(trace_path)
+        print(f"Trace written to {trace_path}")
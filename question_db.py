@@ -0,0 +1,510 @@
+"""SQLite storage for question banks too big (or too shared) for a CSV.
+
+A bank database holds one row per question in the `questions` table; the
+integer primary key is the row id, so rows keep their order and ids stay
+stable across edits. It is AUTOINCREMENT, so the id of a deleted row is
+never given to a new one (an undo puts the deleted row back under it).
+When SQLite has FTS5 with the trigram tokenizer (SQLite 3.34+), a
+`questions_fts` index kept current by triggers answers the search box;
+otherwise searches scan the table.
+
+SQLiteBank offers the same interface as QuestionBank, with two differences
+the editor checks for:
+
+  lazy      rows are read from the database on demand, a page at a time,
+            so callers shouldn't touch every row just to display the list.
+  autosave  each add/update/delete (and undo/redo) is committed as its own
+            transaction immediately; there is no separate save step and no
+            row is ever "modified".
+
+import_csv and export_csv convert from and to the CSV format QuestionBank
+loads and saves; a CSV imported and exported again is byte-for-byte what
+the editor's full rewrite of it would be.
+
+This module must not import tkinter.
+"""
+import bisect
+import collections
+import sqlite3
+from array import array
+
+from question_bank import DEFAULT_LAYOUT, HEADERS, Question, SavePlan, normalize_answer, read_chunks
+
+DATABASE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+# 2: questions.id is AUTOINCREMENT (version 1 databases are upgraded when opened)
+SCHEMA_VERSION = 2
+
+_QUESTIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question TEXT NOT NULL DEFAULT '',
+    answer TEXT NOT NULL DEFAULT 'False',
+    explanation TEXT NOT NULL DEFAULT '',
+    chapter TEXT NOT NULL DEFAULT ''
+)
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+""" + _QUESTIONS_TABLE.format(name="questions") + ";"
+
+_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question, explanation, chapter, content='questions', content_rowid='id', tokenize='trigram'
+)
+"""
+
+# Keep questions_fts in step with questions
+_FTS_TRIGGERS = ("""
+CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts(rowid, question, explanation, chapter)
+    VALUES (new.id, new.question, new.explanation, new.chapter);
+END
+""", """
+CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, question, explanation, chapter)
+    VALUES ('delete', old.id, old.question, old.explanation, old.chapter);
+END
+""", """
+CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, question, explanation, chapter)
+    VALUES ('delete', old.id, old.question, old.explanation, old.chapter);
+    INSERT INTO questions_fts(rowid, question, explanation, chapter)
+    VALUES (new.id, new.question, new.explanation, new.chapter);
+END
+""")
+_FTS_TRIGGER_NAMES = ("questions_fts_insert", "questions_fts_delete", "questions_fts_update")
+
+# Trigram full-text search can't match terms shorter than this
+FTS_MIN_TERM = 3
+# Seconds to wait for another writer's lock before giving up
+BUSY_TIMEOUT_S = 10
+
+
+def is_database_path(path):
+    """True if path names a bank database rather than a CSV (by extension)."""
+    return path.lower().endswith(DATABASE_SUFFIXES)
+
+
+def connect(path):
+    """Open (creating if needed) a bank database and make sure its tables exist."""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_S)
+    # Readers don't block the writer (and vice versa) when several people share a bank
+    conn.execute("PRAGMA journal_mode=WAL")
+    # The editor's search semantics: Python's (Unicode) lowercase, substring match
+    conn.create_function("pylower", 1, lambda text: (text or "").lower(), deterministic=True)
+    conn.executescript(_SCHEMA)
+    with conn:
+        _upgrade_questions_table(conn)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        try:
+            conn.execute(_FTS_TABLE)
+        except sqlite3.OperationalError:
+            pass # No FTS5 or no trigram tokenizer: searches scan the table instead
+        else:
+            for trigger in _FTS_TRIGGERS:
+                conn.execute(trigger)
+    return conn
+
+
+def _upgrade_questions_table(conn):
+    """Copy a version 1 questions table (ids could be reused) into an AUTOINCREMENT one, keeping ids."""
+    def upgraded():
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'questions'").fetchone()[0]
+        return "AUTOINCREMENT" in sql.upper()
+
+    if upgraded():
+        return
+    # Take the write lock first, then check again: another editor may have just upgraded it
+    conn.execute("BEGIN IMMEDIATE")
+    if upgraded():
+        return
+    conn.execute(_QUESTIONS_TABLE.format(name="questions_upgrade"))
+    conn.execute("INSERT INTO questions_upgrade (id, question, answer, explanation, chapter) "
+                 "SELECT id, question, answer, explanation, chapter FROM questions")
+    # Dropping the table drops its full-text triggers; connect() creates them again.
+    # The full-text index is keyed by id, which doesn't change, so it stays valid.
+    conn.execute("DROP TABLE questions")
+    conn.execute("ALTER TABLE questions_upgrade RENAME TO questions")
+
+
+def has_fts(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'questions_fts'").fetchone() is not None
+
+
+def import_csv(csv_path, db_path, replace=False):
+    """Load a bank CSV into a database; returns (question count, load warnings).
+
+    Rows are cleaned exactly as QuestionBank.load cleans them. Raises
+    ValueError if the database already has questions, unless replace is set.
+    """
+    chunks = list(read_chunks(csv_path)) # Parse everything before touching the database
+    conn = connect(db_path)
+    try:
+        with conn:
+            if conn.execute("SELECT 1 FROM questions LIMIT 1").fetchone() and not replace:
+                raise ValueError(f"{db_path} already contains questions.")
+            fts = has_fts(conn)
+            if fts:
+                # Indexing row by row through the triggers is far slower than one rebuild at the end
+                for trigger in _FTS_TRIGGER_NAMES:
+                    conn.execute(f"DROP TRIGGER {trigger}")
+            conn.execute("DELETE FROM questions")
+            count = 0
+            warnings = []
+            for chunk in chunks:
+                conn.executemany(
+                    "INSERT INTO questions (id, question, answer, explanation, chapter) VALUES (?, ?, ?, ?, ?)",
+                    ((count + i + 1, row["question"], row["answer"], row["explanation"], row["chapter"])
+                     for i, row in enumerate(chunk.rows)),
+                )
+                count += len(chunk.rows)
+                warnings.extend(chunk.warnings)
+            if fts:
+                conn.execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+                for trigger in _FTS_TRIGGERS:
+                    conn.execute(trigger)
+    finally:
+        conn.close()
+    return count, warnings
+
+
+def export_csv(db_path, csv_path):
+    """Write a database's questions to csv_path in the editor's CSV format; returns the count."""
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute("SELECT id, question, answer, explanation, chapter FROM questions ORDER BY id")
+        rows = (dict(zip(HEADERS, record[1:])) for record in cursor)
+        # A full-rewrite SavePlan is exactly what the editor writes for a fresh save
+        plan = SavePlan(csv_path, [("rows", rows)], array('q'), DEFAULT_LAYOUT)
+        plan.write()
+        return len(plan.new_offsets) - 1
+    finally:
+        conn.close()
+
+
+class DatabaseRows:
+    """Sequence view of an SQLiteBank's rows that reads them a page at a time.
+
+    Recently used rows are cached (keyed by row id, so adds and deletes don't
+    invalidate the cache); peek() returns a row only if it is already cached.
+    """
+
+    PAGE_SIZE = 200
+    CACHE_ROWS = 20000
+
+    def __init__(self, bank):
+        self.bank = bank
+        self._cache = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.bank.row_ids)
+
+    def __getitem__(self, index):
+        row_ids = self.bank.row_ids
+        if index < 0:
+            index += len(row_ids)
+        row_id = row_ids[index]
+        row = self._cache.get(row_id)
+        if row is None:
+            self._fetch(index)
+            row = self._cache.get(row_id)
+            if row is None:
+                raise KeyError(f"Question {row_id} is no longer in {self.bank.path}.")
+        else:
+            self._cache.move_to_end(row_id)
+        return row
+
+    def __iter__(self):
+        # Streams every row without filling the cache
+        cursor = self.bank.conn.execute("SELECT id, question, answer, explanation, chapter FROM questions ORDER BY id")
+        for record in cursor:
+            cached = self._cache.get(record[0])
+            yield cached if cached is not None else _row_from(record)
+
+    def peek(self, index):
+        """The row at index if it is cached, else None (never touches the database)."""
+        return self._cache.get(self.bank.row_ids[index])
+
+    def _fetch(self, index):
+        page_ids = self.bank.row_ids[index:index + self.PAGE_SIZE]
+        cursor = self.bank.conn.execute(
+            "SELECT id, question, answer, explanation, chapter FROM questions WHERE id BETWEEN ? AND ?",
+            (page_ids[0], page_ids[-1]),
+        )
+        for record in cursor:
+            self.store(record[0], _row_from(record))
+        while len(self._cache) > self.CACHE_ROWS:
+            self._cache.popitem(last=False)
+
+    def store(self, row_id, row):
+        self._cache[row_id] = row
+        self._cache.move_to_end(row_id)
+
+    def forget(self, row_id):
+        self._cache.pop(row_id, None)
+
+
+def _row_from(record):
+    return Question(record[1], record[2] == "True", record[3], record[4])
+
+
+class FullTextIndex:
+    """SearchIndex stand-in that searches the bank's database.
+
+    The maintenance methods are no-ops: the database's own triggers keep the
+    full-text index current as rows are written.
+    """
+
+    def __init__(self, conn, fields=HEADERS):
+        self.conn = conn
+        self.fields = tuple(field for field in fields if field != "answer")
+        self.fts = has_fts(conn)
+
+    def build(self, items):
+        pass
+
+    def extend(self, items):
+        pass
+
+    def add(self, row_id, row):
+        pass
+
+    def remove(self, row_id):
+        pass
+
+    def update(self, row_id, row):
+        pass
+
+    def search(self, term, fields=("question",)):
+        """Sorted row ids whose field text contains term, matched like SearchIndex.search."""
+        term = term.lower().strip()
+        fields = [f for f in fields if f in self.fields]
+        if not term:
+            return [row[0] for row in self.conn.execute("SELECT id FROM questions ORDER BY id")]
+        if not fields:
+            return []
+        if self.fts and len(term) >= FTS_MIN_TERM:
+            # Trigram FTS matches a quoted string as a case-insensitive substring
+            query = "{%s} : \"%s\"" % (" ".join(fields), term.replace('"', '""'))
+            sql = "SELECT rowid FROM questions_fts WHERE questions_fts MATCH ? ORDER BY rowid"
+            return [row[0] for row in self.conn.execute(sql, (query,))]
+        condition = " OR ".join(f"instr(pylower({field}), ?) > 0" for field in fields)
+        sql = f"SELECT id FROM questions WHERE {condition} ORDER BY id"
+        return [row[0] for row in self.conn.execute(sql, [term] * len(fields))]
+
+
+class SQLiteBank:
+    """A question bank stored in an SQLite database (see the module docstring).
+
+    Indices and row ids mean the same as for QuestionBank; only the row ids
+    are held in memory.
+    """
+
+    lazy = True
+    autosave = True
+    UNDO_LIMIT = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = connect(path)
+        self.row_ids = array('q', (row[0] for row in self.conn.execute("SELECT id FROM questions ORDER BY id")))
+        self.questions = DatabaseRows(self)
+        self.load_warnings = []
+        self.last_save_incremental = True
+        # Everything is saved as it happens, so there are never unsaved changes
+        self.changes = {}
+        self.added_ids = set()
+        self._undo_stack = collections.deque(maxlen=self.UNDO_LIMIT)
+        self._redo_stack = []
+
+    @classmethod
+    def open(cls, path):
+        return cls(path)
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    def __getitem__(self, index):
+        return self.questions[index]
+
+    def search_index(self):
+        """A SearchIndex-compatible searcher backed by the database."""
+        return FullTextIndex(self.conn)
+
+    # --- Editing (each call is one committed transaction) ---
+
+    def add(self, question="", answer="False", explanation="", chapter=""):
+        """Append a new question and return its index."""
+        answer_str, _ = normalize_answer(answer)
+        row = Question(question.strip(), answer_str == "True", explanation.strip(), chapter.strip())
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO questions (question, answer, explanation, chapter) VALUES (?, ?, ?, ?)",
+                [row[field] for field in HEADERS],
+            )
+        row_id = cursor.lastrowid
+        self._insert(row_id, row)
+        self._push(("add", row_id, row.copy()))
+        return len(self.row_ids) - 1
+
+    def update(self, index, **fields):
+        """Update schema fields of the question at index; returns True if anything changed."""
+        unknown = set(fields) - set(HEADERS)
+        if unknown:
+            raise KeyError(f"Unknown question field(s): {sorted(unknown)}")
+
+        current_data = self.questions[index]
+        edits = {}
+        for key, value in fields.items():
+            if key == "answer":
+                value, _ = normalize_answer(value)
+            else:
+                value = (value or "").strip()
+            old_value = current_data.get(key, "")
+            if value != old_value:
+                edits[key] = (old_value, value)
+
+        if not edits:
+            return False
+        row_id = self.row_ids[index]
+        self._write_edits(row_id, edits)
+        self._push(("update", row_id, edits))
+        return True
+
+    def delete(self, index):
+        """Remove and return the question at index."""
+        row_id = self.row_ids[index]
+        row = self.questions[index].copy()
+        with self.conn:
+            self.conn.execute("DELETE FROM questions WHERE id = ?", (row_id,))
+        self._remove(row_id)
+        self._push(("delete", row_id, row))
+        return row
+
+    def revert(self, index):
+        """Nothing to revert: edits are saved as they are made."""
+        return False
+
+    # --- Undo / redo ---
+
+    def can_undo(self):
+        return bool(self._undo_stack)
+
+    def can_redo(self):
+        return bool(self._redo_stack)
+
+    def undo(self):
+        """Undo the most recent edit, addition or deletion; returns (kind, row_id) like QuestionBank.undo."""
+        if not self._undo_stack:
+            return None
+        op = self._undo_stack.pop()
+        self._redo_stack.append(op)
+        return self._replay(op, reverse=True)
+
+    def redo(self):
+        """Redo the last undone operation; returns (kind, row_id) like undo()."""
+        if not self._redo_stack:
+            return None
+        op = self._redo_stack.pop()
+        self._undo_stack.append(op)
+        return self._replay(op, reverse=False)
+
+    def _push(self, op):
+        self._undo_stack.append(op)
+        self._redo_stack.clear()
+
+    def _replay(self, op, reverse):
+        kind, row_id = op[0], op[1]
+        if kind == "update":
+            edits = op[2]
+            if reverse:
+                edits = {field: (new, old) for field, (old, new) in edits.items()}
+            self._write_edits(row_id, edits)
+            return ("update", row_id)
+
+        # Adding and deleting are each other's inverse
+        inserting = (kind == "add") != reverse
+        if inserting:
+            row = op[2].copy()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO questions (id, question, answer, explanation, chapter) VALUES (?, ?, ?, ?, ?)",
+                    [row_id] + [row[field] for field in HEADERS],
+                )
+            self._insert(row_id, row)
+        else:
+            with self.conn:
+                self.conn.execute("DELETE FROM questions WHERE id = ?", (row_id,))
+            self._remove(row_id)
+        return ("add" if inserting else "delete", row_id)
+
+    def _write_edits(self, row_id, edits):
+        assignments = ", ".join(f"{field} = ?" for field in edits)
+        with self.conn:
+            self.conn.execute(
+                f"UPDATE questions SET {assignments} WHERE id = ?",
+                [new for _, new in edits.values()] + [row_id],
+            )
+        index = self.index_of(row_id)
+        row = self.questions[index]
+        for field, (_, new_value) in edits.items():
+            row[field] = new_value
+
+    def _insert(self, row_id, row):
+        index = bisect.bisect_left(self.row_ids, row_id)
+        self.row_ids.insert(index, row_id)
+        self.questions.store(row_id, row)
+
+    def _remove(self, row_id):
+        del self.row_ids[self.index_of(row_id)]
+        self.questions.forget(row_id)
+
+    # --- Queries ---
+
+    def row_id(self, index):
+        """Stable id of the question currently at index."""
+        return self.row_ids[index]
+
+    def index_of(self, row_id):
+        """Current index of the question with row_id, or None if it was deleted."""
+        pos = bisect.bisect_left(self.row_ids, row_id)
+        if pos < len(self.row_ids) and self.row_ids[pos] == row_id:
+            return pos
+        return None
+
+    def saved_row_id(self, file_row):
+        """Id of the question in row file_row (0-based) of a db-export of this database, or None."""
+        # Changes are written immediately and db-export keeps row order
+        if not 0 <= file_row < len(self.row_ids):
+            return None
+        return self.row_ids[file_row]
+
+    def row_modified(self, row_id):
+        return False
+
+    def saved_values(self, index):
+        return {}
+
+    def edited_values(self, field):
+        return []
+
+    def modified_count(self):
+        return 0
+
+    def is_modified(self):
+        return False
+
+    def validate(self):
+        """Return a list of (index, message) problems in the current data."""
+        problems = []
+        for i, q in enumerate(self.questions):
+            if not q.get("question"):
+                problems.append((i, "Question text is empty."))
+        return problems
@@ -0,0 +1,223 @@
+"""Near-duplicate question detection with MinHash and locality-sensitive hashing.
+
+Merged banks collect reworded copies of the same question. Comparing every
+pair of questions is quadratic, so DuplicateIndex instead:
+
+  1. splits each question into shingles (runs of SHINGLE_WORDS words),
+  2. summarizes the shingle set with a MinHash signature (one-permutation
+     MinHash: each shingle is hashed once into one of SIGNATURE_SIZE bins,
+     and each bin keeps its smallest hash; this costs one hash per shingle
+     instead of one per shingle per bin),
+  3. cuts the signature into bands and files the row under each band's
+     value. Rows with similar shingle sets are likely to share a band.
+
+Only rows sharing a band are compared, by the exact Jaccard similarity of
+their shingle sets, so reported similarities are exact; the banding only
+decides which pairs get looked at. With the defaults, pairs at 0.7
+similarity are found about 99% of the time.
+
+Signatures use Python's per-process string hash, so they are not stable
+between runs and must not be stored.
+
+This module must not import tkinter.
+"""
+import re
+
+SHINGLE_WORDS = 3
+SIGNATURE_SIZE = 36
+BAND_ROWS = 3
+DEFAULT_THRESHOLD = 0.7
+
+_TOKEN_RE = re.compile(r"\w+")
+_BAND_COUNT = SIGNATURE_SIZE // BAND_ROWS
+# Keys of bands with no filled bins; rows aren't filed under those
+_EMPTY_BAND_KEYS = {hash((band,) + (None,) * BAND_ROWS) for band in range(_BAND_COUNT)}
+
+
+def shingles(text):
+    """Set of SHINGLE_WORDS-word tuples from text, lowercased; short texts give one shingle."""
+    words = _TOKEN_RE.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {tuple(words)} if words else set()
+    return set(zip(*(words[i:] for i in range(SHINGLE_WORDS))))
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two sets (0.0 if both are empty)."""
+    if not a and not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+def minhash_signature(shingle_set):
+    """One-permutation MinHash signature of a shingle set: SIGNATURE_SIZE bins, None where empty."""
+    # Assigning in descending hash order leaves each bin with its smallest hash
+    bins = {h % SIGNATURE_SIZE: h for h in sorted(map(hash, shingle_set), reverse=True)}
+    return tuple(map(bins.get, range(SIGNATURE_SIZE)))
+
+
+def band_keys(signature):
+    """Set of keys for the signature's bands, leaving out bands whose bins are all empty.
+
+    Short questions have fewer shingles than bins. Two rows agreeing on an
+    empty bin says nothing about their similarity, so all-empty bands are
+    skipped rather than letting every short question collide there.
+    """
+    rows = iter(signature)
+    return set(map(hash, zip(range(_BAND_COUNT), *[rows] * BAND_ROWS))) - _EMPTY_BAND_KEYS
+
+
+class DuplicateIndex:
+    """LSH index over one text field of bank rows, keyed by caller-supplied row ids.
+
+    Row ids must be hashable and sortable, as for SearchIndex.
+    """
+
+    def __init__(self, field="question", threshold=DEFAULT_THRESHOLD):
+        self.field = field
+        self.threshold = threshold
+        self._texts = {}
+        # Band key -> row id, or a list of row ids once a second row lands there.
+        # Most buckets hold one row, and a bare id is much smaller than a list.
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._texts)
+
+    # --- Maintenance ---
+
+    def build(self, items):
+        """Rebuild from an iterable of (row_id, row) pairs."""
+        self._texts = {}
+        self._buckets = {}
+        for row_id, row in items:
+            self.add(row_id, row)
+
+    def _keys(self, text):
+        return band_keys(minhash_signature(shingles(text)))
+
+    def add(self, row_id, row):
+        """Index a new row."""
+        text = row.get(self.field, "")
+        self._texts[row_id] = text
+        buckets = self._buckets
+        for key in self._keys(text):
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = row_id
+            elif type(bucket) is list:
+                bucket.append(row_id)
+            else:
+                buckets[key] = [bucket, row_id]
+
+    def remove(self, row_id):
+        """Drop a row from the index (no-op if it isn't indexed)."""
+        text = self._texts.pop(row_id, None)
+        if text is None:
+            return
+        # Band keys aren't stored per row; recomputing them is cheap
+        buckets = self._buckets
+        for key in self._keys(text):
+            bucket = buckets[key]
+            if type(bucket) is not list:
+                del buckets[key]
+                continue
+            bucket.remove(row_id)
+            if len(bucket) == 1:
+                buckets[key] = bucket[0]
+
+    def update(self, row_id, row):
+        """Re-index a row if its text changed."""
+        if self._texts.get(row_id) == row.get(self.field, ""):
+            return
+        self.remove(row_id)
+        self.add(row_id, row)
+
+    def sync(self, items):
+        """Bring the index in line with an iterable of (row_id, row) pairs: all rows, current state.
+
+        Only rows that were added, removed or edited since the last call are
+        re-indexed, so callers can sync before each query instead of hooking
+        every edit.
+        """
+        seen = set()
+        texts = self._texts
+        for row_id, row in items:
+            seen.add(row_id)
+            if texts.get(row_id) != row.get(self.field, ""):
+                self.update(row_id, row)
+        for row_id in [row_id for row_id in texts if row_id not in seen]:
+            self.remove(row_id)
+
+    # --- Queries ---
+
+    def candidates(self, row_id):
+        """Rows sharing at least one band with row_id (not verified)."""
+        found = set()
+        text = self._texts.get(row_id)
+        if text is None:
+            return found
+        for key in self._keys(text):
+            bucket = self._buckets[key]
+            if type(bucket) is list:
+                found.update(bucket)
+        found.discard(row_id)
+        return found
+
+    def similar(self, row_id, threshold=None):
+        """(similarity, row id) pairs for rows at least threshold similar to row_id, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        if row_id not in self._texts:
+            return []
+        target = shingles(self._texts[row_id])
+        matches = []
+        for other in self.candidates(row_id):
+            similarity = jaccard(target, shingles(self._texts[other]))
+            if similarity >= threshold:
+                matches.append((similarity, other))
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return matches
+
+    def clusters(self, threshold=None):
+        """Groups of near-duplicate rows: sorted row id lists of two or more, in order of their first row.
+
+        Rows are grouped when linked by a chain of pairs that are each at
+        least threshold similar.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        parent = {}
+
+        def find(row_id):
+            root = row_id
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while row_id != root:
+                parent[row_id], row_id = root, parent.get(row_id, row_id)
+            return root
+
+        shingle_cache = {}
+
+        def shingles_of(row_id):
+            found = shingle_cache.get(row_id)
+            if found is None:
+                found = shingle_cache[row_id] = shingles(self._texts[row_id])
+            return found
+
+        for bucket in self._buckets.values():
+            if type(bucket) is not list:
+                continue
+            for i, first in enumerate(bucket):
+                for second in bucket[i + 1:]:
+                    root_a, root_b = find(first), find(second)
+                    if root_a == root_b:
+                        continue # Already grouped through other pairs
+                    if jaccard(shingles_of(first), shingles_of(second)) >= threshold:
+                        parent.setdefault(root_a, root_a)
+                        parent.setdefault(root_b, root_b)
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = {}
+        for row_id in parent:
+            groups.setdefault(find(row_id), []).append(row_id)
+        return sorted((sorted(group) for group in groups.values()), key=lambda group: group[0])
@@ -0,0 +1,414 @@
+"""Memory-mapped CSV banks that decode rows only when they are needed.
+
+QuestionBank.load parses every row of a bank up front, although the editor's
+list only shows the start of each question. MappedQuestionBank maps the CSV
+into memory instead and records just where each row starts, in one pass over
+the bytes (quoted fields may span lines, so a line ends a row only when the
+quotes seen so far are balanced). A row is decoded when something reads it:
+the list showing it, or the editor selecting it. Rows that are edited or
+added stay in memory as ordinary dicts until the next save.
+
+The row offsets are saved next to the CSV (questions.csv ->
+questions.offsets) with the file's size and modification time, so reopening
+an unchanged bank skips even that pass.
+
+Saving is QuestionBank's: untouched rows are copied byte for byte and only
+edited ones are encoded afresh. Rows aren't cleaned or checked until they
+are read, so there are no load warnings, and rows that a full load would
+have normalized (stray whitespace, odd answers) are written back as they
+were unless they are edited.
+
+This module must not import tkinter.
+"""
+import bisect
+import collections
+import csv
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+from question_bank import HEADERS, QuestionBank, check_headers, clean_row, detect_layout
+from question_search import SEARCH_FIELDS
+
+OFFSET_INDEX_SUFFIX = ".offsets"
+# Bytes of the mapped file examined per step while finding row boundaries
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+# Offset index file: this header, then row count + 1 little-endian uint64 offsets
+_INDEX_MAGIC = b"QBOFFS01"
+_INDEX_HEADER = struct.Struct("<8sQqQ") # magic, CSV size, CSV mtime_ns, row count
+
+
+def index_path_for(csv_path):
+    """Where the offset index of a bank CSV goes: questions.csv -> questions.offsets."""
+    root, _ = os.path.splitext(csv_path)
+    return root + OFFSET_INDEX_SUFFIX
+
+
+def scan_row_offsets(data, start):
+    """Row boundaries in data (bytes or mmap) from start, which is just past the header.
+
+    Returns array('Q') where row k spans offsets[k]..offsets[k + 1]. Blank
+    lines are skipped the way csv.DictReader skips them; like read_chunks,
+    they count as part of the next row's range.
+    """
+    offsets = array('Q', [start])
+    size = len(data)
+    quoted = False # Inside a quoted field at the end of the last complete line
+    carried = 0 # Quotes in the unfinished line at the end of the previous block
+    record_start = start
+    pos = start
+    while pos < size:
+        block = data[pos:pos + SCAN_BLOCK_SIZE]
+        lines = block.split(b"\n")
+        unfinished = lines.pop()
+        end = pos
+        for line in lines:
+            end += len(line) + 1
+            # An odd number of quotes flips in/out of a quoted field ("" escapes come in pairs)
+            if (line.count(b'"') + carried) & 1:
+                quoted = not quoted
+            carried = 0
+            if not quoted:
+                if end - record_start > 2 or data[record_start:end] not in (b"\n", b"\r\n"):
+                    offsets.append(end)
+                record_start = end
+        carried += unfinished.count(b'"')
+        pos += len(block)
+    # A last row without a newline (or with an unterminated quote) runs to the end
+    if record_start < size and data[record_start:size].strip(b"\r\n"):
+        offsets.append(size)
+    return offsets
+
+
+def read_offset_index(csv_path, stamp, start):
+    """Saved row offsets for csv_path, or None unless they were saved for the file as it is now.
+
+    stamp is the file's (size, mtime_ns) and start where its first row begins.
+    """
+    try:
+        with open(index_path_for(csv_path), "rb") as f:
+            magic, size, mtime_ns, count = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+            if magic != _INDEX_MAGIC or (size, mtime_ns) != tuple(stamp):
+                return None
+            offsets = array('Q')
+            offsets.fromfile(f, count + 1)
+    except (OSError, EOFError, struct.error):
+        return None
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    if offsets[0] != start or offsets[-1] > stamp[0]:
+        return None
+    return offsets
+
+
+def write_offset_index(csv_path, stamp, offsets):
+    """Save row offsets next to csv_path for the file as stamped; returns False if that isn't possible."""
+    path = index_path_for(csv_path)
+    data = array('Q', offsets)
+    if sys.byteorder == "big":
+        data.byteswap()
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix=os.path.basename(path) + ".", suffix=".tmp")
+    except OSError:
+        return False # e.g. a read-only directory: the bank still opens, just without the shortcut
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(_INDEX_HEADER.pack(_INDEX_MAGIC, stamp[0], stamp[1], len(offsets) - 1))
+            data.tofile(out)
+        shutil.copymode(csv_path, tmp_path) # Readable by whoever can read the bank
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def parse_record(raw):
+    """Cleaned question dict from the bytes of one CSV record (plus any blank lines before it)."""
+    text = raw.decode("utf-8").lstrip("\r\n")
+    if '"' in text:
+        fields = next(csv.reader([text]), [])
+    else:
+        # Nothing quoted, so every comma separates fields; much faster than the csv module
+        fields = text.rstrip("\r\n").split(",")
+    row, _ = clean_row(dict(zip(HEADERS, fields)))
+    return row
+
+
+class MappedRows:
+    """Sequence view of a MappedQuestionBank's rows, decoding them from the mapped file on demand.
+
+    Rows edited or added since the last save are pinned in memory; others are
+    decoded when read and kept in a bounded cache. peek() returns a row only
+    if that takes no decoding.
+    """
+
+    CACHE_ROWS = 20000
+
+    def __init__(self, bank):
+        self.bank = bank
+        self._pinned = {}
+        self._cache = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.bank.row_ids)
+
+    def __getitem__(self, index):
+        row_id = self.bank.row_ids[index]
+        row = self._pinned.get(row_id)
+        if row is not None:
+            return row
+        row = self._cache.get(row_id)
+        if row is None:
+            row = self._cache[row_id] = self.bank.read_row(row_id)
+            if len(self._cache) > self.CACHE_ROWS:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(row_id)
+        return row
+
+    def __iter__(self):
+        return self.iter_rows(self.bank.row_ids)
+
+    def get(self, row_id):
+        """The row with row_id, decoding it if needed but without caching it."""
+        row = self._pinned.get(row_id) or self._cache.get(row_id)
+        return row if row is not None else self.bank.read_row(row_id)
+
+    def iter_rows(self, row_ids):
+        """The rows with row_ids, decoding them as needed without caching them."""
+        self.bank.check_mapping()
+        decode = self.bank.decode_row
+        for row_id in row_ids:
+            row = self._pinned.get(row_id) or self._cache.get(row_id)
+            yield row if row is not None else decode(row_id)
+
+    def peek(self, index):
+        """The row at index if it is in memory, else None (never decodes)."""
+        row_id = self.bank.row_ids[index]
+        row = self._pinned.get(row_id)
+        return row if row is not None else self._cache.get(row_id)
+
+    def pinned_ids(self):
+        return self._pinned.keys()
+
+    # --- Called by MappedQuestionBank (QuestionBank updates row_ids around these) ---
+
+    def insert(self, index, row):
+        self.pin(self.bank.row_ids[index], row)
+
+    def pop(self, index):
+        row_id = self.bank.row_ids[index]
+        row = self.get(row_id)
+        self._pinned.pop(row_id, None)
+        self._cache.pop(row_id, None)
+        return row
+
+    def pin(self, row_id, row):
+        self._pinned[row_id] = row
+        self._cache.pop(row_id, None)
+
+    def unpin_all(self):
+        """Forget pinned rows once the file holds them."""
+        self._pinned = {}
+
+
+class MappedSearch:
+    """SearchIndex stand-in for a MappedQuestionBank: scans the mapped file instead of keeping an index.
+
+    Candidate rows are found with a case-insensitive byte search of the file
+    and confirmed by decoding them; pinned rows are checked from memory. A
+    query that extends the previous one only rechecks the previous result.
+    The maintenance methods just note that rows changed.
+    """
+
+    def __init__(self, bank, fields=SEARCH_FIELDS):
+        self.bank = bank
+        self.fields = tuple(fields)
+        self._version = 0
+        self._last = None # (term, fields, version, result)
+
+    def build(self, items):
+        self._version += 1
+
+    def extend(self, items):
+        self._version += 1
+
+    def add(self, row_id, row):
+        self._version += 1
+
+    def remove(self, row_id):
+        self._version += 1
+
+    def update(self, row_id, row):
+        self._version += 1
+
+    def search(self, term, fields=("question",)):
+        """Sorted row ids whose lowercased field text contains term, matched like SearchIndex.search."""
+        term = term.lower().strip()
+        fields = tuple(f for f in fields if f in self.fields)
+        bank = self.bank
+        if not term:
+            return list(bank.row_ids)
+        if not fields:
+            return []
+
+        last = self._last
+        if last and last[1] == fields and last[2] == self._version and last[0] in term:
+            candidates = last[3]
+        else:
+            candidates = self._candidates(term)
+
+        # Rows deleted since the file was written are still in it
+        row_ids = sorted(row_id for row_id in candidates if bank.index_of(row_id) is not None)
+        rows = bank.questions.iter_rows(row_ids)
+        result = [row_id for row_id, row in zip(row_ids, rows)
+                  if any(term in row[field].lower() for field in fields)]
+        self._last = (term, fields, self._version, result)
+        return result
+
+    def _candidates(self, term):
+        """Row ids that may contain term: rows whose bytes match it, plus all pinned rows."""
+        bank = self.bank
+        if not term.isascii() or '"' in term:
+            # The file's bytes can't be matched reliably (Unicode case folding, doubled quotes)
+            return bank.row_ids
+        candidates = set(bank.questions.pinned_ids())
+        needle = term.encode("ascii")
+        data, offsets, saved_ids = bank._data, bank._saved_offsets, bank._saved_ids
+        end = offsets[-1]
+        # Lowercased a block at a time; blocks overlap so hits across a block edge are found
+        for block_start in range(offsets[0], end, SCAN_BLOCK_SIZE):
+            block = data[block_start:min(block_start + SCAN_BLOCK_SIZE + len(needle) - 1, end)].lower()
+            i = block.find(needle)
+            while i != -1 and i < SCAN_BLOCK_SIZE:
+                k = bisect.bisect_right(offsets, block_start + i) - 1
+                candidates.add(saved_ids[k])
+                # One hit per row is enough
+                i = block.find(needle, max(i + 1, offsets[k + 1] - block_start))
+        return candidates
+
+
+class MappedQuestionBank(QuestionBank):
+    """A QuestionBank whose rows stay in the memory-mapped CSV until they are read or edited.
+
+    Open with MappedQuestionBank.from_csv(path); see the module docstring.
+    """
+
+    lazy = True
+
+    def __init__(self):
+        super().__init__()
+        self.questions = MappedRows(self)
+        self.row_ids = array('q')
+        self._file = None
+        self._data = None
+
+    def close(self):
+        """Unmap the bank's file."""
+        if self._data is not None:
+            self._data.close()
+            self._file.close()
+        self._data = None
+        self._file = None
+
+    def search_index(self):
+        """A SearchIndex-compatible searcher that scans the mapped file."""
+        return MappedSearch(self)
+
+    # --- Loading / saving ---
+
+    def load(self, filepath):
+        """Map filepath and find its rows, reusing the saved offset index when it is current.
+
+        Raises ValueError on a header mismatch; rows aren't checked until they
+        are read.
+        """
+        file, data, stamp = self._map(filepath)
+        try:
+            header_end = data.find(b"\n") + 1 or len(data)
+            header_line = data[:header_end]
+            check_headers(next(csv.reader([header_line.decode("utf-8-sig").rstrip("\r\n")]), None))
+            offsets = read_offset_index(filepath, stamp, header_end)
+            if offsets is None:
+                offsets = scan_row_offsets(data, header_end)
+                write_offset_index(filepath, stamp, offsets)
+        except BaseException:
+            data.close()
+            file.close()
+            raise
+
+        self.close()
+        self._file, self._data = file, data
+        count = len(offsets) - 1
+        self.row_ids = array('q', range(count))
+        self._next_row_id = count
+        self.questions = MappedRows(self)
+        self.load_warnings = []
+        self.path = filepath
+        self._reset_history()
+        self._reset_file_index()
+        self._stamp = stamp
+        self._saved_ids = array('q', range(count))
+        self._saved_offsets = offsets
+        self._layout = detect_layout(header_line)
+
+    @staticmethod
+    def _map(filepath):
+        file = open(filepath, "rb")
+        try:
+            st = os.fstat(file.fileno())
+            if not st.st_size:
+                check_headers(None) # An empty file has no header
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            file.close()
+            raise
+        return file, data, (st.st_size, st.st_mtime_ns)
+
+    def begin_load(self, filepath):
+        raise NotImplementedError("MappedQuestionBank reads its file on demand; use load().")
+
+    def finish_save(self, plan):
+        """Adopt a written SavePlan and map the file it wrote."""
+        super().finish_save(plan)
+        # The save replaced the file; the old mapping still shows the old one until now
+        file, data, stamp = self._map(plan.path)
+        self.close()
+        self._file, self._data = file, data
+        self.questions.unpin_all()
+        if stamp == self._stamp:
+            write_offset_index(plan.path, stamp, self._saved_offsets)
+
+    def check_mapping(self):
+        """Raise IOError if the mapped file was cut short (reading past its end would crash the process)."""
+        if os.fstat(self._file.fileno()).st_size < self._saved_offsets[-1]:
+            raise IOError(f"{self.path} changed on disk; reload it.")
+
+    def read_row(self, row_id):
+        """Decode the row with row_id from the mapped file (it must be one of the file's rows)."""
+        self.check_mapping()
+        return self.decode_row(row_id)
+
+    def decode_row(self, row_id):
+        """read_row without the check_mapping() call, for callers that made it."""
+        k = bisect.bisect_left(self._saved_ids, row_id)
+        if k == len(self._saved_ids) or self._saved_ids[k] != row_id:
+            raise KeyError(f"Question {row_id} is not in {self.path}.")
+        return parse_record(self._data[self._saved_offsets[k]:self._saved_offsets[k + 1]])
+
+    # --- Change tracking internals ---
+
+    def _apply_edits(self, row_id, row, edits):
+        super()._apply_edits(row_id, row, edits)
+        # A cached row could be evicted and decoded afresh, losing the edit
+        self.questions.pin(row_id, row)
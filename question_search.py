@@ -0,0 +1,177 @@
+"""Inverted word index for substring search over question bank rows.
+
+The editor's search box matches a lowercased substring of a field. Instead of
+scanning every row per keystroke, SearchIndex keeps a token -> row-id postings
+map per field, narrows to candidate rows from the query's words, and only
+verifies the substring on those candidates. A query that extends the previous
+one is answered by filtering the previous result set.
+
+This module must not import tkinter.
+"""
+import re
+
+SEARCH_FIELDS = ("question", "explanation", "chapter")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Distinct lowercase word tokens in text."""
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+class SearchIndex:
+    """Per-field inverted index keyed by caller-supplied row ids.
+
+    Row ids must be hashable and sortable; search() returns them sorted, so
+    ids that increase with row order (QuestionBank.row_ids) come back in
+    display order.
+    """
+
+    def __init__(self, fields=SEARCH_FIELDS):
+        self.fields = tuple(fields)
+        # Position of each field in the per-row text snapshots
+        self._positions = {field: i for i, field in enumerate(self.fields)}
+        self._postings = {field: {} for field in self.fields}
+        self._rows = {}
+        self._version = 0
+        self._last = None  # (term, fields, version, result set)
+
+    def __len__(self):
+        return len(self._rows)
+
+    # --- Maintenance ---
+
+    def build(self, items):
+        """Rebuild from an iterable of (row_id, row) pairs."""
+        self._postings = {field: {} for field in self.fields}
+        self._rows = {}
+        for row_id, row in items:
+            self._add_postings(row_id, row)
+        self._version += 1
+
+    def extend(self, items):
+        """Index an iterable of new (row_id, row) pairs."""
+        for row_id, row in items:
+            self._add_postings(row_id, row)
+        self._version += 1
+
+    def add(self, row_id, row):
+        """Index a new row."""
+        self._add_postings(row_id, row)
+        self._version += 1
+
+    def remove(self, row_id):
+        """Drop a row from the index (no-op if it isn't indexed)."""
+        snapshot = self._rows.pop(row_id, None)
+        if snapshot is None:
+            return
+        for field, text in zip(self.fields, snapshot):
+            postings = self._postings[field]
+            for token in tokenize(text):
+                ids = postings.get(token)
+                if ids is not None:
+                    ids.discard(row_id)
+                    if not ids:
+                        del postings[token]
+        self._version += 1
+
+    def update(self, row_id, row):
+        """Re-index a row whose fields changed; untouched fields are left alone."""
+        snapshot = self._rows.get(row_id)
+        if snapshot is None:
+            self.add(row_id, row)
+            return
+        texts = [row.get(field, "") for field in self.fields]
+        for field, old_text, new_text in zip(self.fields, snapshot, texts):
+            if new_text == old_text:
+                continue
+            old_tokens = tokenize(old_text)
+            new_tokens = tokenize(new_text)
+            postings = self._postings[field]
+            for token in old_tokens - new_tokens:
+                ids = postings.get(token)
+                if ids is not None:
+                    ids.discard(row_id)
+                    if not ids:
+                        del postings[token]
+            for token in new_tokens - old_tokens:
+                postings.setdefault(token, set()).add(row_id)
+        self._rows[row_id] = tuple(texts)
+        self._version += 1
+
+    def _add_postings(self, row_id, row):
+        # Keep our own copy of the indexed text so remove()/update() know
+        # which tokens to drop even after the caller mutated the row in place.
+        # A tuple in self.fields order is far smaller than a dict per row.
+        snapshot = tuple([row.get(field, "") for field in self.fields])
+        self._rows[row_id] = snapshot
+        for field, text in zip(self.fields, snapshot):
+            postings = self._postings[field]
+            for token in tokenize(text):
+                postings.setdefault(token, set()).add(row_id)
+
+    # --- Queries ---
+
+    def search(self, term, fields=("question",)):
+        """Sorted row ids whose lowercased field text contains term (lowercased, stripped).
+
+        An empty term matches every row.
+        """
+        term = term.lower().strip()
+        fields = tuple(f for f in fields if f in self.fields)
+        if not term:
+            return sorted(self._rows)
+
+        last = self._last
+        if last and last[1] == fields and last[2] == self._version and last[0] in term:
+            # Narrowing: anything matching the longer term also matched the shorter one
+            candidates = last[3]
+        else:
+            candidates = self._candidates(term, fields)
+
+        positions = [self._positions[field] for field in fields]
+        result = {row_id for row_id in candidates if self._matches(row_id, term, positions)}
+        self._last = (term, fields, self._version, result)
+        return sorted(result)
+
+    def _matches(self, row_id, term, positions):
+        snapshot = self._rows.get(row_id)
+        if snapshot is None:
+            return False
+        return any(term in snapshot[i].lower() for i in positions)
+
+    def _candidates(self, term, fields):
+        """Superset of rows that can contain term, from the postings of one query word."""
+        words = _TOKEN_RE.findall(term)
+        if not words:
+            # Punctuation-only query: nothing to narrow on
+            return self._rows.keys()
+
+        # A word in the middle of the term must be a whole token in the text;
+        # the first word can be a token suffix, the last a token prefix, and a
+        # lone word can appear anywhere inside a token.
+        last = len(words) - 1
+        starts_inside = term[0] == words[0][0]
+        ends_inside = term[-1] == words[-1][-1]
+        pos = max(range(len(words)), key=lambda i: len(words[i]))
+        word = words[pos]
+        suffix_ok = pos == 0 and starts_inside
+        prefix_ok = pos == last and ends_inside
+
+        candidates = set()
+        for field in fields:
+            postings = self._postings[field]
+            if not suffix_ok and not prefix_ok:
+                candidates.update(postings.get(word, ()))
+                continue
+            for token, ids in postings.items():
+                if suffix_ok and prefix_ok:
+                    hit = word in token
+                elif suffix_ok:
+                    hit = token.endswith(word)
+                else:
+                    hit = token.startswith(word)
+                if hit:
+                    candidates.update(ids)
+        return candidates
@@ -0,0 +1,311 @@
+// Service worker for the quiz page (registered by index.html).
+//
+// - The page itself is fetched from the network when possible (revalidated,
+//   so an unchanged page costs a 304) and from the cache when offline.
+// - questions.csv is cached under the hash of its bytes. If the site
+//   publishes questions.version.json ("python bank_cli.py diff", see
+//   bank_delta.py), an outdated copy is brought up to date with the listed
+//   deltas instead of downloading the whole file again.
+// - Shards of a sharded bank are named by their content, so they are served
+//   from the cache once fetched; all shards listed in the manifest are cached
+//   in the background so every chapter works offline.
+
+const CACHE_PREFIX = 'patentbar-';
+// Bump the version suffixes when the cached layout changes; activate deletes old caches
+const SHELL_CACHE = CACHE_PREFIX + 'shell-v1';
+const BANK_CACHE = CACHE_PREFIX + 'bank-v1';
+const SHELL_URLS = ['./', 'index.html'];
+
+const SCOPE = self.registration.scope;
+const CSV_URL = new URL('questions.csv', SCOPE).href;
+const VERSION_URL = new URL('questions.version.json', SCOPE).href;
+const MANIFEST_URL = new URL('questions.manifest.json', SCOPE).href;
+const BUNDLE_URL = new URL('questions.bundle.json', SCOPE).href;
+const SHARD_PREFIX = new URL('questions.shards/', SCOPE).href;
+const DELTA_FORMAT = 1;
+
+// Hash of the cached questions.csv's bytes (bank_delta.bank_file_hash)
+const BANK_HASH_HEADER = 'X-Bank-Hash';
+// With a cached copy to fall back on, stop waiting for a slow network after this long
+const NETWORK_TIMEOUT_MS = 4000;
+// Download the whole CSV rather than deltas adding up to more than this fraction of it
+const MAX_DELTA_FRACTION = 0.5;
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(SHELL_URLS))
+            // Cache the bank too, so the quiz works offline after the first visit
+            .then(() => warmBankCache().catch(error => console.warn("Could not cache the question bank:", error)))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names
+                .filter(name => name.startsWith(CACHE_PREFIX) && name !== SHELL_CACHE && name !== BANK_CACHE)
+                .map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = request.url.split('#')[0];
+    if (url === CSV_URL) {
+        event.respondWith(bankResponse(request));
+    } else if (url.startsWith(SHARD_PREFIX)) {
+        event.respondWith(cacheFirst(request, BANK_CACHE));
+    } else if (url === MANIFEST_URL) {
+        event.respondWith(networkFirst(request, BANK_CACHE).then(response => {
+            if (response.ok) event.waitUntil(cacheShards(response.clone()));
+            return response;
+        }));
+    } else if (url === BUNDLE_URL) {
+        event.respondWith(networkFirst(request, BANK_CACHE));
+    } else if (url.startsWith(SCOPE)) {
+        event.respondWith(networkFirst(request, SHELL_CACHE));
+    } else {
+        // Third-party assets (icon font): the cached copy now, a fresh one for next time
+        event.respondWith(staleWhileRevalidate(request, SHELL_CACHE));
+    }
+});
+
+// Fetch bypassing the HTTP cache's freshness rules; the server can still answer 304
+function revalidate(request) {
+    // Navigation requests can't be copied with new options (and are revalidated anyway)
+    return fetch(request.mode === 'navigate' ? request : new Request(request, { cache: 'no-cache' }));
+}
+
+// Resolves like promise, or to null if it takes longer than ms (ms null: no limit)
+function withTimeout(promise, ms) {
+    if (ms === null) return promise;
+    return Promise.race([promise, new Promise(resolve => setTimeout(() => resolve(null), ms))]);
+}
+
+// Network response if there is one in time, else the cached copy. Successful
+// responses are cached; a 404 drops the cached copy (the file was removed).
+async function networkFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request, { ignoreSearch: request.mode === 'navigate' });
+    const network = revalidate(request).then(async response => {
+        if (response.ok) {
+            await cache.put(request, response.clone());
+        } else if (response.status === 404) {
+            await cache.delete(request);
+        }
+        return response;
+    });
+    try {
+        const response = await withTimeout(network, cached ? NETWORK_TIMEOUT_MS : null);
+        if (response) return response;
+        network.catch(() => {}); // Still caches the response if it arrives later
+        return cached;
+    } catch (error) {
+        if (cached) return cached;
+        if (request.mode === 'navigate') {
+            const shell = await cache.match('index.html');
+            if (shell) return shell;
+        }
+        throw error;
+    }
+}
+
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) await cache.put(request, response.clone());
+    return response;
+}
+
+async function staleWhileRevalidate(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    const network = fetch(request).then(async response => {
+        // Opaque (no-cors) responses have status 0 but are still worth keeping
+        if (response.ok || response.type === 'opaque') await cache.put(request, response.clone());
+        return response;
+    });
+    if (cached) {
+        network.catch(() => {});
+        return cached;
+    }
+    return network;
+}
+
+// Put the bank the page will ask for in the cache: the manifest and its shards,
+// else the bundle, else questions.csv
+async function warmBankCache() {
+    const manifest = await networkFirst(new Request(MANIFEST_URL), BANK_CACHE);
+    if (manifest.ok) return cacheShards(manifest);
+    const bundle = await networkFirst(new Request(BUNDLE_URL), BANK_CACHE);
+    if (bundle.ok) return;
+    await bankResponse(new Request(CSV_URL));
+}
+
+// Cache every shard a manifest lists and drop cached shards it doesn't
+async function cacheShards(manifestResponse) {
+    const manifest = await manifestResponse.json();
+    if (!Array.isArray(manifest.chapters)) return;
+    const cache = await caches.open(BANK_CACHE);
+    const listed = new Set(manifest.chapters.map(chapter => new URL(chapter.file, SCOPE).href));
+    for (const url of listed) {
+        if (await cache.match(url)) continue;
+        try {
+            const response = await fetch(url);
+            if (response.ok) await cache.put(url, response);
+        } catch (error) {
+            return; // Offline; the rest are fetched on a later visit
+        }
+    }
+    const requests = await cache.keys();
+    await Promise.all(requests
+        .filter(request => request.url.startsWith(SHARD_PREFIX) && !listed.has(request.url))
+        .map(request => cache.delete(request)));
+}
+
+// --- questions.csv by content hash ---
+
+async function bankResponse(request) {
+    const cache = await caches.open(BANK_CACHE);
+    const cached = await cache.match(CSV_URL);
+    // Without a cached copy there is nothing to update, so the version isn't needed
+    const version = cached ? await withTimeout(fetchJSON(VERSION_URL), NETWORK_TIMEOUT_MS) : null;
+    if (version && cached.headers.get(BANK_HASH_HEADER) === version.hash) return cached;
+
+    if (version) {
+        try {
+            const updated = await updateFromDeltas(cached, version);
+            if (updated) return storeBank(cache, updated);
+        } catch (error) {
+            console.warn("Could not apply question bank deltas, downloading the whole bank:", error);
+        }
+    }
+    try {
+        const response = await withTimeout(revalidate(request), cached ? NETWORK_TIMEOUT_MS : null);
+        if (!response) return cached;
+        if (!response.ok) {
+            if (response.status === 404) await cache.delete(CSV_URL);
+            return response;
+        }
+        return storeBank(cache, new Uint8Array(await response.arrayBuffer()));
+    } catch (error) {
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+// JSON from url, or null if it is missing, unreadable or from a different format
+async function fetchJSON(url) {
+    try {
+        const response = await fetch(url, { cache: 'no-cache' });
+        if (!response.ok) return null;
+        const data = await response.json();
+        return data && data.format === DELTA_FORMAT ? data : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+// Cache bank bytes under their hash and return them as a response
+async function storeBank(cache, data) {
+    const response = new Response(data, {
+        headers: {
+            'Content-Type': 'text/csv; charset=utf-8',
+            [BANK_HASH_HEADER]: await bankHash(data)
+        }
+    });
+    await cache.put(CSV_URL, response.clone());
+    return response;
+}
+
+async function bankHash(data) {
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', data));
+    return Array.from(digest.slice(0, 8), byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+// The current bank's bytes, rebuilt from the cached copy and the version's
+// chain of deltas; null if there is no chain from the cached copy or it
+// would cost too much to download
+async function updateFromDeltas(cached, version) {
+    const deltas = Array.isArray(version.deltas) ? version.deltas : [];
+    const chain = [];
+    let hash = cached.headers.get(BANK_HASH_HEADER);
+    let size = 0;
+    while (hash !== version.hash) {
+        const entry = deltas.find(delta => delta.from === hash);
+        if (!entry || chain.length >= deltas.length) return null;
+        chain.push(entry);
+        size += entry.size;
+        hash = entry.to;
+    }
+    if (size > version.size * MAX_DELTA_FRACTION) return null;
+
+    // Keep a byte order mark if the file has one, so the hash still matches
+    let text = new TextDecoder('utf-8', { ignoreBOM: true }).decode(await cached.arrayBuffer());
+    for (const entry of chain) {
+        const delta = await fetchJSON(new URL(entry.file, SCOPE).href);
+        if (!delta || delta.from !== entry.from || delta.to !== entry.to) {
+            throw new Error(`${entry.file} is missing or doesn't match questions.version.json`);
+        }
+        text = applyBankDelta(text, delta);
+    }
+    const data = new TextEncoder().encode(text);
+    if (await bankHash(data) !== version.hash) {
+        throw new Error("Updated question bank doesn't match questions.version.json");
+    }
+    return data;
+}
+
+// Split CSV text into [header, [record, ...]], each with its line ending,
+// the way bank_delta.split_records does
+function splitBankRecords(text) {
+    const records = [];
+    let current = '';
+    let openQuote = false;
+    const lines = text.split('\n');
+    for (let i = 0; i < lines.length; i++) {
+        let line = lines[i];
+        if (i < lines.length - 1) {
+            line += '\n';
+        } else if (!line) {
+            break;
+        }
+        current += line;
+        if ((line.split('"').length - 1) % 2) openQuote = !openQuote;
+        if (!openQuote) {
+            records.push(current);
+            current = '';
+        }
+    }
+    if (current) records.push(current);
+    return [records.length ? records[0] : '', records.slice(1)];
+}
+
+// Rebuild the new bank text from the old one and a delta (bank_delta.apply_delta)
+function applyBankDelta(text, delta) {
+    const records = splitBankRecords(text)[1];
+    delta.changed.forEach(([index, record]) => {
+        if (index >= records.length) throw new Error("Question bank delta doesn't fit the cached bank");
+        records[index] = record;
+    });
+    const removed = new Set(delta.removed);
+    const kept = records.filter((record, index) => !removed.has(index));
+    const out = [delta.header];
+    let next = 0;
+    let added = 0;
+    for (let index = 0; index < delta.rows; index++) {
+        if (added < delta.added.length && delta.added[added][0] === index) {
+            out.push(delta.added[added++][1]);
+        } else {
+            if (next >= kept.length) throw new Error("Question bank delta doesn't fit the cached bank");
+            out.push(kept[next++]);
+        }
+    }
+    return out.join('');
+}